@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Joining the SAS input sheets of a table, as create_data_ready does for each
+employee type. The old loop concatenated and deduplicated the growing frame
+each time a sheet was added, so its time grew with the square of the number
+of shorthands (16 for Table 5). The frames are now joined and deduplicated
+once. Times are shown for the first 1, 2, 4, ... shorthands of each table,
+then for preparing a whole workbook's CVs and Values.
+
+    python benchmarks/bench_concat.py --rows 200
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+import pandas as pd
+
+from ashe_table_formatting.pipeline_config import Employee_key, Published_tables_data, Published_table_breakdown
+from ashe_table_formatting.Create_ASHE_tables import create_data_ready, create_data_ready_all, get_files_from_list
+from ashe_table_formatting.data_cache import get_dataset_cache
+
+from synthetic import generate_csvs
+
+def concat_in_loop(frames):
+    '''The old create_data_ready loop.'''
+    combined_data = []
+    for frame in frames:
+        combined_data.append(frame)
+        data_needed = pd.concat(combined_data)
+        data_needed = data_needed.drop_duplicates()
+    return data_needed
+
+def concat_once(frames):
+    return pd.concat(frames).drop_duplicates()
+
+def best_time(function, repeats, *args):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tables', nargs = '+', default = ['Table 5 - Gor by Ind', 'Table 16 - Industry (4)'])
+    parser.add_argument('--variable', default = 'Weekly pay - Gross')
+    parser.add_argument('--year', type = int, default = 2021)
+    parser.add_argument('--rows', type = int, default = 200, help = 'Codes per employee type section')
+    parser.add_argument('--repeats', type = int, default = 5)
+    args = parser.parse_args()
+
+    variable_year = Published_table_breakdown[args.variable] + ' ' + f'{args.year}'
+    employee_type = [*Employee_key][0]
+
+    with tempfile.TemporaryDirectory() as csv_path:
+        for table in args.tables:
+            shorthands = Published_tables_data[table]
+            generate_csvs(csv_path, shorthands, args.year, args.rows, [args.variable])
+            data = get_files_from_list(csv_path, shorthands, variable_year, 'Values')
+            frames = [data[shorthand][variable_year]['Values'][employee_type] for shorthand in shorthands]
+
+            print(f'{table} ({len(shorthands)} shorthands, {args.rows} rows each)')
+            count = 1
+            while True:
+                count = min(count, len(frames))
+                loop_seconds = best_time(concat_in_loop, args.repeats, frames[:count])
+                once_seconds = best_time(concat_once, args.repeats, frames[:count])
+                print(f'  {count:>3} shorthands  in loop {loop_seconds * 1000:8.2f}ms  once {once_seconds * 1000:7.2f}ms  x{loop_seconds / once_seconds:.1f}')
+                if count == len(frames):
+                    break
+                count *= 2
+
+            get_dataset_cache().clear()
+            per_type = best_time(lambda: [create_data_ready(csv_path, table, args.variable, value_type, employee, args.year)
+                                          for value_type in ('CVs', 'Values') for employee in Employee_key], args.repeats)
+            batched = best_time(lambda: [create_data_ready_all(csv_path, table, args.variable, value_type, args.year)
+                                         for value_type in ('CVs', 'Values')], args.repeats)
+            print(f'  workbook CVs and Values  create_data_ready x18 {per_type * 1000:8.2f}ms  create_data_ready_all x2 {batched * 1000:7.2f}ms')
+
+if __name__ == '__main__':
+    main()
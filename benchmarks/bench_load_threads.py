@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Wall clock time of load_workbook_data loading the datasets of a workbook
+serially and on a thread pool. Point --csv-path and --csv-previous-year-path
+at a network share to measure the real gain, or leave them out to use
+synthetic CSVs with --latency simulating the per-file wait of a share.
+
+    python benchmarks/bench_load_threads.py --table "Table 5 - Gor by Ind" --latency 0.2
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import ashe_table_formatting.Create_ASHE_tables as tables
+from ashe_table_formatting.data_cache import get_dataset_cache
+from ashe_table_formatting.previous_year import clear_previous_year_cache
+from ashe_table_formatting.csv_index import get_csv_index
+from ashe_table_formatting.pipeline_config import Published_tables_data, Published_table_breakdown
+
+from synthetic import generate_csvs
+
+def time_load(csv_path, csv_previous_year_path, table_name, table_variable, year, threads, repeats):
+    best = None
+    for _ in range(repeats):
+        get_dataset_cache().clear() # Every repeat starts cold
+        clear_previous_year_cache()
+        start = time.perf_counter()
+        tables.load_workbook_data(csv_path, csv_previous_year_path, table_name, table_variable, year, threads)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--table', default = 'Table 5 - Gor by Ind')
+    parser.add_argument('--variable', default = 'Weekly pay - Gross')
+    parser.add_argument('--year', type = int, default = 2021)
+    parser.add_argument('--csv-path')
+    parser.add_argument('--csv-previous-year-path')
+    parser.add_argument('--rows', type = int, default = 200, help = 'Codes per section for synthetic CSVs')
+    parser.add_argument('--latency', type = float, default = 0.0, help = 'Seconds added to every file read')
+    parser.add_argument('--threads', type = int, nargs = '+', default = [1, 3, 9])
+    parser.add_argument('--repeats', type = int, default = 3)
+    args = parser.parse_args()
+
+    temp = None
+    csv_path, csv_previous_year_path = args.csv_path, args.csv_previous_year_path
+    if csv_path is None:
+        temp = tempfile.TemporaryDirectory()
+        csv_path = os.path.join(temp.name, 'CSV')
+        csv_previous_year_path = os.path.join(temp.name, 'CSV previous year')
+        shorthands = Published_tables_data[args.table]
+        generate_csvs(csv_path, shorthands, args.year, args.rows, [args.variable])
+        generate_csvs(csv_previous_year_path, shorthands, args.year - 1, args.rows, [args.variable])
+
+    if args.latency:
+        read = tables.get_files
+        def slow_get_files(csv, file_name):
+            time.sleep(args.latency)
+            return read(csv, file_name)
+        tables.get_files = slow_get_files
+
+    get_csv_index(csv_path)
+    get_csv_index(csv_previous_year_path)
+
+    print(f'{args.table} - {args.variable} ({Published_table_breakdown[args.variable]}), latency {args.latency}s')
+    baseline = None
+    for threads in args.threads:
+        elapsed = time_load(csv_path, csv_previous_year_path, args.table, args.variable, args.year, threads, args.repeats)
+        baseline = baseline or elapsed
+        print(f'threads {threads:>3}: {elapsed:8.2f}s  x{baseline / elapsed:.2f}')
+
+    if temp is not None:
+        temp.cleanup()
+
+if __name__ == '__main__':
+    main()
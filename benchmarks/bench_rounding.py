@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Micro-benchmark of the vectorised round_half_up against the per-cell
+Decimal map it replaced in create_data_ready and percentage_change.
+
+    python benchmarks/bench_rounding.py --rows 10000 100000
+"""
+import argparse
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pandas as pd
+
+from ashe_table_formatting.rounding import round_half_up
+
+def decimal_map(column):
+    return column.map(lambda x: Decimal(str(x)).quantize(Decimal('.1'), rounding=ROUND_HALF_UP))
+
+def vectorised(column):
+    return round_half_up(column, 1)
+
+def best_time(function, column, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(column)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type = int, nargs = '+', default = [1000, 10000, 100000])
+    parser.add_argument('--repeats', type = int, default = 5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for rows in args.rows:
+        column = pd.Series(np.round(rng.uniform(0, 2000, rows), 2))
+        column[rng.random(rows) < 0.05] = np.nan
+        decimal_seconds = best_time(decimal_map, column, args.repeats)
+        vector_seconds = best_time(vectorised, column, args.repeats)
+        print(f'{rows:>9} rows  Decimal {decimal_seconds * 1000:9.2f}ms  vectorised {vector_seconds * 1000:8.2f}ms  x{decimal_seconds / vector_seconds:.0f}')
+
+if __name__ == '__main__':
+    main()
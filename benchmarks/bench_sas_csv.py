@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Benchmark of the single pass SAS csv reader against the pandas read_csv and
+slicing version of get_files it replaced. Files are geography sized
+synthetic CSVs (one row per code in each of the nine sections).
+
+    python benchmarks/bench_sas_csv.py --rows 2000 10000 --folder bench_csv
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from ashe_table_formatting.pipeline_config import Employee_key
+from ashe_table_formatting.sas_csv import read_sas_sections
+
+from synthetic import write_sas_csv
+
+def legacy_get_files(csv, file_name):
+    '''The pandas get_files, kept here for comparison.'''
+    data = pd.read_csv(csv, header = 5, encoding = 'unicode_escape', thousands=',', on_bad_lines = 'warn', skip_blank_lines = False)
+    end_section_row = data[data.iloc[:, 0].str.contains("key1=") == True].index + 6
+    end_section_row = end_section_row.insert(0,0)
+    end_section_row = end_section_row.insert(9,data.index[-1])
+
+    data = [data.iloc[end_section_row[i]:end_section_row[i+1],:] for i in range(0,9)]
+    data = [data[i].dropna() for i in range(0,9)]
+    data = [data[i].reset_index(drop=True) for i in range(0,9)]
+    [data[i].rename(columns = {data[i].columns[0]: 'Description'}, inplace = True) for i in range(0,9)]
+    [data[i].rename(columns = {data[i].columns[1]: 'Code'}, inplace = True) for i in range(0,9)]
+    [data[i].replace(',','', regex=True, inplace=True) for i in range(0,9)]
+
+    for i in range(0,9):
+        data[i]['Code'] = data[i]['Code'].astype('str').replace(r'\.\d+$', '', regex=True)
+        data[i]['Code'] = data[i]['Code'].apply(str)
+        data[i]['Code'] = f'{file_name}' + ' ' + data[i]['Code'].astype(str)
+
+    key_list = [*Employee_key]
+
+    return {key_list[x]: data[x] for x in range(0,9)}
+
+def best_time(function, path, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(path, 'wgor')
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type = int, nargs = '+', default = [400, 2000, 10000])
+    parser.add_argument('--repeats', type = int, default = 3)
+    parser.add_argument('--folder', help = 'Where to write the synthetic CSVs. A temporary folder if not given.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary:
+        folder = args.folder or temporary
+        os.makedirs(folder, exist_ok = True)
+
+        for rows in args.rows:
+            for type_of_value in ('CVs', 'Values'):
+                path = os.path.join(folder, f'wgor - GPAY {rows} - {type_of_value}.csv')
+                write_sas_csv(path, 'wgor', 'GPAY', type_of_value, rows, seed = rows)
+
+                legacy_seconds = best_time(legacy_get_files, path, args.repeats)
+                single_pass_seconds = best_time(read_sas_sections, path, args.repeats)
+                print(f'{rows:>6} codes {type_of_value:<6}  pandas {legacy_seconds * 1000:9.1f}ms  '
+                      f'single pass {single_pass_seconds * 1000:9.1f}ms  x{legacy_seconds / single_pass_seconds:.1f}')
+
+if __name__ == '__main__':
+    main()
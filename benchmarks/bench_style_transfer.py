@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Time of copying the CV main styles onto the values main sheet with the old
+per cell copy_sheet_style and with StyleMap. The sheets are shaped like the
+biggest geography templates, one row per code with 17 styled columns and
+CV banding fills on the data cells.
+
+    python benchmarks/bench_style_transfer.py --rows 10000
+"""
+import argparse
+import copy
+import random
+import time
+
+import openpyxl as opy
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
+from ashe_table_formatting.style_transfer import StyleMap
+
+def legacy_copy_sheet_style(ws_template, ws_published, isvalmain):
+    '''copy_sheet_style as it was before StyleMap.'''
+    for row in (ws_template.rows):
+        for cell in row:
+            new_cell = ws_published.cell(row=cell.row, column=cell.col_idx)
+
+            if cell.has_style:
+                new_cell.font = copy.copy(cell.font)
+                new_cell.border = copy.copy(cell.border)
+                new_cell.fill = copy.copy(cell.fill)
+                new_cell.number_format = copy.copy(cell.number_format)
+                new_cell.protection = copy.copy(cell.protection)
+                new_cell.alignment = copy.copy(cell.alignment)
+
+            if isvalmain == 'valmain' and cell.col_idx > 2 and cell.value == 'x':
+                new_cell.value = 'x'
+
+def cv_main_sheet(rows, seed = 0):
+    '''
+    A CV main sheet after banding.
+
+    Parameters
+    ----------
+    rows : Integer
+        Number of codes.
+    seed : Numeric
+        Seed for the CVs.
+
+    Returns
+    -------
+    sheet : Worksheet
+    '''
+    rnd = random.Random(seed)
+    light_blue = PatternFill(patternType = 'gray0625', start_color = '00FFFF', end_color = '00FFFF', fill_type= 'solid')
+    dark_blue = PatternFill(start_color = '33CCCC', end_color = '00FFFF', fill_type= 'solid')
+    border = Border(bottom = Side(style = 'thin'))
+
+    sheet = opy.Workbook().active
+    for column in range(1, 18):
+        sheet.cell(row = 5, column = column, value = f'Heading {column}').font = Font(bold = True)
+
+    for row in range(6, rows + 6):
+        sheet.cell(row = row, column = 1, value = f'Description {row}')
+        sheet.cell(row = row, column = 2, value = f'E{row:08d}')
+        for column in range(3, 18):
+            cv = rnd.uniform(0, 30)
+            cell = sheet.cell(row = row, column = column, value = 'x' if cv > 20 else round(cv, 1))
+            cell.border = border
+            cell.number_format = '0.0'
+            cell.alignment = Alignment(horizontal = 'right')
+            if cv > 10:
+                cell.fill = dark_blue
+            elif cv > 5:
+                cell.fill = light_blue
+
+    return sheet
+
+def values_main_sheet(rows):
+    '''A values main sheet with numbers filled in and the template styles.'''
+    sheet = opy.Workbook().active
+    for row in range(6, rows + 6):
+        for column in range(3, 18):
+            sheet.cell(row = row, column = column, value = 1.5).border = Border(bottom = Side(style = 'thin'))
+    return sheet
+
+def best_time(copy_styles, source, rows, repeats):
+    best = None
+    for _ in range(repeats):
+        target = values_main_sheet(rows)
+        start = time.perf_counter()
+        copy_styles(source, target)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type = int, nargs = '+', default = [400, 2000, 10000])
+    parser.add_argument('--repeats', type = int, default = 3)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        source = cv_main_sheet(rows)
+        legacy = best_time(lambda s, t: legacy_copy_sheet_style(s, t, 'valmain'), source, rows, args.repeats)
+        mapped = best_time(lambda s, t: StyleMap(s).apply(t, copy_x = True), source, rows, args.repeats)
+        print(f'{rows:>6} rows: legacy {legacy:7.3f}s  StyleMap {mapped:7.3f}s  x{legacy / mapped:.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Timed end to end scenarios on synthetic inputs, with results kept in a JSON
+lines file so that a slowdown between commits shows up.
+
+    variable     create_workbook for one table and variable
+    table        create_table, all variables of one table
+    publication  run_publication over every table in Published_tables_data
+
+Each run appends one record per scenario (commit, rows, seconds and the
+stage timings) and compares it with the last record of the same scenario
+from another commit. Inputs are generated from a fixed seed, so the same
+--rows gives the same files on every machine.
+
+    python benchmarks/run_benchmarks.py --scenario variable table --rows 100
+    python benchmarks/run_benchmarks.py --scenario publication --rows 50 --fail-on-regression
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+from ashe_table_formatting.pipeline_config import Published_tables_data, Published_table_breakdown
+from ashe_table_formatting.Create_ASHE_tables import create_table, create_workbook
+from ashe_table_formatting.batch_runner import run_publication
+from ashe_table_formatting.data_cache import get_dataset_cache
+from ashe_table_formatting.footnotes import clear_footnote_cache
+from ashe_table_formatting.previous_year import clear_previous_year_cache
+from ashe_table_formatting.stage_timings import get_stage_timings
+from ashe_table_formatting.template_cache import clear_template_cache
+
+from synthetic import generate_inputs
+
+SCENARIOS = ['variable', 'table', 'publication']
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.jsonl')
+
+def current_commit():
+    '''Short hash of HEAD, with '+' added if the tree has changes, or None outside git.'''
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output = True, text = True, check = True).stdout.strip()
+        changed = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('+' if changed else '')
+
+def scenario_tables(scenario, table):
+    '''Tables a scenario needs inputs for.'''
+    return list(Published_tables_data) if scenario == 'publication' else [table]
+
+def run_scenario(scenario, paths, table, variable, year):
+    '''
+    Runs a scenario once from a cold start (empty dataset, previous year,
+    template, footnote and stage caches, every workbook rebuilt), with its print output hidden.
+
+    Returns
+    -------
+    seconds : Float
+    '''
+    get_dataset_cache().clear()
+    clear_previous_year_cache()
+    clear_template_cache()
+    clear_footnote_cache()
+    get_stage_timings().clear()
+    args = (paths['csv_path'], paths['csv_previous_year_path'], paths['template_path'], paths['output_path'])
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if scenario == 'variable':
+            create_workbook(*args, table, variable, year, force = True)
+        elif scenario == 'table':
+            create_table(*args, table, year, force = True)
+        else:
+            report = run_publication(*args, year, workers = 1, force = True)
+            if (report['Status'] != 'Done').any():
+                raise RuntimeError('Failed jobs:\n' + report.loc[report['Status'] != 'Done', 'Error'].str.cat(sep = '\n'))
+    return time.perf_counter() - start
+
+def load_results(filename):
+    '''Records stored so far, oldest first.'''
+    if not os.path.exists(filename):
+        return []
+    with open(filename) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def previous_result(results, record):
+    '''Last stored record of the same scenario and inputs from another commit, or None.'''
+    fields = ('scenario', 'table', 'variable', 'rows')
+    for result in reversed(results):
+        if all(result.get(field) == record[field] for field in fields) and result.get('commit') != record['commit']:
+            return result
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', nargs = '+', choices = SCENARIOS, default = ['variable', 'table'])
+    parser.add_argument('--table', default = 'Table 2 - Occupation (2)')
+    parser.add_argument('--variable', default = 'Weekly pay - Gross')
+    parser.add_argument('--year', type = int, default = 2021)
+    parser.add_argument('--rows', type = int, default = 100, help = 'Codes per employee type section')
+    parser.add_argument('--repeats', type = int, default = 3, help = 'Best of this many runs is kept')
+    parser.add_argument('--folder', help = 'Keep the inputs and outputs here rather than in a temporary folder')
+    parser.add_argument('--results', default = RESULTS, help = 'JSON lines file of stored results')
+    parser.add_argument('--tolerance', type = float, default = 0.1, help = 'Slowdown that counts as a regression')
+    parser.add_argument('--fail-on-regression', action = 'store_true')
+    args = parser.parse_args()
+
+    temp = None if args.folder else tempfile.TemporaryDirectory()
+    folder = args.folder or temp.name
+    commit = current_commit()
+    results = load_results(args.results)
+    regressions = []
+
+    for scenario in args.scenario:
+        tables = scenario_tables(scenario, args.table)
+        variables = [args.variable] if scenario == 'variable' else list(Published_table_breakdown)
+        paths = generate_inputs(os.path.join(folder, scenario), tables, args.year, args.rows, variables)
+
+        seconds = min(run_scenario(scenario, paths, args.table, args.variable, args.year) for _ in range(args.repeats))
+        stages = get_stage_timings().to_frame().groupby('Stage')['Seconds'].sum().round(3).to_dict()
+
+        record = {'scenario': scenario,
+                  'table': None if scenario == 'publication' else args.table,
+                  'variable': args.variable if scenario == 'variable' else None,
+                  'rows': args.rows,
+                  'seconds': round(seconds, 3),
+                  'stages': stages,
+                  'commit': commit,
+                  'date': datetime.datetime.now().isoformat(timespec = 'seconds')}
+
+        line = f'{scenario:<12} rows {args.rows:>6}: {seconds:8.2f}s'
+        previous = previous_result(results, record)
+        if previous is not None:
+            change = seconds / previous['seconds'] - 1
+            line += f'  {change:+.0%} on {previous["commit"]} ({previous["seconds"]:.2f}s)'
+            if change > args.tolerance:
+                line += '  REGRESSION'
+                regressions.append(scenario)
+        print(line)
+
+        with open(args.results, 'a') as file:
+            file.write(json.dumps(record) + '\n')
+        results.append(record)
+
+    if temp is not None:
+        temp.cleanup()
+
+    if regressions and args.fail_on_regression:
+        raise SystemExit('Slower than the stored results: ' + ', '.join(regressions))
+
+if __name__ == '__main__':
+    main()
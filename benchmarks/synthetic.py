@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Synthetic SAS CSV inputs and templates shaped like the real ones, for
+benchmarking without access to the M: drive. Each csv has the 5 title rows
+and header row, then nine employee type sections separated by 'key1=' rows.
+Templates have a Code/Description/Order tab per shorthand whose codes match
+the csvs, and a styled tab per employee type.
+"""
+import csv
+import os
+import random
+
+import openpyxl as opy
+from openpyxl.styles import Alignment, Border, Font, Side
+
+from ashe_table_formatting.pipeline_config import (Employee_key, Published_tables_data, Published_tables_templates,
+                                                   Published_table_breakdown)
+
+HEADER = ['', 'Code', 'population number', 'Median', 'Year on Year % Change', 'Mean',
+          'Year on Year % Change', '10', '20', '25', '30', '40', '60', '70', '75', '80', '90', 'Safe']
+
+def shorthand_codes(shorthand, rows):
+    '''
+    Codes for a shorthand. Roughly half of the shorthands get numeric codes
+    (like SOC and SIC) and the rest geography style codes.
+
+    Parameters
+    ----------
+    shorthand : String
+        Shorthand of the csv file.
+    rows : Integer
+        Number of codes.
+
+    Returns
+    -------
+    codes : List of String
+    '''
+    if random.Random(shorthand).random() < 0.5:
+        return [str(1000 + i) for i in range(rows)]
+    return ['E%08d' % (i + 1) for i in range(rows)]
+
+def _value(rnd, x):
+    if rnd.random() < 0.08:
+        return '.'
+    return f'{x:.{rnd.choice([1, 2, 3])}f}'
+
+def write_sas_csv(path, shorthand, variable_short, type_of_value, rows, seed = 0):
+    '''
+    Writes one synthetic SAS csv.
+
+    Parameters
+    ----------
+    path : String
+        File to write.
+    shorthand : String
+        Shorthand of the csv file, e.g. 'occ1'.
+    variable_short : String
+        Variable shorthand from Published_table_breakdown, e.g. 'GPAY'.
+    type_of_value : String
+        'CVs' or 'Values'.
+    rows : Integer
+        Number of codes per employee type section.
+    seed : Numeric or String
+        Seed so that files can be regenerated identically.
+    '''
+    rnd = random.Random(f'{seed} {path}')
+    codes = shorthand_codes(shorthand, rows)
+    pence = variable_short in ('HE', 'HEXO')
+
+    with open(path, 'w', newline = '') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Annual Survey of Hours and Earnings'])
+        writer.writerow(['key1=' + [*Employee_key][0]])
+        writer.writerow([f'{shorthand} {variable_short}'])
+        writer.writerow([type_of_value])
+        writer.writerow([])
+        writer.writerow(HEADER)
+
+        for section, employee_type in enumerate(Employee_key):
+            if section:
+                writer.writerow(['key1=' + employee_type])
+                for _ in range(5):
+                    writer.writerow([])
+
+            for code in codes:
+                if rnd.random() < 0.05: # Some codes are missing from the data
+                    continue
+
+                population = '.' if rnd.random() < 0.03 else f'{rnd.randint(0, 400000):,}'
+
+                if type_of_value == 'CVs':
+                    values = [_value(rnd, rnd.uniform(0, 30)) for _ in range(12)]
+                else:
+                    base = rnd.uniform(500, 3000) if pence else rnd.uniform(5, 900)
+                    values = [_value(rnd, base * rnd.uniform(0.3, 2)) for _ in range(12)]
+
+                writer.writerow([f'Description, {code}', code, population, values[0], '.', values[1], '.', *values[2:],
+                                 rnd.choice([0, 1, 1, 1])])
+
+        writer.writerow(['End of report'])
+
+def generate_csvs(csv_path, shorthands, year, rows, variables = None, seed = 0):
+    '''
+    Writes the CVs and Values csv files for each shorthand and variable.
+
+    Parameters
+    ----------
+    csv_path : String
+        Folder to write to. Created if needed.
+    shorthands : List of String
+        Shorthands to write, e.g. Published_tables_data[table_name].
+    year : Numeric
+        Year in the file names.
+    rows : Integer
+        Number of codes per employee type section.
+    variables : List of String, optional
+        Variables from Published_table_breakdown. All if None.
+    seed : Numeric or String
+        Seed for the generated values.
+    '''
+    os.makedirs(csv_path, exist_ok = True)
+    variables = list(Published_table_breakdown) if variables is None else variables
+
+    for shorthand in shorthands:
+        for variable in variables:
+            variable_short = Published_table_breakdown[variable]
+            for type_of_value in ('CVs', 'Values'):
+                path = os.path.join(csv_path, f'{shorthand} - {variable_short} {year} - {type_of_value}.csv')
+                write_sas_csv(path, shorthand, variable_short, type_of_value, rows, seed)
+
+def table_shorthands(tables):
+    '''
+    Parameters
+    ----------
+    tables : List of String
+        Tables from Published_tables_data.
+
+    Returns
+    -------
+    shorthands : List of String
+        Every shorthand the tables read, without duplicates.
+    '''
+    return sorted({shorthand for table in tables for shorthand in Published_tables_data[table]})
+
+def write_template(path, shorthands, rows):
+    '''
+    Writes a synthetic template. The order tabs leave out the first code of
+    each shorthand and add one the csvs do not have, so both unmatched cases
+    are exercised.
+
+    Parameters
+    ----------
+    path : String
+        File to write.
+    shorthands : List of String
+        Shorthands of the table, one order tab each.
+    rows : Integer
+        Number of codes per employee type section in the csvs.
+    '''
+    workbook = opy.Workbook()
+    workbook.remove(workbook.active)
+    bold = Font(bold = True)
+    border = Border(bottom = Side(style = 'thin'))
+    right = Alignment(horizontal = 'right')
+
+    codes = []
+    for shorthand in shorthands:
+        sheet = workbook.create_sheet(shorthand)
+        sheet.append(['Code', 'Description', 'Order'])
+        for code in shorthand_codes(shorthand, rows + 1)[1:]:
+            codes.append(code)
+            sheet.append([int(code) if code.isdigit() else code, f'Description {code}', len(codes)])
+
+    for title in Employee_key.values():
+        sheet = workbook.create_sheet(title)
+        sheet['A1'] = 'Title'
+        sheet['A1'].font = bold
+        for column, heading in enumerate(HEADER[:-1], 1):
+            sheet.cell(row = 5, column = column, value = heading or 'Description').font = bold
+
+        for row, code in enumerate(codes, 6):
+            sheet.cell(row = row, column = 1, value = f'Description {code}')
+            sheet.cell(row = row, column = 2, value = code)
+            for column in range(3, len(HEADER)):
+                cell = sheet.cell(row = row, column = column)
+                cell.border = border
+                cell.number_format = '0.0'
+                cell.alignment = right
+
+    workbook.save(path)
+
+def write_footnotes(path):
+    '''
+    Writes a synthetic 'Footnotes template.xlsx'.
+
+    Parameters
+    ----------
+    path : String
+        File to write.
+    '''
+    workbook = opy.Workbook()
+    workbook.remove(workbook.active)
+    for number in range(1, 5):
+        sheet = workbook.create_sheet(f'FootNotes{number}')
+        sheet.append(['Footnote'])
+        for line in range(8):
+            sheet.append([f'Footnote {number}.{line}'])
+    workbook.save(path)
+
+def generate_inputs(folder, tables, year, rows, variables = None, seed = 0):
+    '''
+    Writes everything create_workbook reads for some tables: this year's and
+    last year's csvs, the templates and the footnotes.
+
+    Parameters
+    ----------
+    folder : String
+        Folder to write to.
+    tables : List of String
+        Tables from Published_tables_data.
+    year : Numeric
+        Current year.
+    rows : Integer
+        Number of codes per employee type section.
+    variables : List of String, optional
+        Variables from Published_table_breakdown. All if None.
+    seed : Numeric or String
+        Seed for the generated values.
+
+    Returns
+    -------
+    paths : Dictionary
+        csv_path, csv_previous_year_path, template_path and output_path.
+    '''
+    paths = {'csv_path': os.path.join(folder, str(year), 'CSV'),
+             'csv_previous_year_path': os.path.join(folder, str(year - 1), 'CSV'),
+             'template_path': os.path.join(folder, 'Templates'),
+             'output_path': os.path.join(folder, 'Outputs')}
+    shorthands = table_shorthands(tables)
+
+    generate_csvs(paths['csv_path'], shorthands, year, rows, variables, seed)
+    generate_csvs(paths['csv_previous_year_path'], shorthands, year - 1, rows, variables, seed)
+
+    os.makedirs(paths['template_path'], exist_ok = True)
+    for table in tables:
+        write_template(os.path.join(paths['template_path'], Published_tables_templates[table]), Published_tables_data[table], rows)
+    write_footnotes(os.path.join(paths['template_path'], 'Footnotes template.xlsx'))
+    os.makedirs(paths['output_path'], exist_ok = True)
+
+    return paths
@@ -7,13 +7,27 @@ import pandas as pd
 import os
 import numpy as np
 import openpyxl as opy
-from openpyxl.utils.dataframe import dataframe_to_rows
-import copy
 import collections.abc as c
-from openpyxl.styles import PatternFill
-from decimal import Decimal, ROUND_HALF_UP
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
 from ashe_table_formatting.pipeline_config import *
+from ashe_table_formatting.data_cache import get_dataset_cache
+from ashe_table_formatting.csv_index import get_csv_index
+from ashe_table_formatting.previous_year import load_previous_year, remember_previous_year
+from ashe_table_formatting.template_cache import load_template
+from ashe_table_formatting.template_order import get_template_order, template_order_frame
+from ashe_table_formatting.footnotes import FOOTNOTES_TEMPLATE, get_footnotes
+from ashe_table_formatting.rounding import round_half_up, rounded_pence_to_pounds
+from ashe_table_formatting.sas_csv import SOURCE_TEXT_COLUMNS, read_sas_sections
+from ashe_table_formatting.excel_writer import output_workbook
+from ashe_table_formatting.style_transfer import StyleMap
+from ashe_table_formatting.cv_banding import cv_bands, write_cv_sheet
+from ashe_table_formatting.stage_timings import get_stage_timings, timed
+from ashe_table_formatting.build_manifest import BuildManifest, workbook_inputs
+from ashe_table_formatting.save_queue import SaveQueue, run_save
+from ashe_table_formatting.columnar_export import export_filename, published_frame, with_suppressed, write_published_frame
+from ashe_table_formatting.table_model import VALUE, BLANK, UNSAFE, SUPPRESSED, SOURCE_TEXT_SUFFIX, table_from_frame, order_table, split_table, render_rows
 
 def all_keys(dict_obj):
     ''' This function generates all keys of
@@ -61,7 +75,7 @@ def deep_update(source, overrides):
             
     return source
 
-def get_files_from_list(csv_path, file_list):
+def get_files_from_list(csv_path, file_list, variable_year = None, type_of_value = None):
     '''
     This function a locates files from get files to a nested dictionary
 
@@ -71,31 +85,43 @@ def get_files_from_list(csv_path, file_list):
         Path to the input CSV files
     file_list : List of strings
         List of input file names
+    variable_year : String, optional
+        Only load files for this variable and year, e.g. 'GPAY 2021'.
+    type_of_value : String, optional
+        Only load files for this type of value, 'CVs' or 'Values'.
 
     Returns
     -------
     result : Nested Dictionary
         Nested dictionary containing all datasets used to create sub-table.
+        Datasets come from the dataset cache so each csv is only parsed once
+        per run.
 
     '''
-    os.chdir(csv_path)
     result = {}
+    dataset_cache = get_dataset_cache()
+    csv_index = get_csv_index(csv_path)
 
     for file_name in file_list:
-        datasets = find_datasets(csv_path, file_name)
-        
-    
-        for csv in datasets:
-            short = csv.replace('.csv', '') 
-            split = short.split(' - ')
-            data_file_dict = {split[0] : {split[1] : {split[2] : get_files(csv, file_name)}}}
-            deep_update(result, data_file_dict)
+        for key_variable, value_types in csv_index.get(file_name, {}).items():
+            if variable_year is not None and key_variable != variable_year:
+                continue
+            
+            for key_value, csv in value_types.items():
+                if type_of_value is not None and key_value != type_of_value:
+                    continue
+                
+                csv = os.path.join(csv_path, csv)
+                data_file_dict = {file_name : {key_variable : {key_value : dataset_cache.get(csv, file_name, get_files)}}}
+                deep_update(result, data_file_dict)
     
     return result
              
+@timed('get_files')
 def get_files(csv, file_name):
     '''
-    This function retrieves the reads csv files and manipulates them into dataframes.
+    This function reads a csv file and splits it into the nine employee type
+    dataframes, in a single pass over the file (see sas_csv).
 
     Parameters
     ----------
@@ -106,38 +132,17 @@ def get_files(csv, file_name):
 
     Returns
     -------
-    data : List of dataframes
-        9 Sorted dataframes with data from the 9 employee types.
+    data : Dictionary of dataframes
+        9 Sorted dataframes with data from the 9 employee types. The measure
+        columns are numeric with missing data as nan.
 
     '''
-    data = pd.read_csv(csv, header = 5, encoding = 'unicode_escape', thousands=',', on_bad_lines = 'warn', skip_blank_lines = False)
-    end_section_row = data[data.iloc[:, 0].str.contains("key1=") == True].index + 6
-    end_section_row = end_section_row.insert(0,0)
-    end_section_row = end_section_row.insert(9,data.index[-1])
-    
-    data = [data.iloc[end_section_row[i]:end_section_row[i+1],:] for i in range(0,9)]
-    data = [data[i].dropna() for i in range(0,9)]
-    data = [data[i].reset_index(drop=True) for i in range(0,9)]
-    [data[i].rename(columns = {data[i].columns[0]: 'Description'}, inplace = True) for i in range(0,9)]
-    [data[i].rename(columns = {data[i].columns[1]: 'Code'}, inplace = True) for i in range(0,9)]
-    [data[i].replace(',','', regex=True, inplace=True) for i in range(0,9)]
-    
-    for i in range(0,9):
-        data[i]['Code'] = data[i]['Code'].astype('str').replace(r'\.\d+$', '', regex=True)
-        data[i]['Code'] = data[i]['Code'].apply(str)
-        data[i]['Code'] = f'{file_name}' + ' ' + data[i]['Code'].astype(str)
-    
-    
-    key_list = [*Employee_key]
-    
-    data = {key_list[x]: data[x] for x in range(0,9)}
-
-    return data
+    return read_sas_sections(csv, file_name)
 
 def find_datasets(csv_path, file_name):
     '''
-    Finds all csv files in path and appends them to a list if they are
-    required by file_name.
+    Finds all csv files in path that belong to the shorthand file_name, using
+    the folder index rather than listing the folder again.
 
     Parameters
     ----------
@@ -154,16 +159,16 @@ def find_datasets(csv_path, file_name):
     '''
     csv_list =[]
     
-    for file in os.listdir(csv_path):
-        if file_name in file:
-            csv_list.append(file)
+    for value_types in get_csv_index(csv_path).get(file_name, {}).values():
+        csv_list.extend(value_types.values())
             
     return csv_list
 
 def get_order_of_variables(template_xlsx, table_file_names):
     '''
     Pulls out the order of varaibles from the templates. ORgansises input data
-    into a nested dictionary so that it can be called simply.
+    into a nested dictionary so that it can be called simply. The pipeline
+    uses the compiled version of this from get_template_order.
 
     Parameters
     ----------
@@ -178,36 +183,16 @@ def get_order_of_variables(template_xlsx, table_file_names):
         Dataframe of variable names and their order ready to merge with input
         data.
     '''
-    order = {}
-    for table in table_file_names:
-        sheet = template_xlsx[table]
-        col_key = sheet['A']
-        col_order = sheet['C']
-        list_key = []
-        list_order = []
-        
-        for col in col_key:
-            list_key.append(col.value)
-        
-        for col in col_order:
-            list_order.append(col.value)
-        
-        list_key = [f'{table}' + ' ' + str(x) for x in list_key]
-        
-        order = deep_update(order, dict(zip(list_key[1:], list_order[1:])))
-        
-        
-    ordered_list = list(order.items())
-    ordered_df = pd.DataFrame(ordered_list).rename(columns = {0: 'Code', 1: 'Order'})
-            
-    return ordered_df
+    return template_order_frame(template_xlsx, table_file_names)
 
+@timed('create_data_ready')
 def create_data_ready(csv_path, table_name, variable, type_of_value, employee_type, year):
     '''
     This function loads in the required datasets for a table and processes them
     ready to be used.
     
-    We must convert missing data to nans first before we can work with it.
+    Missing data is kept as nan while rounding and is flagged in the Table
+    that is returned, rather than being replaced with '.'.
 
     Parameters
     ----------
@@ -226,102 +211,134 @@ def create_data_ready(csv_path, table_name, variable, type_of_value, employee_ty
 
     Returns
     -------
-    data_needed : Dataframe
-        A single dataframe with the relevant data.
+    data_needed : Table
+        A single table with the relevant data.
 
     '''
     
     table_file_names = Published_tables_data[table_name] # Load table file names
-    table_data = get_files_from_list(csv_path, table_file_names) #get the input data ready
     variable_needed = Published_table_breakdown[variable] # get variable for loop
-    numeric_cols = ['population number', '10', '20', '25', '30', '40', '60', '70', '75', '80', '90']
-    percentiles = ['10', '20', '25', '30', '40', '60', '70', '75', '80', '90']
-    combined_data = []
+    table_data = get_files_from_list(csv_path, table_file_names, variable_needed + ' ' + f'{year}', type_of_value) #get the input data ready
+    
+    '''Get the data from the SAS input sheets, joined and deduplicated once rather than as each sheet is added'''
+    combined_data = [table_data[file][variable_needed + ' ' + f'{year}'][type_of_value][employee_type] for file in table_file_names]
+    data_needed = pd.concat(combined_data).drop_duplicates()
     
-    '''Get the data from the SAS input sheets'''
-    for file in table_file_names:
+    data_needed, text_columns = round_data(data_needed, variable, type_of_value)
+
+    return table_from_frame(data_needed, text_columns)
 
-        combined_data.append(table_data[file][variable_needed + ' ' + f'{year}'][type_of_value][employee_type])
-        data_needed = pd.concat(combined_data)
-        data_needed = data_needed.drop_duplicates()
+@timed('create_data_ready')
+def create_data_ready_all(csv_path, table_name, variable, type_of_value, year):
+    '''
+    Does create_data_ready for all nine employee types at once. The
+    employee types are stacked into one long frame with an employee type
+    column, so the duplicates are dropped and every column is rounded and
+    typed in one go, and the result is then split by employee type.
+
+    Parameters
+    ----------
+    csv_path : String
+        Path to input data.
+    table_name : String
+        Name of table to get data for.
+    variable : String
+        Name of variable to get data for.
+    type_of_value : String
+        Type of value to get data for.
+    year : Numeric
+        Current Year.
+
+    Returns
+    -------
+    data_list : List of Tables
+        One table per employee type in Employee_key order, each the same as
+        create_data_ready gives.
+
+    '''
+    table_file_names = Published_tables_data[table_name] # Load table file names
+    variable_needed = Published_table_breakdown[variable] # get variable for loop
+    table_data = get_files_from_list(csv_path, table_file_names, variable_needed + ' ' + f'{year}', type_of_value) #get the input data ready
+    employee_list = [*Employee_key] # A list of the employee types
+    
+    '''Stack every employee type of every SAS input sheet, employee type first so each type's rows stay together'''
+    combined_data = [table_data[file][variable_needed + ' ' + f'{year}'][type_of_value][employee_type].assign(**{'Employee type': i})
+                     for i, employee_type in enumerate(employee_list) for file in table_file_names]
+    data_needed = pd.concat(combined_data).drop_duplicates() # Duplicates only within an employee type, as the column is compared too
+    employee_types = data_needed.pop('Employee type').to_numpy()
     
-    '''Process the input data'''
-    data_needed['population number'] = data_needed['population number'].replace(r'\.(?=\s|$)','0', regex=True)
-    data_needed[numeric_cols] = data_needed[numeric_cols].apply(lambda x : pd.to_numeric(x, errors='coerce'))
+    data_needed, text_columns = round_data(data_needed, variable, type_of_value)
+    
+    bounds = np.searchsorted(employee_types, np.arange(len(employee_list) + 1))
+    return split_table(table_from_frame(data_needed, text_columns), bounds)
+
+def round_data(data_needed, variable, type_of_value):
+    '''
+    Processes the SAS input data for publication, rounding each measure and
+    converting hourly pay from pence to pounds.
+
+    Parameters
+    ----------
+    data_needed : Dataframe
+        SAS input data, the measure columns numeric with missing data as nan.
+    variable : String
+        Name of variable the data is for.
+    type_of_value : String
+        Type of value the data is for.
+
+    Returns
+    -------
+    data_needed : Dataframe
+        Rounded data.
+    text_columns : List of String
+        Columns whose numbers are published as text.
+
+    '''
+    percentiles = ['10', '20', '25', '30', '40', '60', '70', '75', '80', '90']
+    
+    '''Process the input data, the measure columns are already numeric with missing data as nan'''
+    data_needed['population number'] = data_needed['population number'].fillna(0) # SAS gives '.' for an empty population
     
     for i in percentiles:
-        data_needed[i] = data_needed[i].map(lambda x: Decimal(str(x)).quantize(Decimal('.1'), rounding=ROUND_HALF_UP)) # Round our percentiles to 1dp
+        data_needed[i] = round_half_up(data_needed[i], 1) # Round our percentiles to 1dp
     
     if type_of_value == 'Values':
         data_needed['population number'] = data_needed['population number'] / 1000
-        data_needed['population number'] = data_needed['population number'].map(lambda x: Decimal(str(x)).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
-    
-    data_needed['Mean'] = data_needed['Mean'].replace(r'\.(?=\s|$)', np.nan, regex=True)
-    data_needed['Mean'] = pd.to_numeric(data_needed['Mean']).map(lambda x: Decimal(str(x)).quantize(Decimal('.1'), rounding=ROUND_HALF_UP))
-    data_needed['Mean'] = data_needed['Mean'].replace(np.nan, '.', regex=True)
+        data_needed['population number'] = round_half_up(data_needed['population number'], 0)
     
-    data_needed['Median'] = data_needed['Median'].replace(r'\.(?=\s|$)', np.nan, regex=True)
+    data_needed['Mean'] = round_half_up(data_needed['Mean'], 1)
+    text_columns = []
     
     # Convert pence to pounds for hourly datasets    
-    if variable == 'Hourly Pay' or variable == 'Hourly pay - Excluding overtime':
-        if type_of_value == 'Values':
-            print('Converting pence to pound')
-            cols_pence = ['Median', '10', '20', '25', '30', '40', '60', '70', '75', '80', '90']
-            for i in cols_pence:
-                try:
-                    data_needed[i] = pd.to_numeric(data_needed[i].map(lambda x: Decimal(str(x/100)).quantize(Decimal('.10'), rounding=ROUND_HALF_UP)))
-                except(TypeError):
-                    data_needed[i] = pd.to_numeric(data_needed[i], errors='ignore')
-                    data_needed[i] = data_needed[i].map(lambda x: Decimal(str(x/100)).quantize(Decimal('.10'), rounding=ROUND_HALF_UP))
+    if (variable == 'Hourly Pay' or variable == 'Hourly pay - Excluding overtime') and type_of_value == 'Values':
+        print('Converting pence to pound')
+        data_needed['Median'] = round_half_up(data_needed['Median'] / 100, 2)
+        
+        for i in percentiles:
+            data_needed[i] = rounded_pence_to_pounds(data_needed[i]) # Percentiles were rounded to 1dp in pence first
+    elif variable == 'Hourly Pay' or variable == 'Hourly pay - Excluding overtime':
+        text_columns = ['Median'] # Hourly CV medians have always been published as the SAS text, which keeps them out of the CV banding
     else:           
-        data_needed['Median'] = pd.to_numeric(data_needed['Median']).map(lambda x: Decimal(str(x)).quantize(Decimal('.1'), rounding=ROUND_HALF_UP))
+        data_needed['Median'] = round_half_up(data_needed['Median'], 1)
     
-    data_needed['Median'] = data_needed['Median'].replace(np.nan, '.', regex=True) # Replace missing data with '.' for median col
-    
-    for col in numeric_cols:
-        data_needed[col] = pd.to_numeric(data_needed[col], errors = 'coerce')
-        data_needed[col] = data_needed[col].replace(np.nan, '.', regex=True) # Replace missing data with '.'
+    data_needed = data_needed.drop(columns = [column + SOURCE_TEXT_SUFFIX for column in SOURCE_TEXT_COLUMNS if column not in text_columns], errors = 'ignore')
 
-    return data_needed
+    return data_needed, text_columns
 
+@timed('copy_sheet_style')
 def copy_sheet_style(ws_template: opy.Workbook.worksheets, ws_published: opy.Workbook.worksheets, isvalmain):
     '''
     Function copies cell styles from a template worksheet to the output
     worksheet. Has a seperate function for the value main sheet that requires
-    x where the CV is greater than 20.
+    x where the CV is greater than 20. Styles are assigned by id through a
+    StyleMap, so each distinct style is copied once rather than per cell.
     
     Parameters
     ----------
     ws_template -- Loaded worksheet with desired cell styles.
     ws_published -- Worksheet to receive the cell style.
     '''
-    if isvalmain == 'valmain':
-        for row in (ws_template.rows):
-            for cell in row:
-                new_cell = ws_published.cell(row=cell.row, column=cell.col_idx)
-                
-                if cell.has_style:
-                    new_cell.font = copy.copy(cell.font)
-                    new_cell.border = copy.copy(cell.border)
-                    new_cell.fill = copy.copy(cell.fill)
-                    new_cell.number_format = copy.copy(cell.number_format)
-                    new_cell.protection = copy.copy(cell.protection)
-                    new_cell.alignment = copy.copy(cell.alignment)
-                    
-                if cell.col_idx > 2 and cell.value == 'x':
-                    new_cell.value = 'x'
-    else:
-        for row in (ws_template.rows):
-            for cell in row:
-                new_cell = ws_published.cell(row=cell.row, column=cell.col_idx)
-                
-                if cell.has_style:
-                    new_cell.font = copy.copy(cell.font)
-                    new_cell.border = copy.copy(cell.border)
-                    new_cell.fill = copy.copy(cell.fill)
-                    new_cell.number_format = copy.copy(cell.number_format)
-                    new_cell.protection = copy.copy(cell.protection)
-                    new_cell.alignment = copy.copy(cell.alignment)   
+    StyleMap(ws_template).apply(ws_published, copy_x = isvalmain == 'valmain')
             
 def get_workbook_name(template_name, table_name, table_variable, value_type, year):
     '''
@@ -354,6 +371,35 @@ def get_workbook_name(template_name, table_name, table_variable, value_type, yea
         complete_name = name + table_sub_number + 'b' + ' ' + table_variable
     
     return complete_name
+
+def get_output_files(output_path, template_name, workbook_name_cv, workbook_name_val, year):
+    '''
+    This function gives the file names a workbook is saved as.
+
+    Parameters
+    ----------
+    output_path : String
+        Output folder of the table.
+    template_name : String
+        Template name of table being procesed.
+    workbook_name_cv : String
+        Name of the CV workbook, from get_workbook_name.
+    workbook_name_val : String
+        Name of the Values workbook, from get_workbook_name.
+    year : Numeric
+        Current year.
+
+    Returns
+    -------
+    output_files : Dictionary
+        File name of the CV unsafe, Values unsafe, Values safe, CV main and
+        Values main outputs.
+    '''
+    return {'cv_unsafe' : output_path + '/' + template_name + ' ' + workbook_name_cv + ' ' + f'{year}' + ' ' +  'CV' + ' ' + 'Unsafe' + '.xlsx',
+            'val_unsafe' : output_path + '/' + template_name + ' ' + workbook_name_val + ' ' + f'{year}' + ' ' + 'Unsafe' + '.xlsx',
+            'val_safe' : output_path + '/' + template_name + ' ' + workbook_name_val + ' ' + f'{year}' + ' ' + 'Safe' + '.xlsx',
+            'cv_main' : output_path + '/' + template_name + ' ' + workbook_name_cv + ' ' + f'{year}' +  ' ' +  'CV'  + '.xlsx',
+            'val_main' : output_path + '/' + template_name + ' ' + workbook_name_val + ' ' + f'{year}' + '.xlsx'}
   
 def compare_year_and_previous_year(data, data_py):
     '''
@@ -362,30 +408,37 @@ def compare_year_and_previous_year(data, data_py):
 
     Parameters
     ----------
-    data : Dataframe
-        Dataframe of this years table data - Main.
-    data_py : Dataframe
-        Dataframe of last years table data - Main.
+    data : Table
+        Table of this years table data - Main.
+    data_py : Table
+        Table of last years Median and Mean, in any order. Rows are matched
+        to this year by Code.
 
     Returns
     -------
-    data : Dataframe
-        Completed dataframe with the comparisons loaded.
+    data : Table
+        Version of the table with the comparisons loaded.
 
     '''
-    data['Median'] = pd.to_numeric(data['Median'], errors='coerce')
-    data['Mean'] = pd.to_numeric(data['Mean'], errors='coerce')
-    data_py['Median'] = pd.to_numeric(data_py['Median'], errors='coerce')
-    data_py['Mean'] = pd.to_numeric(data_py['Mean'], errors='coerce')
+    flags = data.flags.to_numpy(copy = True)
+    values = data.values.copy() # The other versions of the table share its values
     
-    if data['Code'].equals(data_py['Code']) == True:
-        data['Year on Year % Change'] = percentage_change(data_py['Median'], data['Median'])
-        data['Year on Year % Change.1'] = percentage_change(data_py['Mean'], data['Mean'])
-        
-        data['Year on Year % Change'] = data['Year on Year % Change'].replace(np.nan, '')
-        data['Year on Year % Change.1'] = data['Year on Year % Change.1'].replace(np.nan, '')
+    for col in ['Median', 'Mean']:
+        j = data.flags.columns.get_loc(col)
+        flags[flags[:, j] != VALUE, j] = BLANK # Anything but a number is left empty on the main sheet
+    
+    '''Line last year up with this year by Code, codes new this year have no comparison'''
+    previous = data_py.values[['Median', 'Mean']].where(data_py.flags[['Median', 'Mean']] == VALUE)
+    previous.index = data_py.keys['Code']
+    previous = previous[~previous.index.duplicated()].reindex(data.keys['Code'])
+    previous.index = values.index
+    
+    for change_col, col in [('Year on Year % Change', 'Median'), ('Year on Year % Change.1', 'Mean')]:
+        change = percentage_change(previous[col], values[col].where(data.flags[col] == VALUE))
+        values[change_col] = change
+        flags[:, data.flags.columns.get_loc(change_col)] = np.where(change.isna(), BLANK, VALUE)
         
-    return data
+    return data.with_flags(flags, values)
 
 def percentage_change(col1,col2):
     '''
@@ -405,85 +458,124 @@ def percentage_change(col1,col2):
 
     '''
     df_col = (((col2 - col1) / col1) * 100)
-    
-    try:
-        df_col = df_col.map(lambda x: Decimal(str(x)).quantize(Decimal('.1'), rounding=ROUND_HALF_UP))
-    except:
-        df_col = df_col.replace(np.inf, np.nan)
-        df_col = df_col.map(lambda x: Decimal(str(x)).quantize(Decimal('.1'), rounding=ROUND_HALF_UP))
+    df_col = df_col.replace([np.inf, -np.inf], np.nan) # No change can be given from a zero last year
+    df_col = pd.Series(round_half_up(df_col, 1), index = df_col.index)
 
     return df_col
 
+@timed('apply_order')
 def apply_order(data, template_order):
     '''
-    Merges the prepared input data to the order data from the template. Any
-    missing data that is in the template but not in the SAS input data is
-    labeled as :
+    Puts the prepared input data in the order of the template. Any missing
+    data that is in the template but not in the SAS input data is flagged
+    NO_DATA, shown as :
 
     Parameters
     ----------
-    data : Dataframe
-        Datatrame of the prepared input data.
-    template_order : Dataframe
-        Dataframe of the corresponding codes and order for input data.
+    data : Table
+        Table of the prepared input data.
+    template_order : TemplateOrder
+        Compiled codes and order of the template.
 
     Returns
     -------
-    data : Dataframe
-        Merged dataframe with input data and order.
+    data : Table
+        Table of input data in template order.
 
     '''
-    cols_to_empty = ['Median','Year on Year % Change', 'Mean', 'Year on Year % Change.1', '10', '20', '25', '30', '40', '60', '70', '75', '80', '90']
-    data = pd.merge(template_order, data, how= 'outer', on = 'Code')
-    data = data[data['Order'].notna()]
-    data = data.sort_values('Order')
-    data = data.fillna(':')
-    data[cols_to_empty] = data[cols_to_empty].replace(':', '')
-    return data
+    return template_order.apply(data)
 
 def make_safe(data):
     '''
-    Remove unsafe data frame a dataframe looking for 0 in the safe column
+    Remove unsafe data from a table looking for 0 in the safe column. Unsafe
+    rows are flagged UNSAFE, shown as ..
 
     Parameters
     ----------
-    data : Dataframe
-        Datafeame to make safe.
+    data : Table
+        Table to make safe.
 
     Returns
     -------
-    data : Dataframe
-        Safe Dataframe.
+    data : Table
+        Safe version of the table, sharing its values.
 
     '''
-    cols_to_empty = ['Median','Year on Year % Change', 'Mean', 'Year on Year % Change.1', '10', '20', '25', '30', '40', '60', '70', '75', '80', '90']
-    data = data.mask(data['Safe'] == 0, np.nan)
-    data = data.fillna('..')
-    data[cols_to_empty] = data[cols_to_empty].replace('..', '')
-    return data
+    return data.with_flags(data.flagged_rows(data.keys['Safe'] == 0, UNSAFE))
 
-def drop_cols(data):
+def suppress_small_populations(data, columns_to_mask):
     '''
-    Drops columns that are not published
+    Flags the columns_to_mask of rows with a population of 3 or less as
+    SUPPRESSED, shown as x
 
     Parameters
     ----------
-    data : Dataframe
-        Dataframe to be published but has excess columns.
+    data : Table
+        Table of Values.
+    columns_to_mask : List of String
+        Columns to suppress.
 
     Returns
     -------
-    data : Dataframe
-        Dataframe to be published with cols removed.
+    data : Table
+        Suppressed version of the table, sharing its values.
+
+    '''
+    small = (data.values['population number'] <= 3) & (data.flags['population number'] == VALUE)
+    return data.with_flags(data.flagged_cells(small, columns_to_mask, SUPPRESSED))
+
+def load_workbook_data(csv_path, csv_previous_year_path, table_name, table_variable, year, threads = Data_load_threads):
+    '''
+    Loads the CVs, Values and previous year Median and Mean for the nine
+    employee types of a sub-table. With more than one thread the three are
+    loaded on a thread pool, which overlaps the waits on slow network
+    drives.
+
+    Parameters
+    ----------
+    csv_path : String
+        Path to CSV.
+    csv_previous_year_path : String
+        Path to previous years CSV.
+    table_name : String
+        Table to process.
+    table_variable : String
+        Variable to process.
+    year : numeric
+        Current Year.
+    threads : Integer
+        Number of threads to load with. 1 loads serially.
 
+    Returns
+    -------
+    data_list_cv, data_list_val, data_list_val_py : Lists of Tables
+        CVs, Values and previous year Values, in Employee_key order. The
+        previous year only has Median and Mean (see load_previous_year) and
+        is not in template order.
     '''
-    data.drop('Code', inplace = True, axis = 1)
-    data.drop('Order', inplace = True, axis = 1)
-    data.drop('Description', inplace = True, axis = 1)
-    data.drop('Safe', inplace = True, axis = 1)
-    return data
+    def load(type_of_value):
+        print('Loading ' + f'{year}' + ' ' + table_variable + ' ' + type_of_value)
+        return create_data_ready_all(csv_path, table_name, table_variable, type_of_value, year) # All nine employee types at once
+    
+    def load_py():
+        print('Loading ' + f'{year-1}' + ' ' + table_variable + ' Median and Mean for comparison')
+        return load_previous_year(csv_previous_year_path, table_name, table_variable, year-1)
+    
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers = threads) as executor:
+            data_py = executor.submit(load_py)
+            data_cv = executor.submit(load, 'CVs')
+            data_list_val = load('Values')
+            data_list_cv, data_list_val_py = data_cv.result(), data_py.result()
+    else:
+        data_list_cv = load('CVs')
+        data_list_val = load('Values')
+        data_list_val_py = load_py()
+    
+    remember_previous_year(csv_path, table_name, table_variable, year, data_list_val) # For the comparison of the year after
+    return data_list_cv, data_list_val, data_list_val_py
 
-def create_workbook(csv_path, csv_previous_year_path, template_path, output_path, table_name, table_variable, year):
+def create_workbook(csv_path, csv_previous_year_path, template_path, output_path, table_name, table_variable, year, force = False, save_queue = None, incremental = Incremental_rebuild):
     '''
     Function creates a workbooks for a subtable. This will have 5 excel
     outputs unsafe, safe and main for Values and Unsafe and main for CV.
@@ -505,28 +597,62 @@ def create_workbook(csv_path, csv_previous_year_path, template_path, output_path
        Variable to process.
     year : numeric
         Current Year.
+    force : Boolean
+        Build the workbook even if the build manifest shows it is up to date.
+    save_queue : SaveQueue, optional
+        Queue to hand the saves to. The workbooks are saved before returning
+        if None.
+    incremental : Boolean
+        Skip the workbook if the build manifest shows it is up to date, and
+        record what it was built from. Defaults to Incremental_rebuild.
 
     Returns
     -------
-    5 Workbooks.
+    built : Boolean
+        False if the workbook was up to date and skipped. Otherwise the 5
+        Workbooks are saved, or queued for saving, and True returned.
 
     '''
     
+    timings = get_stage_timings()
+    timings.context = (table_name, table_variable) # Stages below are recorded against this workbook
+    
+    '''Work out the output names first, so an up to date workbook can be skipped before anything is loaded'''
+    template_name = Published_tables_templates[table_name].split(' template')[0] # Getting the name of the table from the template
+    workbook_name_cv = get_workbook_name(template_name, table_name, table_variable, 'CVs', year) # Get CV workbook name for saving
+    workbook_name_val = get_workbook_name(template_name, table_name, table_variable, 'Values', year) # Get Val workbook name for saving
+    output_files = get_output_files(output_path + '/' + table_name, template_name, workbook_name_cv, workbook_name_val, year)
+    
+    '''Typed copies of the main sheets, one file per value type and employee type, if turned on in the config'''
+    export_files = {}
+    if Columnar_export:
+        for sheet in Employee_key.values():
+            export_files[('CVs', sheet)] = export_filename(output_path + '/' + table_name, template_name + ' ' + workbook_name_cv, year, sheet, Columnar_export)
+            export_files[('Values', sheet)] = export_filename(output_path + '/' + table_name, template_name + ' ' + workbook_name_val, year, sheet, Columnar_export)
+    
+    if incremental:
+        with timings.stage('check_manifest'):
+            manifest = BuildManifest(output_path, table_name, table_variable)
+            inputs = workbook_inputs(csv_path, csv_previous_year_path, template_path, table_name, table_variable, year)
+            up_to_date = not force and manifest.is_current(inputs, list(output_files.values()) + list(export_files.values()))
+        if up_to_date:
+            print('Up to date - skipping ' + table_name + ' ' + table_variable)
+            timings.context = (None, None)
+            return False
+    
     '''Create sub directory in output path for table name'''
-    if not os.path.exists(output_path + '/' + table_name):
-        os.mkdir(output_path + '/' + table_name)
+    os.makedirs(output_path + '/' + table_name, exist_ok = True) # Other workers may be creating the same table
     output_path = output_path + '/' + table_name
     
-    '''Load up templates ready to be filled with data'''
-    template_cv_main = opy.load_workbook(filename = template_path + '/' + Published_tables_templates[table_name]) #This version will have x where cv >20 to transfer to value sheet
-    template_val_main = opy.load_workbook(filename = template_path + '/' + Published_tables_templates[table_name])
-    template_cv_unsafe = opy.load_workbook(filename = template_path + '/' + Published_tables_templates[table_name])
-    template_val_unsafe = opy.load_workbook(filename = template_path + '/' + Published_tables_templates[table_name])
-    template_val_safe = opy.load_workbook(filename = template_path + '/' + Published_tables_templates[table_name])
-    template_cv_main_final = opy.load_workbook(filename = template_path + '/' + Published_tables_templates[table_name]) # A special final version that will not have x where cv >20
+    '''Load up templates ready to be filled with data, the template file is only parsed once per process and without the data tabs'''
+    drop_list = Published_tables_data[table_name] # The tabs on the template that need to be dropped for publication
+    with timings.stage('load_template'):
+        template_cv_main = load_template(template_path + '/' + Published_tables_templates[table_name], drop_list) #This version will have x where cv >20 to transfer to value sheet
+        template_val_main = load_template(template_path + '/' + Published_tables_templates[table_name], drop_list)
+        template_cv_main_final = load_template(template_path + '/' + Published_tables_templates[table_name], drop_list) # A special final version that will not have x where cv >20
     
     '''Load up the correct footnote'''
-    template_footnote = pd.read_excel(template_path + '/' + 'Footnotes template.xlsx', sheet_name = ['FootNotes1', 'FootNotes2', 'FootNotes3', 'FootNotes4'])
+    template_footnote = get_footnotes(template_path + '/' + FOOTNOTES_TEMPLATE, Persist_footnotes) # Read once per process
     if table_variable == 'Annual pay - Gross':
         footnote = template_footnote['FootNotes2']
     if table_variable == 'Overtime pay':
@@ -539,40 +665,30 @@ def create_workbook(csv_path, csv_previous_year_path, template_path, output_path
     '''Gather variables for the loops and for naming the workbooks'''
     template_sheet_names = list(Employee_key.values()) # The tabs on the sheet that will be filled with data.
     employee_list = [*Employee_key] # A list of the employee types
-    template_name = Published_tables_templates[table_name].split(' template')[0] # Getting the name of the table from the template
-    workbook_name_cv = get_workbook_name(template_name, table_name, table_variable, 'CVs', year) # Get CV workbook name for saving
-    workbook_name_val = get_workbook_name(template_name, table_name, table_variable, 'Values', year) # Get Val workbook name for saving
-    drop_list = Published_tables_data[table_name] # The tabs on the template that need to be dropped for publication
+    footnote_rows = [[footnote['Footnote'].iat[i]] for i in range(0,6)] # Footnotes go in column A under the data
     columns_to_mask = ['population number','Year on Year % Change', 'Year on Year % Change.1', '10', '20', '25', '30', '40', '60', '70', '75', '80', '90'] # Columns that need to be x when val population <3
     
     '''Get order from template'''
-    template_order = get_order_of_variables(template_cv_main, Published_tables_data[table_name]) # Get the codes and order from the template
-    max_order = template_order['Order'].max() # Find out which is the max order (for working out where the footnotes go)
+    template_order = get_template_order(template_path + '/' + Published_tables_templates[table_name], Published_tables_data[table_name], Persist_template_order) # Compiled once per template
+    max_order = template_order.frame['Order'].max() # Find out which is the max order (for working out where the footnotes go)
+    
+    '''Unsafe and safe outputs are written sheet by sheet, streamed from the template unless turned off in the config'''
+    with timings.stage('load_template'):
+        output_cv_unsafe = output_workbook(template_path + '/' + Published_tables_templates[table_name], drop_list, Stream_unsafe_safe_outputs)
+        output_val_unsafe = output_workbook(template_path + '/' + Published_tables_templates[table_name], drop_list, Stream_unsafe_safe_outputs)
+        output_val_safe = output_workbook(template_path + '/' + Published_tables_templates[table_name], drop_list, Stream_unsafe_safe_outputs)
     
     '''Begin creating sub tables'''
     print('Doing ' + table_name + ' ' + table_variable)
     print('Loading data')
     
-    data_list_cv = []
-    data_list_val = []
-    data_list_val_py = []
-    
     '''Load data and round as required'''
-    for i in range (0,9):
-        print('Loading ' + table_variable + ' ' + f'{employee_list[i]}' + ' CVs')
-        data_list_cv.append(create_data_ready(csv_path, table_name, table_variable, 'CVs', employee_list[i], year))
-        
-        print('     Loading ' + table_variable + ' ' + f'{employee_list[i]}' + ' Values')
-        data_list_val.append(create_data_ready(csv_path, table_name, table_variable, 'Values', employee_list[i], year))
-        
-        print('         Loading previous year ' + table_variable + ' ' + f'{employee_list[i]}')
-        data_list_val_py.append(create_data_ready(csv_previous_year_path, table_name, table_variable, 'Values', employee_list[i], year-1))
-        
-        data_val_main_masked = data_list_val.copy()
-        
+    data_list_cv, data_list_val, data_list_val_py = load_workbook_data(csv_path, csv_previous_year_path, table_name, table_variable, year)
+    
     print('Data_loaded')
     
     '''Loop through employee type to process and write data'''
+    exports = {}
     for i, sheet in enumerate(template_sheet_names):
         
         '''Apply Ordering from template'''
@@ -580,252 +696,112 @@ def create_workbook(csv_path, csv_previous_year_path, template_path, output_path
         
         data_cv =  apply_order(data_list_cv[i], template_order)
         data_val =  apply_order(data_list_val[i], template_order)
-        data_val_py =  apply_order(data_list_val_py[i], template_order)
-        
-        '''A Special version is needed for values main where x is applied across rows with population <=3 '''
-        data_val_main_masked[i][columns_to_mask] = data_val_main_masked[i][columns_to_mask].mask(data_val_main_masked[i]['population number'] <= 3, 'x')
-        data_val_main = apply_order(data_val_main_masked[i], template_order)        
-        
-        '''Make Copies'''
-        data_cv_unsafe = data_cv.copy()
-        data_val_unsafe = data_val.copy()
-        data_val_safe = data_val.copy()
-        data_cv_main = data_cv.copy()
-        data_val_main = data_val_main.copy()
-        
-        '''Add comparisons'''
-        data_val_main = compare_year_and_previous_year(data_val_main, data_val_py)
-        data_val_main = data_val_main.sort_values('Order')
-        
-        '''Do safe'''
-        data_val_safe = make_safe(data_val_safe)   
-        
-        data_val_safe = drop_cols(data_val_safe)
-        
-        rows_val_safe = dataframe_to_rows(data_val_safe, index=False, header=False)
-        
-        '''Do unsafe'''    
-        data_cv_unsafe = drop_cols(data_cv_unsafe)
-        data_val_unsafe = drop_cols(data_val_unsafe)
-        
-        rows_cv_unsafe = dataframe_to_rows(data_cv_unsafe, index=False, header=False)
-        rows_val_unsafe = dataframe_to_rows(data_val_unsafe, index=False, header=False)
-        
-        '''Do main'''
-        
-        data_cv_main = make_safe(data_cv_main)
-        data_val_main = make_safe(data_val_main)
-        
-        data_cv_main = drop_cols(data_cv_main)
-        data_val_main = drop_cols(data_val_main)
-        
-        data_cv_main = data_cv_main.apply(lambda x: pd.to_numeric(x, errors='ignore'))
-        data_val_main = data_val_main.apply(lambda x: pd.to_numeric(x, errors='ignore'))
-        
-        rows_cv_main = dataframe_to_rows(data_cv_main, index=False, header=False)
-        rows_val_main = dataframe_to_rows(data_val_main, index=False, header=False)
+        data_val_py = data_list_val_py[i] # Joined by Code in the comparison, so not ordered
         
+        with timings.stage('render'):
+            '''Every other version only changes the flags, the ordered values are shared'''
+            data_val_safe = make_safe(data_val)
+            data_cv_main = make_safe(data_cv)
+
+            '''A Special version is needed for values main where x is applied across rows with population <=3 '''
+            data_val_main = suppress_small_populations(data_val, columns_to_mask)
+            data_val_main = compare_year_and_previous_year(data_val_main, data_val_py)
+            data_val_main = make_safe(data_val_main)
+
+            rows_cv_unsafe = render_rows(data_cv)
+            rows_val_unsafe = render_rows(data_val)
+            rows_val_safe = render_rows(data_val_safe)
+            rows_cv_main = render_rows(data_cv_main, numeric_text = True)
+            rows_val_main = render_rows(data_val_main, numeric_text = True)
+            bands_cv_main, over_limit_cv_main, missing_cv_main = cv_bands(data_cv_main, numeric_text = True)
+
         '''Create a spare CV for the final version (without x's)'''
-        rows_cv_main_final = dataframe_to_rows(data_cv_main, index=False, header=False)
+        rows_cv_main_final = rows_cv_main
         
+        if Columnar_export:
+            '''Export the main sheets as published, the CV x's are also copied onto the Values'''
+            cv_x = pd.DataFrame(over_limit_cv_main | missing_cv_main, columns = data_cv_main.flags.columns)
+            cv_missing = pd.DataFrame(missing_cv_main, columns = data_cv_main.flags.columns)
+            exports[('Values', sheet)] = published_frame(with_suppressed(data_val_main, cv_x))
+            exports[('CVs', sheet)] = published_frame(with_suppressed(data_cv_main, cv_missing))
+
         '''Print unsafe to excel'''
-        sheet_active_cv_unsafe = template_cv_unsafe[sheet]
-        sheet_active_cv_unsafe['A1'] = workbook_name_cv
-        
-        sheet_active_val_unsafe = template_val_unsafe[sheet]
-        sheet_active_val_unsafe['A1'] = workbook_name_val
-        
-        for r_idx, row in enumerate(rows_cv_unsafe, 1):
-            for c_idx, value in enumerate(row, 1):
-                sheet_active_cv_unsafe.cell(row=r_idx + 5, column=c_idx + 2, value=value) # print data for CV
-                
-        for i in range(0,6):
-            sheet_active_cv_unsafe.cell(row= max_order + 5 + 1 + i , column= 1, value = footnote['Footnote'].iat[i]) # add footnote     
-                
-        for r_idx, row in enumerate(rows_val_unsafe, 1):
-            for c_idx, value in enumerate(row, 1):
-                sheet_active_val_unsafe.cell(row=r_idx + 5, column=c_idx + 2, value=value) # print data for Value
-                
-        for i in range(0,6):
-            sheet_active_val_unsafe.cell(row=max_order + 5 + 1 + i , column= 1, value = footnote['Footnote'].iat[i]) # add footnote 
-        
-        copy_sheet_style(template_cv_main[sheet], sheet_active_cv_unsafe, 'notvalmain') # Copy template formatting to CV
-        copy_sheet_style(template_cv_main[sheet], sheet_active_val_unsafe, 'notvalmain') # Copy template formatting to Value
-       
-        print('Done ' + ' ' + sheet + ' Unsafe')
-        
-        '''Print safe to excel'''
-        sheet_active_val_safe = template_val_safe[sheet]
-        sheet_active_val_safe['A1'] = workbook_name_val
-        
-        for r_idx, row in enumerate(rows_val_safe, 1):
-            for c_idx, value in enumerate(row, 1):
-                sheet_active_val_safe.cell(row=r_idx + 5, column=c_idx + 2, value=value)
-                
-        for i in range(0,6):
-            sheet_active_val_safe.cell(row=max_order + 5 + 1 + i , column= 1, value = footnote['Footnote'].iat[i])
-        
-        copy_sheet_style(template_cv_main[sheet], sheet_active_val_safe, 'notvalmain')
-        print('Done ' + ' ' + sheet + ' Safe')
+        with timings.stage('write_unsafe_safe'):
+            output_cv_unsafe.write_sheet(sheet, [(1, 1, [[workbook_name_cv]]), (6, 3, rows_cv_unsafe), (int(max_order) + 6, 1, footnote_rows)])
+            output_val_unsafe.write_sheet(sheet, [(1, 1, [[workbook_name_val]]), (6, 3, rows_val_unsafe), (int(max_order) + 6, 1, footnote_rows)])
+
+            print('Done ' + ' ' + sheet + ' Unsafe')
+
+            '''Print safe to excel'''
+            output_val_safe.write_sheet(sheet, [(1, 1, [[workbook_name_val]]), (6, 3, rows_val_safe), (int(max_order) + 6, 1, footnote_rows)])
+            print('Done ' + ' ' + sheet + ' Safe')
         
-        '''Print main to excel'''
-        sheet_active_cv_main = template_cv_main[sheet]
-        sheet_active_cv_main['A1'] = workbook_name_cv
+        with timings.stage('write_main'):
+            '''Print main to excel'''
+            sheet_active_cv_main = template_cv_main[sheet]
+            sheet_active_cv_main['A1'] = workbook_name_cv
         
-        sheet_active_val_main = template_val_main[sheet]
-        sheet_active_val_main['A1'] = workbook_name_val
+            sheet_active_val_main = template_val_main[sheet]
+            sheet_active_val_main['A1'] = workbook_name_val
 
-        print('Done ' + ' ' + sheet + ' Main')
-        
-        '''Printing CVs main and formatting'''
-        light_blue = PatternFill(patternType = 'gray0625', start_color = '00FFFF', end_color = '00FFFF', fill_type= 'solid')
-        dark_blue = PatternFill(start_color = '33CCCC', end_color = '00FFFF', fill_type= 'solid')
+            print('Done ' + ' ' + sheet + ' Main')
         
-        for r_idx, row in enumerate(rows_cv_main, 1):
-            for c_idx, value in enumerate(row, 1):
-                try:
-                    if sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value=value).value == 0: 
-                        sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value=value)
+            '''Printing CVs main and formatting'''
+            write_cv_sheet(sheet_active_cv_main, 6, 3, rows_cv_main, bands_cv_main, over_limit_cv_main | missing_cv_main)
                         
-                    elif 0 < sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value=value).value <= 5:
-                        sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value=value)   
-                        
-                    elif 5 < sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value=value).value <= 10:
-                        sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value=value).fill = light_blue
-                        
-                    elif 10 < sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value=value).value <= 20:
-                        sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value=value).fill = dark_blue
-                        
-                    elif sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value=value).value > 20:
-                        sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value= 'x').fill = dark_blue
-                        
-                    else:
-                        sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value=value)
-                        
-                except:
-                    if sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value=value).value == '.' and c_idx >= 6:
-                        sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value= 'x').fill = dark_blue
-                        sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value= 'x')
-                        
-                    else:
-                        sheet_active_cv_main.cell(row=r_idx + 5, column=c_idx + 2, value=value)
-                        
-        for i in range(0,6):
-            sheet_active_cv_main.cell(row=max_order + 5 + 1 + i , column= 1, value = footnote['Footnote'].iat[i])
+            for i in range(0,6):
+                sheet_active_cv_main.cell(row=max_order + 5 + 1 + i , column= 1, value = footnote['Footnote'].iat[i])
             
-        '''Do a sheet for CV without x's'''
+            '''Do a sheet for CV without x's'''
         
-        sheet_active_cv_main_final = template_cv_main_final[sheet]
-        sheet_active_cv_main_final['A1'] = workbook_name_cv
+            sheet_active_cv_main_final = template_cv_main_final[sheet]
+            sheet_active_cv_main_final['A1'] = workbook_name_cv
         
-        for r_idx, row in enumerate(rows_cv_main_final, 1):
-            for c_idx, value in enumerate(row, 1):
-                try:
-                    if sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).value == 0: 
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value)
-                        
-                    elif 0 < sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).value <= 5:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value)   
-                        
-                    elif 5 < sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).value <= 10:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).fill = light_blue
-                        
-                    elif 10 < sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).value <= 20:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).fill = dark_blue
-                        
-                    elif sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).value > 20:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value= value).fill = dark_blue
+            write_cv_sheet(sheet_active_cv_main_final, 6, 3, rows_cv_main_final, bands_cv_main, missing_cv_main)
                         
-                    else:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value)
-                        
-                except:
-                    if sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).value == '.' and c_idx >= 6:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value= 'x').fill = dark_blue
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value= 'x')
-                    
-                    else:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value)
-                        
-        for i in range(0,6):
-            sheet_active_cv_main_final.cell(row=max_order + 5 + 1 + i , column= 1, value = footnote['Footnote'].iat[i])
+            for i in range(0,6):
+                sheet_active_cv_main_final.cell(row=max_order + 5 + 1 + i , column= 1, value = footnote['Footnote'].iat[i])
         
-        '''Printing Values main and formatting'''
-        for r_idx, row in enumerate(rows_val_main, 1):
-           for c_idx, value in enumerate(row, 1):
-                sheet_active_val_main.cell(row=r_idx + 5, column=c_idx + 2, value=value)
+            '''Printing Values main and formatting'''
+            for r_idx, row in enumerate(rows_val_main, 1):
+               for c_idx, value in enumerate(row, 1):
+                    sheet_active_val_main.cell(row=r_idx + 5, column=c_idx + 2, value=value)
                    
-        for i in range(0,6):
-            sheet_active_val_main.cell(row=max_order + 5 + 1 + i , column= 1, value = footnote['Footnote'].iat[i]) 
+            for i in range(0,6):
+                sheet_active_val_main.cell(row=max_order + 5 + 1 + i , column= 1, value = footnote['Footnote'].iat[i]) 
                
-    '''Drop unneeded tabs'''
-    for sheet in drop_list:
-        del template_cv_unsafe[sheet]
-        del template_val_unsafe[sheet]
-        del template_val_safe[sheet]
-        del template_cv_main[sheet]
-        del template_val_main[sheet]
-        del template_cv_main_final[sheet]
-        
-    '''Save all our workbooks'''
-    template_cv_unsafe.save(output_path + '/' + template_name + ' ' + workbook_name_cv + ' ' + f'{year}' + ' ' +  'CV' + ' ' + 'Unsafe' + '.xlsx')
-
-    template_val_unsafe.save(output_path + '/' + template_name + ' ' + workbook_name_val + ' ' + f'{year}' + ' ' + 'Unsafe' + '.xlsx')
-    
-    template_val_safe.save(output_path + '/' + template_name + ' ' + workbook_name_val + ' ' + f'{year}' + ' ' + 'Safe' + '.xlsx')
-    
-    template_cv_main.save(output_path + '/' + template_name + ' ' + workbook_name_cv + ' ' + f'{year}' +  ' ' +  'CV'  + '.xlsx')
-    
     '''Copy CV formatting to Values'''
     for sheet in template_sheet_names:
         copy_sheet_style(template_cv_main[sheet], template_val_main[sheet], 'valmain')
-        
-    template_val_main.save(output_path + '/' + template_name + ' ' + workbook_name_val + ' ' + f'{year}' + '.xlsx')
-    
-    '''Redo CV now to remove X for over 20 scores'''
     
-    for i, sheet in enumerate(template_sheet_names):
-        
-        sheet_active_cv_main_final = template_cv_main_final[sheet]
-        sheet_active_cv_main_final['A1'] = workbook_name_cv
-        
-        for r_idx, row in enumerate(rows_cv_main_final, 1):
-            for c_idx, value in enumerate(row, 1):
-                try:
-                    if sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).value == 0: 
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value)
-                        
-                    elif 0 < sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).value <= 5:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value)   
-                        
-                    elif 5 < sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).value <= 10:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).fill = light_blue
-                        
-                    elif 10 < sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).value <= 20:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).fill = dark_blue
-                        
-                    elif sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).value > 20:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value= value).fill = dark_blue
-                        
-                    else:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value)
-                        
-                except:
-                    if sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value).value == '.' and c_idx >= 6:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value= 'x').fill = dark_blue
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value= 'x')
-                    
-                    else:
-                        sheet_active_cv_main_final.cell(row=r_idx + 5, column=c_idx + 2, value=value)
-        
-        for i in range(0,6):
-            sheet_active_cv_main_final.cell(row=max_order + 5 + 1 + i , column= 1, value = footnote['Footnote'].iat[i]) 
-    
-    template_cv_main_final.save(output_path + '/' + template_name + ' ' + workbook_name_cv + ' ' + f'{year}' +  ' ' +  'CV'  + '.xlsx')
+    '''Save all our workbooks, the CV main is the final version without x's for over 20 scores'''
+    saves = [(output_files['cv_unsafe'], lambda: output_cv_unsafe.save(output_files['cv_unsafe'])),
+             (output_files['val_unsafe'], lambda: output_val_unsafe.save(output_files['val_unsafe'])),
+             (output_files['val_safe'], lambda: output_val_safe.save(output_files['val_safe'])),
+             (output_files['cv_main'], lambda: template_cv_main_final.save(output_files['cv_main'])),
+             (output_files['val_main'], lambda: template_val_main.save(output_files['val_main']))]
+    
+    for (value_type, sheet), frame in exports.items():
+        metadata = {'Table': table_name, 'Variable': table_variable, 'Value type': value_type, 'Employee type': sheet, 'Year': year}
+        saves.append((export_files[(value_type, sheet)], functools.partial(write_published_frame, frame, export_files[(value_type, sheet)], metadata)))
+    
+    '''Record what the workbook was built from for the next run, once it is saved'''
+    record = (lambda: manifest.record(inputs, list(output_files.values()) + list(export_files.values()))) if incremental else None
+    
+    if save_queue is None:
+        for filename, save in saves:
+            run_save(filename, save)
+        print('Saved all workbooks')
+        if record is not None:
+            record()
+    else:
+        save_queue.submit(saves, timings.context, record) # Saved on the queue's threads while the next workbook is made
+        print('Queued all workbooks for saving')
     
-    print('Saved all workbooks')
+    timings.context = (None, None)
+    return True
         
-def create_table(csv_path, csv_previous_year_path, template_path, output_path, table_name, year):
+def create_table(csv_path, csv_previous_year_path, template_path, output_path, table_name, year, force = False, incremental = Incremental_rebuild):
     '''
     This function loops though the sub.tables to create all 11 of them.
 
@@ -843,6 +819,12 @@ def create_table(csv_path, csv_previous_year_path, template_path, output_path, t
         Table to process.
     year : numeric
         Current year.
+    force : Boolean
+        Rebuild every workbook, even those the build manifest shows are up
+        to date.
+    incremental : Boolean
+        Skip workbooks the build manifest shows are up to date. Defaults to
+        Incremental_rebuild.
 
     Returns
     -------
@@ -855,7 +837,27 @@ def create_table(csv_path, csv_previous_year_path, template_path, output_path, t
     
     table_variable_list = list(Published_table_breakdown.keys())
     
-    for table_variable in table_variable_list:
-        create_workbook(csv_path, csv_previous_year_path, template_path, output_path, table_name, table_variable, year)
+    '''Each workbook is saved in the background while the next one is made'''
+    save_queue = SaveQueue() if Save_threads > 0 else None
+    
+    try:
+        for table_variable in table_variable_list:
+            create_workbook(csv_path, csv_previous_year_path, template_path, output_path, table_name, table_variable, year, force, save_queue, incremental)
+    finally:
+        save_errors = save_queue.close() if save_queue is not None else []
+    
+    for filename, error in save_errors:
+        print('Failed to save ' + filename)
+        print(error)
+    if save_errors:
+        raise RuntimeError(str(len(save_errors)) + ' workbooks of ' + table_name + ' failed to save')
+    
+    print('Dataset cache - ' + str(get_dataset_cache().stats()))
+    
+    '''Report where the time went'''
+    if Save_stage_timings:
+        get_stage_timings().save(output_path + '/' + table_name + '/' + 'Stage timings', table_name)
+    print('Stage timings - ' + table_name)
+    print(get_stage_timings().summary(table_name))
         
 # Testing not used in main code
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Runs the whole publication, one job per (table, variable) workbook, across a
+pool of worker processes, for one year or for a run of years.
+"""
+import math
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from ashe_table_formatting.pipeline_config import Published_tables_templates, Published_table_breakdown, Save_stage_timings, Dataset_cache_max_mb, Incremental_rebuild
+from ashe_table_formatting.Create_ASHE_tables import create_workbook
+from ashe_table_formatting.data_cache import configure_dataset_cache
+from ashe_table_formatting.stage_timings import get_stage_timings, write_stage_timings
+
+def publication_jobs(tables = None, variables = None):
+    '''
+    Lists the (table, variable) jobs for a run. Jobs are ordered by variable
+    first so that neighbouring jobs, which are handed to the same worker,
+    read the same variable's CSVs for shorthands shared between tables
+    (e.g. wgor, weng) and find them in that worker's dataset cache.
+
+    Parameters
+    ----------
+    tables : List of String, optional
+        Tables to run. All of Published_tables_templates if None.
+    variables : List of String, optional
+        Variables to run. All of Published_table_breakdown if None.
+
+    Returns
+    -------
+    jobs : List of Tuple
+        (table name, table variable) pairs.
+    '''
+    tables = list(Published_tables_templates) if tables is None else tables
+    variables = list(Published_table_breakdown) if variables is None else variables
+
+    return [(table, variable) for variable in variables for table in tables]
+
+def run_job(csv_path, csv_previous_year_path, template_path, output_path, table_name, table_variable, year, force = False, incremental = Incremental_rebuild):
+    '''
+    Runs create_workbook for one job and reports the outcome rather than
+    raising, so that one failing template does not stop the run.
+
+    Returns
+    -------
+    result : Dictionary
+        Table, Variable, Status ('Done', 'Up to date' or 'Failed'), Seconds
+        and Error, and
+        the job's stage timings under Stages.
+    '''
+    start = time.perf_counter()
+    error = ''
+
+    try:
+        built = create_workbook(csv_path, csv_previous_year_path, template_path, output_path, table_name, table_variable, year, force, incremental = incremental)
+        status = 'Done' if built else 'Up to date'
+    except Exception:
+        status = 'Failed'
+        error = traceback.format_exc()
+
+    return {'Table': table_name,
+            'Variable': table_variable,
+            'Status': status,
+            'Seconds': round(time.perf_counter() - start, 1),
+            'Error': error,
+            'Stages': get_stage_timings().to_frame(table_name, table_variable)}
+
+def _run_job(args):
+    return run_job(*args)
+
+def series_years(year_paths):
+    '''
+    Parameters
+    ----------
+    year_paths : Dictionary
+        Path to the CSVs of each year.
+
+    Returns
+    -------
+    years : List
+        Years that can be built, i.e. those whose previous year is also in
+        year_paths, in order. The earliest year is only a previous year.
+    '''
+    return sorted(year for year in year_paths if year - 1 in year_paths)
+
+def run_year_series(year_paths, template_path, output_path, table_name, table_variable, years, force = False, incremental = Incremental_rebuild):
+    '''
+    Runs one (table, variable) job for each year in turn in this process, so
+    each year's CSVs are parsed once, for that year's tables, and its Values
+    are still cached when the year after is compared with it.
+
+    Parameters
+    ----------
+    year_paths : Dictionary
+        Path to the CSVs of each year.
+    template_path : String
+        Path to templates.
+    output_path : String
+        Path to where to store outputs, each year's go in a folder named by
+        the year.
+    table_name : String
+        Table to process.
+    table_variable : String
+        Variable to process.
+    years : List
+        Years to build, in order.
+    force : Boolean
+        Rebuild even when the build manifest shows a workbook is up to date.
+    incremental : Boolean
+        Skip workbooks the build manifest shows are up to date.
+
+    Returns
+    -------
+    results : List of Dictionary
+        run_job's result for each year, with the Year added to it and to its
+        Stages.
+    '''
+    results = []
+    for year in years:
+        result = run_job(year_paths[year], year_paths[year - 1], template_path, os.path.join(output_path, f'{year}'),
+                         table_name, table_variable, year, force, incremental)
+        get_stage_timings().clear(table_name, table_variable) # So the next year's stages are its own
+        result['Year'] = year
+        result['Stages'].insert(0, 'Year', year)
+        results.append(result)
+    return results
+
+def _run_year_series(args):
+    return run_year_series(*args)
+
+def run_publication(csv_path, csv_previous_year_path, template_path, output_path, year,
+                    tables = None, variables = None, workers = None, cache_path = None, force = False,
+                    incremental = Incremental_rebuild):
+    '''
+    Creates the workbooks for every (table, variable) job on a process pool.
+
+    Parameters
+    ----------
+    csv_path : String
+        Path to CSV.
+    csv_previous_year_path : String
+        Path to previous years CSV.
+    template_path : String
+        Path to templates.
+    output_path : String
+        Path to where to store outputs.
+    year : numeric
+        Current Year.
+    tables : List of String, optional
+        Tables to run. All tables if None.
+    variables : List of String, optional
+        Variables to run. All variables if None.
+    workers : Integer, optional
+        Number of worker processes. Defaults to the number of CPUs. With 1 the
+        jobs run in this process.
+    cache_path : String, optional
+        Persistent dataset cache folder for the workers to share.
+    force : Boolean
+        Rebuild every workbook, even those the build manifest shows are up
+        to date.
+    incremental : Boolean
+        Skip workbooks the build manifest shows are up to date. Defaults to
+        Incremental_rebuild.
+
+    Returns
+    -------
+    report : Dataframe
+        One row per job with its status, time taken and any error. Also saved
+        as 'Batch report.csv' in output_path, next to the 'Stage timings' of
+        every job.
+    '''
+    jobs = publication_jobs(tables, variables)
+    job_args = [(csv_path, csv_previous_year_path, template_path, output_path, table, variable, year, force, incremental) for table, variable in jobs]
+
+    results = run_jobs(_run_job, job_args, workers, cache_path)
+    return report_results(results, output_path)
+
+def run_years(year_paths, template_path, output_path, tables = None, variables = None, workers = None, cache_path = None, force = False,
+              incremental = Incremental_rebuild):
+    '''
+    Creates the workbooks of a run of years, e.g. to rebuild a back series,
+    each year compared with the one before it. A worker builds every year of
+    a (table, variable) job in turn, so each year's CSVs are parsed once
+    rather than once as the current year and again as the previous year.
+
+    Parameters
+    ----------
+    year_paths : Dictionary
+        Path to the CSVs of each year. Every year whose previous year is also
+        given is built.
+    template_path : String
+        Path to templates.
+    output_path : String
+        Path to where to store outputs, each year's go in a folder named by
+        the year.
+    tables : List of String, optional
+        Tables to run. All tables if None.
+    variables : List of String, optional
+        Variables to run. All variables if None.
+    workers : Integer, optional
+        Number of worker processes. Defaults to the number of CPUs. With 1 the
+        jobs run in this process.
+    cache_path : String, optional
+        Persistent dataset cache folder for the workers to share.
+    force : Boolean
+        Rebuild every workbook, even those the build manifest shows are up
+        to date.
+    incremental : Boolean
+        Skip workbooks the build manifest shows are up to date. Defaults to
+        Incremental_rebuild.
+
+    Returns
+    -------
+    report : Dataframe
+        One row per job and year, saved as in run_publication.
+    '''
+    years = series_years(year_paths)
+    if not years:
+        raise ValueError('No year to build, each year needs the CSVs of the year before it: ' + str(sorted(year_paths)))
+
+    jobs = publication_jobs(tables, variables)
+    job_args = [(year_paths, template_path, output_path, table, variable, years, force, incremental) for table, variable in jobs]
+
+    print('Building ' + ', '.join(f'{year}' for year in years))
+    results = [result for series in run_jobs(_run_year_series, job_args, workers, cache_path) for result in series]
+    return report_results(results, output_path)
+
+def run_jobs(function, job_args, workers = None, cache_path = None):
+    '''
+    Runs jobs on a process pool, or in this process with one worker. The
+    workers split Dataset_cache_max_mb between their dataset caches, so the
+    memory they hold is bounded across the pool.
+
+    Returns
+    -------
+    results : List
+        What function returned for each job, in job order.
+    '''
+    workers = workers or os.cpu_count() or 1
+
+    print('Running ' + str(len(job_args)) + ' jobs on ' + str(workers) + ' workers')
+
+    if workers == 1:
+        configure_dataset_cache(cache_path = cache_path)
+        return [function(args) for args in job_args]
+
+    chunksize = max(1, math.ceil(len(job_args) / (workers * 4))) # Contiguous runs of jobs per worker, still small enough to balance load
+    max_mb = Dataset_cache_max_mb / workers # Each worker has its own cache, so they share the bound
+
+    with ProcessPoolExecutor(max_workers = workers, initializer = configure_dataset_cache, initargs = (max_mb, cache_path)) as executor:
+        return list(executor.map(function, job_args, chunksize = chunksize))
+
+def report_results(results, output_path):
+    '''
+    Saves and prints the outcome of a run's jobs.
+
+    Returns
+    -------
+    report : Dataframe
+        One row per job with its status, time taken and any error.
+    '''
+    stages = pd.concat([result.pop('Stages') for result in results], ignore_index = True)
+    report = pd.DataFrame(results)
+    report.to_csv(os.path.join(output_path, 'Batch report.csv'), index = False)
+    if Save_stage_timings:
+        write_stage_timings(stages, os.path.join(output_path, 'Stage timings'))
+
+    failed = report[report['Status'] == 'Failed']
+    skipped = report[report['Status'] == 'Up to date']
+    print('Done ' + str(len(report) - len(failed)) + ' of ' + str(len(report)) + ' jobs, ' + str(len(skipped)) + ' of them already up to date')
+
+    for row in failed.itertuples():
+        print('Failed ' + row.Table + ' ' + row.Variable + (' ' + f'{row.Year}' if 'Year' in report else ''))
+        print(row.Error)
+
+    return report
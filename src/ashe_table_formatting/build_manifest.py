@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Build manifest for incremental rebuilds. After a (table, variable) workbook
+is saved its inputs are recorded with their content hashes: the CSVs of the
+table's shorthands for the year and the previous year, the template and the
+footnotes file, along with the code that built it. A later run only rebuilds
+the workbook if one of these has changed or an output is missing or was
+changed since.
+
+Each workbook has its own manifest file, so workers building different
+variables of a table never write the same file.
+"""
+import hashlib
+import json
+import os
+
+from ashe_table_formatting.pipeline_config import Published_tables_templates
+from ashe_table_formatting.csv_index import get_table_sources
+from ashe_table_formatting.footnotes import FOOTNOTES_TEMPLATE
+
+MANIFEST_FOLDER = 'Build manifest' # Kept in the output folder, one file per workbook
+
+_code_digest = None
+
+def hash_file(filename):
+    '''
+    Parameters
+    ----------
+    filename : String
+        File to hash.
+
+    Returns
+    -------
+    digest : String
+        SHA-256 of the file contents.
+    '''
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(2**20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_record(filename, known = None):
+    '''
+    Size, modification time and content hash of a file. The file is only
+    read if its size or modification time differ from the known record.
+
+    Parameters
+    ----------
+    filename : String
+        File to describe.
+    known : Dictionary, optional
+        Record of the file from an earlier build.
+
+    Returns
+    -------
+    record : Dictionary or None
+        size, mtime_ns and sha256, or None if the file does not exist.
+    '''
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+
+    record = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if known and known.get('size') == record['size'] and known.get('mtime_ns') == record['mtime_ns']:
+        record['sha256'] = known['sha256']
+    else:
+        record['sha256'] = hash_file(filename)
+    return record
+
+def digests(records):
+    '''Content hash of each file in a set of file records, None for missing files.'''
+    return {filename: record and record['sha256'] for filename, record in records.items()}
+
+def code_digest():
+    '''
+    Returns one hash over the source of this package, pipeline_config
+    included, so that changing the code or the config rebuilds every
+    workbook. Worked out once per process.
+    '''
+    global _code_digest
+    if _code_digest is None:
+        folder = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for file in sorted(os.listdir(folder)):
+            if file.endswith('.py'):
+                digest.update(file.encode())
+                digest.update(hash_file(os.path.join(folder, file)).encode())
+        _code_digest = digest.hexdigest()
+    return _code_digest
+
+def workbook_inputs(csv_path, csv_previous_year_path, template_path, table_name, table_variable, year):
+    '''
+    Lists the files a (table, variable) workbook is built from.
+
+    Parameters
+    ----------
+    csv_path : String
+        Path to CSV.
+    csv_previous_year_path : String
+        Path to previous years CSV.
+    template_path : String
+        Path to templates.
+    table_name : String
+        Table to process.
+    table_variable : String
+        Variable to process.
+    year : numeric
+        Current Year.
+
+    Returns
+    -------
+    inputs : List of String
+        Absolute paths, in a fixed order.
+    '''
+    sources = get_table_sources(csv_path, table_name, table_variable, year).dropna(subset = ['File'])
+    sources_py = get_table_sources(csv_previous_year_path, table_name, table_variable, year-1).dropna(subset = ['File'])
+    sources_py = sources_py[sources_py['Value type'] == 'Values'] # Only the previous year Values are read
+
+    inputs = [os.path.join(csv_path, file) for file in sources['File']]
+    inputs += [os.path.join(csv_previous_year_path, file) for file in sources_py['File']]
+    inputs += [os.path.join(template_path, Published_tables_templates[table_name]),
+               os.path.join(template_path, FOOTNOTES_TEMPLATE)]
+
+    return [os.path.abspath(filename) for filename in inputs]
+
+class BuildManifest:
+    '''
+    Manifest of one workbook.
+
+    Attributes
+    ----------
+    filename : String
+        JSON file the manifest is kept in.
+    entry : Dictionary
+        What was recorded by the last build, empty if there was none.
+    '''
+    def __init__(self, output_path, table_name, table_variable):
+        '''
+        Parameters
+        ----------
+        output_path : String
+            Path to where outputs are stored.
+        table_name : String
+            Table of the workbook.
+        table_variable : String
+            Variable of the workbook.
+        '''
+        self.filename = os.path.join(output_path, MANIFEST_FOLDER, table_name + ' - ' + table_variable + '.json')
+        self.entry = {}
+        self._inputs = None
+
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename) as file:
+                    self.entry = json.load(file)
+            except ValueError: # Unreadable, e.g. left half written, so rebuild
+                self.entry = {}
+
+    def is_current(self, inputs, outputs):
+        '''
+        Checks whether the recorded build still stands. The input hashes
+        worked out here are kept for record.
+
+        Parameters
+        ----------
+        inputs : List of String
+            Input files, from workbook_inputs.
+        outputs : List of String
+            Files the workbook is saved as.
+
+        Returns
+        -------
+        current : Boolean
+            True if the code, every input and every output match the record.
+        '''
+        recorded_inputs = self.entry.get('inputs', {})
+        self._inputs = {filename: file_record(filename, recorded_inputs.get(filename)) for filename in inputs}
+
+        if self.entry.get('code') != code_digest() or digests(self._inputs) != digests(recorded_inputs):
+            return False
+
+        recorded_outputs = self.entry.get('outputs', {})
+        if sorted(recorded_outputs) != sorted(outputs):
+            return False
+
+        for filename in outputs:
+            if not os.path.exists(filename):
+                return False
+            stat = os.stat(filename)
+            if [stat.st_size, stat.st_mtime_ns] != [recorded_outputs[filename]['size'], recorded_outputs[filename]['mtime_ns']]:
+                return False
+
+        if self._inputs != recorded_inputs: # Same contents with new times, e.g. copied again, so keep the new times to save hashing next run
+            self.entry['inputs'] = self._inputs
+            self._save()
+        return True
+
+    def record(self, inputs, outputs):
+        '''
+        Stores the build that has just been saved.
+
+        Parameters
+        ----------
+        inputs : List of String
+            Input files, from workbook_inputs.
+        outputs : List of String
+            Files the workbook was saved as.
+        '''
+        known = self._inputs or {}
+        self.entry = {'code': code_digest(),
+                      'inputs': {filename: known.get(filename) or file_record(filename) for filename in inputs},
+                      'outputs': {}}
+
+        for filename in outputs:
+            stat = os.stat(filename)
+            self.entry['outputs'][filename] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+        self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.filename), exist_ok = True)
+        temp = self.filename + '.' + str(os.getpid()) + '.tmp'
+        with open(temp, 'w') as file:
+            json.dump(self.entry, file, indent = 1)
+        os.replace(temp, self.filename) # Never leaves a half written manifest
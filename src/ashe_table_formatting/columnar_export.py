@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Typed copies of the published main sheets for teams that load the outputs
+into pandas or Arrow. Each (table, variable, value type, employee type) is
+written as one Parquet or Arrow file straight from the tables the sheets are
+written from. Values are float64 with no markers mixed in, and every value
+column has a flag column saying why a cell has no number ('missing', 'no
+data', 'blank', 'unsafe' or 'suppressed'), as a category whose codes are the
+table_model flags. Arrow files are uncompressed so they can be memory mapped.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from ashe_table_formatting.table_model import VALUE, SUPPRESSED
+
+try:
+    import pyarrow # Only needed for the export
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+FLAG_NAMES = ['value', 'missing', 'no data', 'blank', 'unsafe', 'suppressed'] # Indexed by flag, so the flags are the category codes
+FLAG_SUFFIX = ' flag' # Added to a value column's name for its flag column
+EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow'}
+EXPORT_FOLDER = 'Columnar' # In the table's output folder
+PUBLISHED_KEYS = ['Code', 'Description', 'Order']
+
+def export_filename(output_path, workbook_name, year, employee_type, file_format):
+    '''
+    Parameters
+    ----------
+    output_path : String
+        Output folder of the table.
+    workbook_name : String
+        Name of the workbook with the template name in front, as in the
+        workbook file names.
+    year : Numeric
+        Current year.
+    employee_type : String
+        Sheet of the employee type, e.g. 'Male Full-Time'.
+    file_format : String
+        'parquet' or 'arrow'.
+
+    Returns
+    -------
+    filename : String
+        File the employee type's table is exported to.
+    '''
+    if pyarrow is None:
+        raise ImportError('The columnar export needs pyarrow, install it with pip install pyarrow')
+    if file_format not in EXTENSIONS:
+        raise ValueError(f'Unknown columnar export format {file_format!r}, use one of {list(EXTENSIONS)}')
+
+    return os.path.join(output_path, EXPORT_FOLDER, workbook_name + ' ' + f'{year}' + ' ' + employee_type + EXTENSIONS[file_format])
+
+def with_suppressed(table, cells):
+    '''
+    Another version of a table with some cells flagged SUPPRESSED, for the
+    'x's that are put on the sheets while they are written.
+
+    Parameters
+    ----------
+    table : Table
+        Table as rendered for the sheet.
+    cells : Dataframe of bool
+        Cells to suppress, matched to the table's columns by name.
+
+    Returns
+    -------
+    table : Table
+    '''
+    cells = cells.reindex(columns = table.flags.columns, fill_value = False).to_numpy(dtype = bool)
+    flags = table.flags.to_numpy(copy = True)
+    flags[cells] = SUPPRESSED
+    return table.with_flags(flags)
+
+def published_frame(table):
+    '''
+    Lays a table out for export.
+
+    Parameters
+    ----------
+    table : Table
+        Table as published.
+
+    Returns
+    -------
+    frame : Dataframe
+        Code, Description and Order, then the value columns (NaN where there
+        is no number), then a flag column per value column.
+    '''
+    flags = table.flags.to_numpy()
+    values = np.where(flags == VALUE, table.values.to_numpy(), np.nan)
+
+    frame = table.keys[[column for column in PUBLISHED_KEYS if column in table.keys.columns]].reset_index(drop = True)
+    for j, column in enumerate(table.values.columns):
+        frame[column] = values[:, j]
+    for j, column in enumerate(table.flags.columns):
+        frame[column + FLAG_SUFFIX] = pd.Categorical.from_codes(flags[:, j], FLAG_NAMES)
+    return frame
+
+def write_published_frame(frame, filename, metadata):
+    '''
+    Writes an exported table, with what it is kept in the schema metadata
+    under 'ashe'.
+
+    Parameters
+    ----------
+    frame : Dataframe
+        Table laid out by published_frame.
+    filename : String
+        File to write, its extension gives the format.
+    metadata : Dictionary
+        Table, Variable, Value type, Employee type and Year of the table.
+    '''
+    os.makedirs(os.path.dirname(filename), exist_ok = True)
+    arrow_table = pyarrow.Table.from_pandas(frame, preserve_index = False)
+    arrow_table = arrow_table.replace_schema_metadata({**(arrow_table.schema.metadata or {}), b'ashe': json.dumps(metadata).encode()})
+
+    if filename.endswith(EXTENSIONS['arrow']):
+        pyarrow.feather.write_feather(arrow_table, filename, compression = 'uncompressed')
+    else:
+        pyarrow.parquet.write_table(arrow_table, filename)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Index of the SAS CSV folder. The folder is listed once and each
+'<shorthand> - <variable year> - <CVs|Values>.csv' file is filed under its
+three key parts, so lookups are exact rather than substring matches.
+"""
+import os
+
+import pandas as pd
+
+from ashe_table_formatting.pipeline_config import Published_tables_data, Published_table_breakdown
+
+_csv_indexes = {}
+
+def parse_csv_name(file):
+    '''
+    Splits a SAS CSV file name into its three key parts.
+
+    Parameters
+    ----------
+    file : String
+        File name, e.g. 'occ1 - GPAY 2021 - CVs.csv'.
+
+    Returns
+    -------
+    parts : Tuple of String or None
+        (shorthand, variable year, value type), or None if the name does not
+        follow the naming convention.
+    '''
+    if not file.endswith('.csv'):
+        return None
+
+    split = file[:-len('.csv')].split(' - ')
+    if len(split) != 3:
+        return None
+
+    return tuple(split)
+
+def build_csv_index(csv_path):
+    '''
+    Lists csv_path once and builds a nested dictionary of its CSV files.
+
+    Parameters
+    ----------
+    csv_path : String
+        Path to the input CSV files.
+
+    Returns
+    -------
+    index : Nested Dictionary
+        {shorthand : {variable year : {value type : file name}}}
+    '''
+    index = {}
+
+    for file in os.listdir(csv_path):
+        parts = parse_csv_name(file)
+        if parts is None:
+            continue
+
+        shorthand, variable_year, value_type = parts
+        index.setdefault(shorthand, {}).setdefault(variable_year, {})[value_type] = file
+
+    return index
+
+def get_csv_index(csv_path):
+    '''
+    Returns the index for csv_path, only listing the folder again if its
+    modification time has changed since the last scan.
+
+    Parameters
+    ----------
+    csv_path : String
+        Path to the input CSV files.
+
+    Returns
+    -------
+    index : Nested Dictionary
+        {shorthand : {variable year : {value type : file name}}}
+    '''
+    path = os.path.realpath(csv_path)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _csv_indexes.get(path)
+
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, build_csv_index(path))
+        _csv_indexes[path] = cached
+
+    return cached[1]
+
+def get_table_sources(csv_path, table_name, variable = None, year = None):
+    '''
+    Lists the CSV files that feed a table.
+
+    Parameters
+    ----------
+    csv_path : String
+        Path to the input CSV files.
+    table_name : String
+        Table as named in Published_tables_data.
+    variable : String, optional
+        Variable as named in Published_table_breakdown. All variables if None.
+    year : Numeric, optional
+        Year of the data. Needed when variable is given.
+
+    Returns
+    -------
+    sources : Dataframe
+        One row per file with its Shorthand, Variable, Value type and File.
+        Shorthands with no files are listed with an empty File so gaps show.
+    '''
+    index = get_csv_index(csv_path)
+    rows = []
+
+    for shorthand in Published_tables_data[table_name]:
+        variables = index.get(shorthand, {})
+
+        if variable is not None:
+            variable_year = Published_table_breakdown[variable] + ' ' + f'{year}'
+            variables = {variable_year: variables.get(variable_year, {})}
+
+        found = False
+        for variable_year, value_types in variables.items():
+            for value_type, file in value_types.items():
+                rows.append([shorthand, variable_year, value_type, file])
+                found = True
+
+        if not found:
+            rows.append([shorthand, None, None, None])
+
+    return pd.DataFrame(rows, columns = ['Shorthand', 'Variable', 'Value type', 'File'])
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Quality banding of the CV main sheets. The band of every cell is worked out
+at once from the typed table: CVs over 5 are shaded light blue, over 10 dark
+blue, and over 20 (or missing from the sixth column on) are also published
+as 'x' on the CV main sheet. The sheet is then written with one cell write
+per value, the fills set by id.
+"""
+import numpy as np
+from openpyxl.styles import PatternFill
+from openpyxl.styles.cell_style import StyleArray
+
+from ashe_table_formatting.table_model import MISSING, VALUE, text_mask
+
+'''Bands'''
+PLAIN = 0
+LIGHT_BLUE = 1
+DARK_BLUE = 2
+
+LIGHT_BLUE_OVER = 5 # CVs above these are shaded
+DARK_BLUE_OVER = 10
+SUPPRESS_OVER = 20 # and above this replaced with 'x' on the CV main sheet
+FIRST_SUPPRESSED_MISSING = 5 # Missing CVs from this column index on are shown as 'x'
+
+FILLS = {LIGHT_BLUE: PatternFill(patternType = 'gray0625', start_color = '00FFFF', end_color = '00FFFF', fill_type= 'solid'),
+         DARK_BLUE: PatternFill(start_color = '33CCCC', end_color = '00FFFF', fill_type= 'solid')}
+
+def cv_bands(table, numeric_text = True):
+    '''
+    Bands the cells of a CV table. Cells published as text or as a marker
+    other than '.' are left plain.
+
+    Parameters
+    ----------
+    table : Table
+        CVs, as rendered for the sheet.
+    numeric_text : Boolean
+        As passed to render_rows for the sheet.
+
+    Returns
+    -------
+    bands : Array of uint8
+        PLAIN, LIGHT_BLUE or DARK_BLUE per cell.
+    over_limit : Array of bool
+        CVs over SUPPRESS_OVER.
+    missing : Array of bool
+        Missing CVs shown as 'x' with a dark blue fill.
+    '''
+    values = table.values.to_numpy()
+    flags = table.flags.to_numpy()
+    numeric = (flags == VALUE) & ~text_mask(table, numeric_text)
+
+    with np.errstate(invalid = 'ignore'):
+        light = numeric & (values > LIGHT_BLUE_OVER) & (values <= DARK_BLUE_OVER)
+        dark = numeric & (values > DARK_BLUE_OVER)
+        over_limit = numeric & (values > SUPPRESS_OVER)
+    missing = (flags == MISSING) & (np.arange(flags.shape[1]) >= FIRST_SUPPRESSED_MISSING)
+
+    bands = np.full(flags.shape, PLAIN, dtype = np.uint8)
+    bands[light] = LIGHT_BLUE
+    bands[dark | missing] = DARK_BLUE
+
+    return bands, over_limit, missing
+
+def write_cv_sheet(sheet, first_row, first_column, rows, bands, suppress):
+    '''
+    Writes banded CVs to a sheet, one cell write per value.
+
+    Parameters
+    ----------
+    sheet : Worksheet
+        Sheet to write to.
+    first_row : Integer
+        Sheet row of the first row of values.
+    first_column : Integer
+        Sheet column of the first column of values.
+    rows : List of Lists
+        Rendered CVs, from render_rows.
+    bands : Array of uint8
+        Band of each value, from cv_bands.
+    suppress : Array of bool
+        Values to publish as 'x'.
+    '''
+    fill_ids = {} # Added to the workbook on first use, as setting cell.fill would
+
+    for r_idx, (row, band_row, suppress_row) in enumerate(zip(rows, bands.tolist(), suppress.tolist()), first_row):
+        for c_idx, (value, band, is_x) in enumerate(zip(row, band_row, suppress_row), first_column):
+            cell = sheet.cell(row=r_idx, column=c_idx, value='x' if is_x else value)
+            if band:
+                if not cell._style:
+                    cell._style = StyleArray()
+                if band not in fill_ids:
+                    fill_ids[band] = sheet.parent._fills.add(FILLS[band])
+                cell._style.fillId = fill_ids[band]
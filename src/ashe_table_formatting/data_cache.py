@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+In-process cache of parsed SAS CSV datasets so that each input file is read
+once per run rather than once per create_data_ready call, with an optional
+persistent on-disk store so that later runs skip parsing altogether.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from ashe_table_formatting.pipeline_config import Dataset_cache_max_mb, Employee_key
+
+try:
+    import pyarrow # Only needed for the persistent store
+except ImportError:
+    pyarrow = None
+
+STORE_FORMAT_VERSION = 3 # Bump when the frames produced by get_files change shape
+
+
+def dataset_key(csv, file_name):
+    '''
+    Builds the cache key for a CSV file. The resolved path, modification time
+    and size are used so that a reissued CSV is picked up on the next load.
+
+    Parameters
+    ----------
+    csv : String
+        Path to the csv file.
+    file_name : String
+        Shorthand the file was loaded for (it prefixes every Code).
+
+    Returns
+    -------
+    key : Tuple
+        Hashable key identifying this version of the file.
+    '''
+    path = os.path.realpath(csv)
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size, file_name)
+
+def dataset_size(data):
+    '''
+    Estimates the memory held by the nine employee type dataframes of a file.
+
+    Parameters
+    ----------
+    data : Dictionary of dataframes
+        Output of get_files.
+
+    Returns
+    -------
+    size : Integer
+        Size in bytes.
+    '''
+    return int(sum(frame.memory_usage(index=True, deep=True).sum() for frame in data.values()))
+
+class PersistentDatasetStore:
+    '''
+    Directory of parsed CSV datasets stored as Feather (Arrow IPC) files.
+
+    Each csv is stored as one file holding all nine employee type sections,
+    with an 'Employee type' column used to split them again on load. File
+    names are a hash of the csv and shorthand followed by a hash of the
+    version of the file (mtime, size and STORE_FORMAT_VERSION), so a reissued
+    csv is simply a miss. Saving a version removes the stored older versions
+    of the same csv, so the folder holds one file per csv. Files left by
+    csvs that are no longer read can be deleted along with the folder at any
+    time, the cache is rebuilt as files are read.
+
+    Parameters
+    ----------
+    directory : String
+        Folder to hold the cached files. Created if it does not exist.
+    '''
+    key_column = 'Employee type'
+
+    def __init__(self, directory):
+        if pyarrow is None:
+            raise ImportError('The persistent dataset cache needs pyarrow, install it with pip install pyarrow')
+        
+        os.makedirs(directory, exist_ok = True)
+        self.directory = directory
+
+    def path(self, key):
+        '''
+        Parameters
+        ----------
+        key : Tuple
+            Dataset key from dataset_key.
+
+        Returns
+        -------
+        path : String
+            Location of the cached file for key.
+        '''
+        path, mtime, size, file_name = key
+        source = hashlib.sha1(repr((path, file_name)).encode('utf-8')).hexdigest()
+        version = hashlib.sha1(repr((STORE_FORMAT_VERSION, mtime, size)).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, source + '-' + version + '.feather')
+
+    def prune(self, key):
+        '''
+        Removes the stored versions of key's csv other than key's own.
+
+        Parameters
+        ----------
+        key : Tuple
+            Dataset key from dataset_key.
+        '''
+        path = self.path(key)
+        source = os.path.basename(path).split('-')[0]
+        for name in os.listdir(self.directory):
+            if name.startswith(source + '-') and name.endswith('.feather') and name != os.path.basename(path):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError: # Being read or removed by another worker
+                    pass
+
+    def load(self, key):
+        '''
+        Parameters
+        ----------
+        key : Tuple
+            Dataset key from dataset_key.
+
+        Returns
+        -------
+        data : Dictionary of dataframes or None
+            The nine employee type dataframes, or None if not stored.
+        '''
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        
+        combined = pd.read_feather(path)
+        employee_type = combined.pop(self.key_column)
+        
+        return {x: combined[employee_type == x].reset_index(drop = True) for x in Employee_key}
+
+    def save(self, key, data):
+        '''
+        Writes the datasets for key and prunes older versions of the csv. The
+        file is written under a temporary name and moved into place so a
+        crashed run never leaves a partial file.
+
+        Parameters
+        ----------
+        key : Tuple
+            Dataset key from dataset_key.
+        data : Dictionary of dataframes
+            Output of get_files.
+        '''
+        combined = pd.concat([frame.assign(**{self.key_column: employee_type}) for employee_type, frame in data.items()],
+                             ignore_index = True)
+        path = self.path(key)
+        temp_path = path + '.' + str(os.getpid()) + '.tmp'
+        combined.to_feather(temp_path)
+        os.replace(temp_path, path)
+        self.prune(key)
+
+class DatasetCache:
+    '''
+    Least recently used cache of parsed CSV files, bounded by memory.
+
+    The cached dataframes are shared between callers and must be treated as
+    read only. Entries larger than the whole bound are returned but not kept.
+    The cache is thread safe and a file requested by several threads at once
+    is only parsed by one of them.
+
+    Parameters
+    ----------
+    max_mb : Numeric
+        Upper bound in megabytes on the memory held by cached dataframes.
+    store : PersistentDatasetStore, optional
+        On-disk store consulted on a miss before parsing the csv.
+    '''
+    def __init__(self, max_mb = Dataset_cache_max_mb, store = None):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.store = store
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {} # Per key locks for files being parsed
+
+    def get(self, csv, file_name, loader):
+        '''
+        Returns the parsed datasets for a csv, loading them with loader on a
+        miss.
+
+        Parameters
+        ----------
+        csv : String
+            Path to the csv file.
+        file_name : String
+            Shorthand of the csv file.
+        loader : Function
+            Called as loader(csv, file_name) to parse the file, e.g. get_files.
+
+        Returns
+        -------
+        data : Dictionary of dataframes
+            9 dataframes with data from the 9 employee types.
+        '''
+        key = dataset_key(csv, file_name)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._entries: # Parsed by another thread while we waited
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                
+                self.misses += 1
+            
+            try:
+                data = self.store.load(key) if self.store is not None else None
+                
+                if data is None:
+                    data = loader(csv, file_name)
+                    if self.store is not None:
+                        self.store.save(key, data)
+                
+                size = dataset_size(data)
+
+                with self._lock:
+                    if size <= self.max_bytes:
+                        self._entries[key] = (data, size)
+                        self.current_bytes += size
+                        self._evict()
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+        return data
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last = False)
+            self.current_bytes -= size
+
+    def clear(self):
+        '''Drops every cached dataset and resets the counters.'''
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        '''
+        Returns
+        -------
+        stats : Dictionary
+            Number of entries, memory held and hit/miss counts.
+        '''
+        return {'entries': len(self._entries),
+                'mb': round(self.current_bytes / (1024 * 1024), 1),
+                'hits': self.hits,
+                'misses': self.misses}
+
+_dataset_cache = DatasetCache()
+
+def get_dataset_cache():
+    '''Returns the process wide dataset cache.'''
+    return _dataset_cache
+
+def configure_dataset_cache(max_mb = None, cache_path = None):
+    '''
+    Configures the process wide dataset cache. The memory bound is applied
+    straight away, evicting least recently used entries if needed.
+
+    Parameters
+    ----------
+    max_mb : Numeric, optional
+        Upper bound in megabytes.
+    cache_path : String, optional
+        Folder for the persistent on-disk store. The store is off unless this
+        is given.
+    '''
+    if max_mb is not None:
+        with _dataset_cache._lock:
+            _dataset_cache.max_bytes = int(max_mb * 1024 * 1024)
+            _dataset_cache._evict()
+    
+    if cache_path:
+        _dataset_cache.store = PersistentDatasetStore(cache_path)
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Writers for the output workbooks that are a template with blocks of data
+filled in (the Unsafe and Safe workbooks). StreamedWorkbook writes each
+sheet straight to disk with openpyxl write-only worksheets, taking cell
+styles from the cached template by index, so only one row of cells is held
+at a time. TemplateWorkbook fills in a full in-memory copy of the template
+as before, for templates using features the stream does not carry over. The
+stream copies openpyxl internals, so output_workbook falls back to
+TemplateWorkbook if the installed openpyxl does not have them.
+"""
+import functools
+import warnings
+from copy import copy
+
+import openpyxl as opy
+from openpyxl.cell.cell import Cell
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.indexed_list import IndexedList
+
+from ashe_table_formatting.template_cache import get_template, load_template
+
+STYLE_TABLES = ('_fonts', '_alignments', '_borders', '_fills', '_number_formats', '_protections', '_cell_styles')
+
+_workbook_skip = {'_sheets', '_Workbook__write_only', '_read_only', '_data_only'} # Workbook attributes not taken from the template
+_sheet_skip = {'_parent', '_WorkbookChild__title', '_cells', '_current_row', 'row_dimensions', 'column_dimensions',
+               '_hyperlinks', '_comments', '_drawing', '_rels'} # Worksheet attributes not taken from the template
+
+STREAM_INTERNALS = {'workbook': [*STYLE_TABLES, '_named_styles', '_external_links', '_date_formats', '_timedelta_formats'],
+                    'worksheet': ['_cells', '_parent', 'row_dimensions', 'column_dimensions', 'page_setup'],
+                    'write_only': ['_add_row', '_add_column', 'append'],
+                    'cell': ['_style', '_value', '_hyperlink', '_comment', 'data_type', 'parent']} # Used by StreamedWorkbook
+
+@functools.lru_cache(maxsize = None)
+def missing_stream_internals():
+    '''
+    Returns
+    -------
+    missing : List of String
+        The openpyxl internals StreamedWorkbook uses that the installed
+        openpyxl does not have, empty if it can stream.
+    '''
+    workbook = opy.Workbook()
+    objects = {'workbook': workbook, 'worksheet': workbook.active,
+               'write_only': opy.Workbook(write_only = True).create_sheet(), 'cell': Cell}
+    return [kind + '.' + name for kind, names in STREAM_INTERNALS.items() for name in names
+            if not hasattr(objects[kind], name)]
+
+def output_workbook(filename, drop_sheets = (), stream = True):
+    '''
+    Opens an output workbook on a template.
+
+    Parameters
+    ----------
+    filename : String
+        Path to the template.
+    drop_sheets : List of String
+        Template sheets left out of the output.
+    stream : Boolean
+        Stream it to disk (StreamedWorkbook) if openpyxl allows, otherwise
+        fill in a copy of the template (TemplateWorkbook).
+
+    Returns
+    -------
+    workbook : StreamedWorkbook or TemplateWorkbook
+    '''
+    if stream:
+        missing = missing_stream_internals()
+        if not missing:
+            return StreamedWorkbook(filename, drop_sheets)
+        warnings.warn('openpyxl ' + opy.__version__ + ' lacks ' + ', '.join(missing) + ', filling in template copies instead of streaming')
+    return TemplateWorkbook(filename, drop_sheets)
+
+def block_values(blocks, row):
+    '''
+    Picks out the values that blocks put in one row.
+
+    Parameters
+    ----------
+    blocks : List of Tuple
+        (first row, first column, rows of values) blocks. Later blocks win
+        where they overlap and None leaves a cell as it is.
+    row : Integer
+        Row number.
+
+    Returns
+    -------
+    values : Dictionary
+        {column : value}
+    '''
+    values = {}
+    for first_row, first_column, rows in blocks:
+        if first_row <= row < first_row + len(rows):
+            for column, value in enumerate(rows[row - first_row], first_column):
+                if value is not None:
+                    values[column] = value
+    return values
+
+class StreamedWorkbook:
+    '''
+    Output workbook streamed to disk sheet by sheet from a template.
+
+    Sheets are written with write_sheet in any order; sheets never written
+    are copied from the template when the workbook is saved. Cell values,
+    styles, hyperlinks and comments and the sheet level settings
+    (dimensions, merged cells, views, print setup, conditional formatting,
+    validations) come from the template. Chartsheets are not carried over.
+    '''
+    def __init__(self, filename, drop_sheets = ()):
+        '''
+        Parameters
+        ----------
+        filename : String
+            Path to the template.
+        drop_sheets : List of String
+            Template sheets left out of the output.
+        '''
+        self.template = get_template(filename, drop_sheets) # Parsed without the dropped sheets
+        self.workbook = opy.Workbook(write_only = True)
+        self.written = set()
+
+        for name, value in vars(self.template).items():
+            if name not in _workbook_skip:
+                setattr(self.workbook, name, value)
+
+        for attr in STYLE_TABLES:
+            setattr(self.workbook, attr, IndexedList(getattr(self.template, attr))) # Same style ids as the template
+        self.workbook._named_styles = copy(self.template._named_styles)
+        self.workbook.defined_names = copy(self.template.defined_names)
+        self.workbook.views = [copy(view) for view in self.template.views]
+        self.workbook.shared_strings = IndexedList()
+        self.workbook._external_links = list(self.template._external_links)
+
+        for source in self.template.worksheets:
+            self._add_sheet(source)
+
+    def _add_sheet(self, source):
+        sheet = self.workbook.create_sheet(source.title)
+
+        for name, value in vars(source).items():
+            if name not in _sheet_skip:
+                setattr(sheet, name, copy(value))
+        sheet.page_setup.worksheet = sheet
+
+        for attr in ('row_dimensions', 'column_dimensions'):
+            target = getattr(sheet, attr)
+            for key, dimension in getattr(source, attr).items():
+                target[key] = copy(dimension)
+                target[key].worksheet = sheet
+
+    def write_sheet(self, title, blocks = ()):
+        '''
+        Streams one sheet, the template sheet with blocks of values written
+        over it. Template styles are kept under the new values.
+
+        Parameters
+        ----------
+        title : String
+            Sheet to write.
+        blocks : List of Tuple
+            (first row, first column, rows of values) blocks.
+        '''
+        sheet = self.workbook[title]
+        source = self.template[title]
+        self.written.add(title)
+
+        template_rows = {}
+        for (row, column), cell in source._cells.items():
+            template_rows.setdefault(row, {})[column] = cell
+
+        rows = [row for row, column in source._cells]
+        columns = [column for row, column in source._cells]
+        for first_row, first_column, block in blocks:
+            for r, values in enumerate(block, first_row):
+                filled = [c for c, value in enumerate(values, first_column) if value is not None]
+                if filled:
+                    rows.append(r)
+                    columns.extend((filled[0], filled[-1]))
+
+        if rows:
+            dimension = f'{get_column_letter(min(columns))}{min(rows)}:{get_column_letter(max(columns))}{max(rows)}'
+            sheet.calculate_dimension = lambda: dimension # Written ahead of the rows, as a normal save does
+        last_row = max([*rows, *source.row_dimensions.keys()], default = 0)
+
+        new_cell = Cell.__new__ # Bypasses Cell.__init__, values are set through the value setter below
+
+        for row in range(1, last_row + 1):
+            template_cells = template_rows.get(row, {})
+            values = block_values(blocks, row)
+            columns = template_cells.keys() | values.keys()
+            line = [None] * max(columns, default = 0)
+
+            for column in columns:
+                template_cell = template_cells.get(column)
+
+                if template_cell is None:
+                    line[column - 1] = values[column] # Unstyled, written as a plain value
+                    continue
+
+                cell = new_cell(Cell)
+                cell.parent = sheet
+                cell.row = row
+                cell.column = column
+                cell._style = copy(template_cell._style)
+                cell._hyperlink = None
+                cell._comment = None
+
+                if column in values:
+                    cell.value = values[column]
+                else:
+                    cell._value = template_cell._value
+                    cell.data_type = template_cell.data_type
+                    if template_cell._hyperlink is not None:
+                        cell._hyperlink = copy(template_cell._hyperlink)
+                    if template_cell._comment is not None:
+                        cell.comment = copy(template_cell._comment)
+
+                line[column - 1] = cell
+
+            sheet.append(line)
+
+    def save(self, filename):
+        '''
+        Copies any sheets not yet written from the template and saves.
+
+        Parameters
+        ----------
+        filename : String
+            Path to save to.
+        '''
+        for sheet in self.workbook.worksheets:
+            if sheet.title not in self.written:
+                self.write_sheet(sheet.title)
+
+        self.workbook.save(filename)
+
+class TemplateWorkbook:
+    '''
+    Output workbook filled in on an in-memory copy of the template, with the
+    same write_sheet and save as StreamedWorkbook.
+    '''
+    def __init__(self, filename, drop_sheets = ()):
+        '''
+        Parameters
+        ----------
+        filename : String
+            Path to the template.
+        drop_sheets : List of String
+            Template sheets left out of the output.
+        '''
+        self.workbook = load_template(filename, drop_sheets)
+
+    def write_sheet(self, title, blocks = ()):
+        '''
+        Writes blocks of values over one sheet.
+
+        Parameters
+        ----------
+        title : String
+            Sheet to write.
+        blocks : List of Tuple
+            (first row, first column, rows of values) blocks.
+        '''
+        sheet = self.workbook[title]
+
+        for first_row, first_column, rows in blocks:
+            for r_idx, row in enumerate(rows, first_row):
+                for c_idx, value in enumerate(row, first_column):
+                    sheet.cell(row=r_idx, column=c_idx, value=value)
+
+    def save(self, filename):
+        '''
+        Parameters
+        ----------
+        filename : String
+            Path to save to.
+        '''
+        self.workbook.save(filename)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Footnotes put under the data on the main sheets. 'Footnotes template.xlsx'
+is read once per process, and again only if it changes, rather than by every
+workbook. The footnotes can also be kept in a file next to the template for
+later runs.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+FOOTNOTES_TEMPLATE = 'Footnotes template.xlsx' # In the template folder
+FOOTNOTE_SHEETS = ['FootNotes1', 'FootNotes2', 'FootNotes3', 'FootNotes4']
+SIDECAR_SUFFIX = '.footnotes.json' # Added to the template file name for the stored footnotes
+
+_footnotes = {}
+_footnotes_lock = threading.Lock()
+
+def save_footnotes(footnotes, filename):
+    '''
+    Stores footnotes as JSON, empty cells as null. Written to a temporary file
+    first so another process never reads it half written.
+
+    Parameters
+    ----------
+    footnotes : Dictionary of Dataframes
+        Footnotes by sheet, from get_footnotes.
+    filename : String
+        File to write.
+
+    Returns
+    -------
+    saved : Boolean
+        False if a cell has no JSON form, e.g. a date, and nothing was stored.
+    '''
+    stored = {sheet: {column: [None if pd.isna(x) else x for x in frame[column].tolist()] for column in frame.columns}
+              for sheet, frame in footnotes.items()}
+    try:
+        text = json.dumps(stored)
+    except TypeError:
+        return False
+
+    temp = filename + '.' + str(os.getpid()) + '.tmp'
+    with open(temp, 'w') as file:
+        file.write(text)
+    os.replace(temp, filename)
+    return True
+
+def load_footnotes(filename):
+    '''
+    Reads footnotes stored with save_footnotes.
+
+    Parameters
+    ----------
+    filename : String
+        File to read.
+
+    Returns
+    -------
+    footnotes : Dictionary of Dataframes or None
+        As read from the template, empty cells NaN. None if the file cannot
+        be read or does not hold every sheet of FOOTNOTE_SHEETS.
+    '''
+    try:
+        with open(filename) as file:
+            stored = json.load(file)
+        if sorted(stored) != sorted(FOOTNOTE_SHEETS):
+            return None
+        return {sheet: pd.DataFrame({column: pd.Series(values, dtype = object).fillna(np.nan) for column, values in columns.items()})
+                for sheet, columns in stored.items()}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+def get_footnotes(filename, persist = False):
+    '''
+    Returns the footnote sheets of the footnotes template, reading the file
+    the first time they are asked for in a process and again only if it
+    changes.
+
+    Parameters
+    ----------
+    filename : String
+        Path to 'Footnotes template.xlsx'.
+    persist : Boolean
+        Also keep the footnotes in a file next to the template, and read them
+        from there when it is newer than the template. Footnotes with cells
+        JSON cannot hold are only kept in memory.
+
+    Returns
+    -------
+    footnotes : Dictionary of Dataframes
+        {sheet : Footnote column} for FOOTNOTE_SHEETS, as pd.read_excel gives
+        them. They are shared and must not be changed.
+    '''
+    path = os.path.realpath(filename)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+
+    with _footnotes_lock:
+        footnotes = _footnotes.get(key)
+    if footnotes is not None:
+        return footnotes
+
+    sidecar = path + SIDECAR_SUFFIX
+    if persist and os.path.exists(sidecar) and os.stat(sidecar).st_mtime_ns > stat.st_mtime_ns:
+        footnotes = load_footnotes(sidecar)
+
+    if footnotes is None:
+        footnotes = pd.read_excel(path, sheet_name = FOOTNOTE_SHEETS)
+        if persist:
+            save_footnotes(footnotes, sidecar)
+
+    with _footnotes_lock:
+        _footnotes[key] = footnotes
+    return footnotes
+
+def clear_footnote_cache():
+    '''Drops every cached footnotes template.'''
+    with _footnotes_lock:
+        _footnotes.clear()
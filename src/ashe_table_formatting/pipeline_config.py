@@ -117,4 +117,35 @@ Table_sub_number_key = {
     'Paid hour worked - Total' : '.9',
     'Paid hours worked - Basic' : '.10',
     'Paid hours worked - Overtime' : '.11'
-    }
\ No newline at end of file
+    }
+
+# Memory bound in megabytes for parsed CSVs held in the dataset cache, least recently used are dropped first. Split between the workers of a batch run
+Dataset_cache_max_mb = 1024
+
+# Threads used to load the CVs, Values and previous year datasets of a workbook, 1 loads them one after another
+Data_load_threads = 3
+
+# Stream the Unsafe and Safe workbooks to disk from the template, False fills in a full copy of the template instead
+Stream_unsafe_safe_outputs = True
+
+# Keep the compiled template row order in a '.order.json' file next to each template for later runs
+Persist_template_order = False
+
+# Write the time and peak memory of each stage of a table as 'Stage timings.json' and '.csv' in its output folder
+Save_stage_timings = True
+
+# Skip workbooks whose CSVs, template, footnotes and code are unchanged since they were last built, see build_manifest.
+# Off by default as every input is hashed on the first run, run_pipeline turns it on with --incremental
+Incremental_rebuild = False
+
+# Threads create_table saves finished workbooks on while it prepares the next variable, 0 saves each workbook before moving on
+Save_threads = 2
+
+# Saves that can wait for a save thread before create_workbook waits too, which bounds the finished workbooks held in memory
+Save_queue_size = 5
+
+# Also write each main sheet as a typed table with a flag column per value (see columnar_export), 'parquet', 'arrow' for uncompressed memory mappable files, or None
+Columnar_export = None
+
+# Keep the footnotes in a '.footnotes.json' file next to 'Footnotes template.xlsx' for later runs
+Persist_footnotes = False
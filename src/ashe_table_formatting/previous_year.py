@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Previous year data for the year on year comparison. Only the Median and Mean
+of the previous year Values are compared, so only those are prepared, rounded
+as create_data_ready rounds them, rather than every percentile of the nine
+employee types. The prepared tables are kept per previous year folder, table,
+variable and year until one of the CSVs behind them changes, and a year just
+built is kept the same way for the year after it.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from ashe_table_formatting.pipeline_config import Published_tables_data, Published_table_breakdown, Employee_key
+from ashe_table_formatting.csv_index import get_csv_index
+from ashe_table_formatting.data_cache import dataset_key, get_dataset_cache
+from ashe_table_formatting.rounding import round_half_up
+from ashe_table_formatting.sas_csv import read_sas_sections
+from ashe_table_formatting.stage_timings import timed
+from ashe_table_formatting.table_model import Table, table_from_frame
+
+COMPARISON_COLUMNS = ['Code', 'Median', 'Mean'] # All the comparison reads
+HOURLY_VARIABLES = ['Hourly Pay', 'Hourly pay - Excluding overtime'] # Medians given in pence
+MAX_ENTRIES = 32 # Prepared (folder, table, variable, year) entries kept, least recently used are dropped first
+
+_prepared = OrderedDict()
+_prepared_lock = threading.Lock()
+
+read_sections = timed('get_files')(read_sas_sections)
+
+def previous_year_sources(csv_path, table_name, variable, year):
+    '''
+    Lists the Values CSVs of a table's shorthands for a variable and year.
+
+    Parameters
+    ----------
+    csv_path : String
+        Path to the previous year CSVs.
+    table_name : String
+        Table to process.
+    variable : String
+        Variable to process.
+    year : Numeric
+        Year of the data.
+
+    Returns
+    -------
+    sources : List of Tuple
+        (shorthand, csv file path) in Published_tables_data order. A KeyError
+        is raised for a missing file, as create_data_ready would.
+    '''
+    index = get_csv_index(csv_path)
+    variable_year = Published_table_breakdown[variable] + ' ' + f'{year}'
+
+    return [(shorthand, os.path.join(csv_path, index.get(shorthand, {})[variable_year]['Values']))
+            for shorthand in Published_tables_data[table_name]]
+
+def prepare_comparison_data(sections, variable):
+    '''
+    Rounds the Median and Mean of the SAS sections of one employee type the
+    way create_data_ready does for Values.
+
+    Parameters
+    ----------
+    sections : List of Dataframes
+        The employee type's section of each CSV, in Published_tables_data order.
+    variable : String
+        Variable the data is for.
+
+    Returns
+    -------
+    data : Table
+        Code keys with Median and Mean values.
+    '''
+    data_needed = pd.concat(sections).drop_duplicates() # Whole rows, as create_data_ready does
+    data_needed = data_needed[COMPARISON_COLUMNS].copy()
+
+    data_needed['Mean'] = round_half_up(data_needed['Mean'], 1)
+    if variable in HOURLY_VARIABLES:
+        data_needed['Median'] = round_half_up(data_needed['Median'] / 100, 2)
+    else:
+        data_needed['Median'] = round_half_up(data_needed['Median'], 1)
+
+    return table_from_frame(data_needed)
+
+@timed('load_previous_year')
+def load_previous_year(csv_path, table_name, variable, year):
+    '''
+    Loads the previous year Median and Mean for the nine employee types of a
+    sub-table. The CSVs come from the dataset cache.
+
+    Parameters
+    ----------
+    csv_path : String
+        Path to the previous year CSVs.
+    table_name : String
+        Table to process.
+    variable : String
+        Variable to process.
+    year : Numeric
+        Year of the data, i.e. the previous year.
+
+    Returns
+    -------
+    data_list : List of Tables
+        Code, Median and Mean in Employee_key order, not put in template
+        order as the comparison joins them by Code.
+    '''
+    sources = previous_year_sources(csv_path, table_name, variable, year)
+    key = prepared_key(csv_path, table_name, variable, year, sources)
+
+    with _prepared_lock:
+        if key in _prepared:
+            _prepared.move_to_end(key)
+            return _prepared[key]
+
+    dataset_cache = get_dataset_cache()
+    datasets = [dataset_cache.get(csv, shorthand, read_sections) for shorthand, csv in sources]
+    data_list = [prepare_comparison_data([data[employee_type] for data in datasets], variable) for employee_type in Employee_key]
+
+    _keep(key, data_list)
+    return data_list
+
+def remember_previous_year(csv_path, table_name, variable, year, data_list):
+    '''
+    Keeps a year's prepared Values for when it is the previous year, so a
+    run over several years in turn compares each year with the one before
+    it without loading or rounding that year's CSVs again.
+
+    Parameters
+    ----------
+    csv_path : String
+        Path to the year's CSVs.
+    table_name : String
+        Table the data is for.
+    variable : String
+        Variable the data is for.
+    year : Numeric
+        Year of the data.
+    data_list : List of Tables
+        The year's Values from create_data_ready_all, in Employee_key order.
+        Their Median and Mean are rounded as prepare_comparison_data rounds
+        them.
+    '''
+    key = prepared_key(csv_path, table_name, variable, year, previous_year_sources(csv_path, table_name, variable, year))
+    _keep(key, [Table(data.keys[['Code']], data.values[COMPARISON_COLUMNS[1:]], data.flags[COMPARISON_COLUMNS[1:]]) for data in data_list])
+
+def prepared_key(csv_path, table_name, variable, year, sources):
+    '''Cache key of the prepared data, which changes when one of the sources does.'''
+    return (os.path.realpath(csv_path), table_name, variable, year, tuple(dataset_key(csv, shorthand) for shorthand, csv in sources))
+
+def _keep(key, data_list):
+    with _prepared_lock:
+        _prepared[key] = data_list
+        _prepared.move_to_end(key)
+        while len(_prepared) > MAX_ENTRIES:
+            _prepared.popitem(last = False)
+
+def clear_previous_year_cache():
+    '''Drops every prepared entry.'''
+    with _prepared_lock:
+        _prepared.clear()
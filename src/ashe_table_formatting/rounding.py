@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Vectorised ROUND_HALF_UP rounding. Gives the same numbers as
+Decimal(str(x)).quantize(..., rounding=ROUND_HALF_UP) on every element, but
+works on whole NumPy arrays rather than one Decimal object per cell.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+def half_up_units(values, decimals):
+    '''
+    Rounds values half away from zero to a number of decimal places and
+    returns the result as a whole number of units of 10**-decimals, e.g.
+    12.35 to 1 decimal place gives 124.
+
+    Rounding is done on the shortest decimal form of each float (as str()
+    gives), like the Decimal based rounding it replaces. A float that is near
+    a tie is a tie in that form only if it is the closest float to the tie,
+    so those elements are settled by comparing against the tie itself.
+
+    Parameters
+    ----------
+    values : Array like of float
+        Values to round. NaN is kept as NaN.
+    decimals : Integer
+        Number of decimal places.
+
+    Returns
+    -------
+    units : Numpy array of float
+        Whole numbers (held as float so NaN can be kept), with the sign of
+        values.
+    '''
+    values = np.asarray(values, dtype = float)
+    scale = 10.0 ** decimals
+
+    magnitude = np.abs(values)
+    scaled = magnitude * scale
+    whole = np.floor(scaled)
+    units = np.floor(scaled + 0.5)
+
+    '''Settle elements close enough to a tie for float error to matter'''
+    with np.errstate(invalid = 'ignore'): # inf - inf, handled below
+        near_tie = np.abs(scaled - whole - 0.5) <= 1e-9 * np.maximum(scaled, 1.0)
+    tie = (2 * whole + 1) / (2 * scale) # Closest float to the tie, the division is correctly rounded
+    units = np.where(near_tie, np.where(magnitude >= tie, whole + 1, whole), units)
+
+    '''Values too large for exact whole numbers in float fall back to Decimal'''
+    too_large = ~(scaled < 2.0 ** 52) & ~np.isnan(values)
+    if too_large.any():
+        quantum = Decimal(1).scaleb(-decimals)
+        units[too_large] = [abs(float(Decimal(str(x)).quantize(quantum, rounding = ROUND_HALF_UP).scaleb(decimals)))
+                            if np.isfinite(x) else abs(x)
+                            for x in values[too_large]]
+
+    return np.copysign(units, values)
+
+def round_half_up(values, decimals):
+    '''
+    Rounds values half away from zero to a number of decimal places.
+
+    Parameters
+    ----------
+    values : Array like of float
+        Values to round. NaN is kept as NaN.
+    decimals : Integer
+        Number of decimal places.
+
+    Returns
+    -------
+    rounded : Numpy array of float
+        Rounded values, equal to float(Decimal(str(x)).quantize(...)).
+    '''
+    return half_up_units(values, decimals) / 10.0 ** decimals
+
+def rounded_pence_to_pounds(values):
+    '''
+    Converts pence already rounded to 1 decimal place into pounds rounded
+    half up to 2 decimal places, i.e. the Decimal result of
+    (pence / 100).quantize(Decimal('.10')). The division is done on whole
+    numbers so no float error creeps in.
+
+    Parameters
+    ----------
+    values : Array like of float
+        Pence, already rounded with round_half_up(..., 1).
+
+    Returns
+    -------
+    pounds : Numpy array of float
+        Pounds to 2 decimal places.
+    '''
+    tenths = half_up_units(values, 1) # Exact, values are already at 1 decimal place
+    return np.copysign(np.floor((np.abs(tenths) + 5) / 10), tenths) / 100
@@ -1,21 +1,63 @@
+import argparse
+
 import yaml
 
 from ashe_table_formatting.Create_ASHE_tables import (
     create_table,
     create_workbook
 )
+from ashe_table_formatting.batch_runner import run_publication, run_years
+from ashe_table_formatting.data_cache import configure_dataset_cache
 
-def run_pipeline():
+def load_config():
     with open("package_config.yaml", "r") as file:
         example_config = yaml.safe_load(file)
-    example_config = example_config["file_paths"][0]
+    return example_config["file_paths"][0]
+
+def run_pipeline(incremental = False):
+    example_config = load_config()
     csv_path = example_config["csv_path"]
     csv_previous_year_path = example_config["csv_previous_year_path"]
     template_path = example_config["template_path"]
     output_path = example_config["output_path"]
     year = example_config["year"]
-    create_table(csv_path, csv_previous_year_path, template_path, output_path, 'Table 2 - Occupation (2)', year)
-    create_workbook(csv_path, csv_previous_year_path, template_path, output_path, 'Table 9 - Work PC', 'Hourly Pay', year)
+    configure_dataset_cache(cache_path = example_config.get("cache_path"))
+    create_table(csv_path, csv_previous_year_path, template_path, output_path, 'Table 2 - Occupation (2)', year, incremental = incremental)
+    create_workbook(csv_path, csv_previous_year_path, template_path, output_path, 'Table 9 - Work PC', 'Hourly Pay', year, incremental = incremental)
+
+def run_publication_pipeline(incremental = False):
+    example_config = load_config()
+    return run_publication(
+        example_config["csv_path"],
+        example_config["csv_previous_year_path"],
+        example_config["template_path"],
+        example_config["output_path"],
+        example_config["year"],
+        workers = example_config.get("workers"),
+        cache_path = example_config.get("cache_path"),
+        incremental = incremental,
+    )
+
+def run_years_pipeline(incremental = False):
+    example_config = load_config()
+    return run_years(
+        {entry["year"]: entry["csv_path"] for entry in example_config["years"]},
+        example_config["template_path"],
+        example_config["output_path"],
+        workers = example_config.get("workers"),
+        cache_path = example_config.get("cache_path"),
+        incremental = incremental,
+    )
 
 if __name__ == "__main__":
-    run_pipeline()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--publication", action="store_true", help="Create every table in the publication on a process pool")
+    parser.add_argument("--years", action="store_true", help="Create every table for each of the years in the config, each compared with the year before")
+    parser.add_argument("--incremental", action="store_true", help="Skip workbooks whose inputs are unchanged since they were last built")
+    args = parser.parse_args()
+    if args.years:
+        run_years_pipeline(args.incremental)
+    elif args.publication:
+        run_publication_pipeline(args.incremental)
+    else:
+        run_pipeline(args.incremental)
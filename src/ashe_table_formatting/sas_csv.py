@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Single pass reader for the SAS CSV outputs. The file is walked once with the
+csv module, the 'key1=' section boundaries are found on the way, and the
+nine employee type sections come out as typed dataframes.
+"""
+import csv
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from ashe_table_formatting.pipeline_config import Employee_key
+from ashe_table_formatting.table_model import SOURCE_TEXT_SUFFIX
+
+HEADER_ROW = 5 # Rows above the column names
+SECTION_OFFSET = 6 # Data starts this many rows after a 'key1=' row
+MEASURE_COLUMNS = ['population number', 'Median', 'Mean', '10', '20', '25', '30', '40', '60', '70', '75', '80', '90']
+SOURCE_TEXT_COLUMNS = ['Median'] # Measures also kept as their source text, as the hourly CV Median is published as text
+MISSING_VALUES = {'', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                  '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'} # Read as missing, as pandas does
+
+_code_suffix = re.compile(r'\.\d+$')
+
+def column_names(header):
+    '''
+    Names the columns from the header row the way pandas does, so blank names
+    become 'Unnamed: i' and repeats get '.1', '.2' added.
+
+    Parameters
+    ----------
+    header : List of String
+        Header row.
+
+    Returns
+    -------
+    names : List of String
+    '''
+    names = []
+    for i, name in enumerate(header):
+        name = name or f'Unnamed: {i}'
+        candidate, repeat = name, 0
+        while candidate in names:
+            repeat += 1
+            candidate = f'{name}.{repeat}'
+        names.append(candidate)
+    return names
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        pass
+    try:
+        float(value.replace(',', ''))
+        return True
+    except ValueError:
+        return False
+
+def _without_commas(values):
+    joined = '\x00'.join(values) # One C level search and replace over the whole column
+    if ',' not in joined:
+        return list(values)
+    return joined.replace(',', '').split('\x00')
+
+def _measure(values):
+    array = np.array(values, dtype = object)
+    array[array == '.'] = 'nan' # SAS missing value
+    try:
+        return array.astype(float)
+    except ValueError:
+        return pd.to_numeric(array, errors = 'coerce').astype(float)
+
+def _section_frame(rows, names, numeric_others, file_name):
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    data = {}
+
+    for i, (name, values) in enumerate(zip(names, columns)):
+        values = _without_commas(values)
+
+        if i == 0:
+            data['Description'] = np.array(values, dtype = object)
+        elif i == 1:
+            if numeric_others[i]:
+                values = [str(float(value)) for value in values]
+            data['Code'] = np.array([f'{file_name} ' + _code_suffix.sub('', value) for value in values], dtype = object)
+        elif name in MEASURE_COLUMNS:
+            data[name] = _measure(values)
+            if name in SOURCE_TEXT_COLUMNS:
+                data[name + SOURCE_TEXT_SUFFIX] = np.array(values, dtype = object)
+        elif numeric_others[i]:
+            data[name] = np.array(values, dtype = float)
+        else:
+            data[name] = np.array(values, dtype = object)
+
+    return pd.DataFrame(data)
+
+def read_sas_sections(csv_file, file_name):
+    '''
+    Reads a SAS csv in one pass and splits it into the nine employee type
+    sections.
+
+    Rows are kept only if every field is filled in, as before. The measure
+    columns (population number, Median, Mean and the percentiles) are parsed
+    as numbers with the SAS missing value '.' read as NaN, and the
+    SOURCE_TEXT_COLUMNS are also kept as text in a column with
+    SOURCE_TEXT_SUFFIX added to the name. Other columns are numbers if every
+    value in the file is a number, otherwise text. Commas are removed from
+    every field and Code is prefixed with the shorthand.
+
+    Parameters
+    ----------
+    csv_file : String
+        csv file path to be ingested.
+    file_name : String
+        name of csv file - shorthand.
+
+    Returns
+    -------
+    data : Dictionary of dataframes
+        9 dataframes with data from the 9 employee types, keyed by Employee_key.
+    '''
+    with open(csv_file, newline = '', encoding = 'unicode_escape') as file:
+        reader = csv.reader(file)
+
+        for _ in range(HEADER_ROW):
+            next(reader, None)
+        names = column_names(next(reader, []))
+        width = len(names)
+
+        sections = [[] for _ in Employee_key]
+        numeric_others = [i > 0 and name not in MEASURE_COLUMNS for i, name in enumerate(names)]
+        numeric_checks = [i for i, numeric in enumerate(numeric_others) if numeric] # Columns still to be proven text
+        boundaries = [] # Row numbers where the next section starts
+        section = 0
+        row_number = 0
+        held = None # The last row of the file is left out, as before
+
+        for line_number, row in enumerate(reader, HEADER_ROW + 2):
+            if len(row) > width:
+                warnings.warn(f'Skipping line {line_number}: expected {width} fields, saw {len(row)}')
+                continue
+
+            if held is not None:
+                sections[section].append(held)
+            held = None
+
+            while boundaries and boundaries[0] <= row_number:
+                boundaries.pop(0)
+                section += 1
+
+            if row and 'key1=' in row[0] and section + len(boundaries) < len(sections) - 1:
+                boundaries.append(row_number + SECTION_OFFSET)
+
+            text_found = False
+            for i in numeric_checks:
+                if i < len(row) and row[i] not in MISSING_VALUES and not _is_number(row[i]):
+                    numeric_others[i] = False
+                    text_found = True
+            if text_found:
+                numeric_checks = [i for i in numeric_checks if numeric_others[i]]
+
+            if len(row) == width and MISSING_VALUES.isdisjoint(row):
+                held = row
+
+            row_number += 1
+
+    if section + len(boundaries) < len(sections) - 1:
+        raise ValueError(f'{csv_file} has fewer than {len(sections)} key1= sections')
+
+    return {employee_type: _section_frame(rows, names, numeric_others, file_name)
+            for employee_type, rows in zip(Employee_key, sections)}
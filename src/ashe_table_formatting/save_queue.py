@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Background saving of finished workbooks. create_workbook hands its saves to
+a SaveQueue and returns, so the next variable's data is loaded and written
+while threads serialise the last one and write it to the output share. The
+queue is bounded: once it is full create_workbook waits for a free place,
+which keeps the number of finished workbooks held in memory down. Errors are
+collected and reported when the queue is flushed.
+"""
+import queue
+import threading
+import time
+import traceback
+
+from ashe_table_formatting.pipeline_config import Save_queue_size, Save_threads
+from ashe_table_formatting.stage_timings import get_stage_timings
+
+def run_save(filename, save, context = None):
+    '''
+    Runs one save, recorded as the 'save' stage of a workbook.
+
+    Parameters
+    ----------
+    filename : String
+        File being saved, for reporting.
+    save : Function
+        Called with no arguments to save the file.
+    context : Tuple, optional
+        (table, variable) the save is recorded against, the current context
+        if None.
+    '''
+    start = time.perf_counter()
+    try:
+        save()
+    finally:
+        get_stage_timings().add('save', time.perf_counter() - start, context)
+
+class SaveGroup:
+    '''
+    Saves of one workbook. The action passed as then, e.g. recording the
+    build manifest, runs once every save has succeeded.
+    '''
+    def __init__(self, count, then = None):
+        self.remaining = count
+        self.failed = False
+        self.then = then
+        self._lock = threading.Lock()
+
+    def done(self, ok):
+        '''Marks one save finished, running then after the last if none failed.'''
+        with self._lock:
+            self.remaining -= 1
+            self.failed = self.failed or not ok
+            last = self.remaining == 0
+        if last and not self.failed and self.then is not None:
+            self.then()
+
+class SaveQueue:
+    '''
+    Bounded queue of saves run by a pool of threads.
+
+    Attributes
+    ----------
+    errors : List of Tuple
+        (file name, traceback) of the saves that failed since the last flush.
+    '''
+    def __init__(self, max_pending = Save_queue_size, threads = Save_threads):
+        '''
+        Parameters
+        ----------
+        max_pending : Integer
+            Saves that can wait for a thread before submit blocks.
+        threads : Integer
+            Number of save threads.
+        '''
+        self.errors = []
+        self._queue = queue.Queue(maxsize = max(1, max_pending))
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target = self._work, name = f'save-{i}', daemon = True) for i in range(max(1, threads))]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, saves, context = None, then = None):
+        '''
+        Queues the saves of one workbook, waiting for a free place if the
+        queue is full. The workbooks must not be changed once submitted.
+
+        Parameters
+        ----------
+        saves : List of Tuple
+            (file name, save function) pairs. Each function is called with
+            no arguments on a save thread.
+        context : Tuple, optional
+            (table, variable) the saves are recorded against.
+        then : Function, optional
+            Called once every save has succeeded.
+        '''
+        group = SaveGroup(len(saves), then)
+        for filename, save in saves:
+            self._queue.put((filename, save, context, group))
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+
+            filename, save, context, group = item
+            ok = True
+            try:
+                run_save(filename, save, context)
+            except Exception:
+                ok = False
+                with self._lock:
+                    self.errors.append((filename, traceback.format_exc()))
+
+            try:
+                group.done(ok)
+            except Exception:
+                with self._lock:
+                    self.errors.append((filename, traceback.format_exc()))
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        '''
+        Waits for every queued save to finish.
+
+        Returns
+        -------
+        errors : List of Tuple
+            (file name, traceback) of the saves that failed since the last
+            flush.
+        '''
+        self._queue.join()
+        with self._lock:
+            errors, self.errors = self.errors, []
+        return errors
+
+    def close(self):
+        '''
+        Flushes the queue and stops the save threads.
+
+        Returns
+        -------
+        errors : List of Tuple
+            As from flush.
+        '''
+        errors = self.flush()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        return errors
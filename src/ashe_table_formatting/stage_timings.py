@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Wall time, call counts and peak resident memory of the stages of the table
+build (CSV parsing, data preparation, ordering, style copying, cell writing
+and saving), recorded per (table, variable) so a slow table can be traced to
+the stage that dominates it.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import psutil # Installed with the package, resident memory on every platform
+except ImportError:
+    psutil = None
+
+COLUMNS = ['Table', 'Variable', 'Stage', 'Calls', 'Seconds', 'Peak RSS MB']
+SAMPLE_SECONDS = 0.01 # How often resident memory is sampled while a stage runs
+
+def rss_mb():
+    '''
+    Returns the resident memory of this process in megabytes, or None where
+    it cannot be measured (psutil not installed).
+    '''
+    if psutil is None:
+        return None
+    return psutil.Process().memory_info().rss / 2**20
+
+class MemorySampler:
+    '''
+    Samples the resident memory of the process on a background thread while
+    any stage is running, so each stage gets the highest memory seen while
+    it ran rather than the high-water mark of the whole process. The memory
+    is also read as a stage starts and ends, so short stages are measured
+    too.
+    '''
+    def __init__(self, interval = SAMPLE_SECONDS):
+        self.interval = interval
+        self._next = 0
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child = self._reset) # Worker processes start with no sampling thread
+
+    def _reset(self):
+        self._peaks = {} # Highest sample of each running stage
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        '''
+        Starts watching for a stage.
+
+        Returns
+        -------
+        token : Integer or None
+            Passed to stop. None if memory cannot be measured.
+        '''
+        current = rss_mb()
+        if current is None:
+            return None
+
+        with self._condition:
+            token = self._next
+            self._next += 1
+            self._peaks[token] = current
+            if self._thread is None:
+                self._thread = threading.Thread(target = self._sample, name = 'stage-memory', daemon = True)
+                self._thread.start()
+            self._condition.notify()
+        return token
+
+    def stop(self, token):
+        '''
+        Stops watching for a stage.
+
+        Parameters
+        ----------
+        token : Integer or None
+            From start.
+
+        Returns
+        -------
+        peak : Float or None
+            Highest resident memory in megabytes while the stage ran.
+        '''
+        if token is None:
+            return None
+        current = rss_mb()
+        with self._condition:
+            return max(self._peaks.pop(token), current)
+
+    def _sample(self):
+        while True:
+            with self._condition:
+                while not self._peaks:
+                    self._condition.wait()
+            time.sleep(self.interval)
+            current = rss_mb()
+            with self._condition:
+                for token, peak in self._peaks.items():
+                    if current > peak:
+                        self._peaks[token] = current
+
+_memory_sampler = MemorySampler()
+
+class StageTimings:
+    '''
+    Stage records of a process. Stages run inside create_workbook are filed
+    under the (table, variable) it sets as the context, others under None.
+    Nested stages are timed in full, so a stage includes the stages it calls.
+    Peak RSS MB is the highest resident memory of the process seen during
+    any call of the stage, which includes what other threads held then.
+    '''
+    def __init__(self):
+        self.context = (None, None)
+        self.memory = _memory_sampler # One sampling thread per process
+        self._records = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        '''
+        Times the block under the stage name.
+
+        Parameters
+        ----------
+        name : String
+            Stage name.
+        '''
+        context = self.context # As at the start of the stage
+        token = self.memory.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.add(name, seconds, context, self.memory.stop(token))
+
+    def add(self, name, seconds, context = None, peak = None):
+        '''
+        Records one call of a stage.
+
+        Parameters
+        ----------
+        name : String
+            Stage name.
+        seconds : Float
+            Wall time of the call.
+        context : Tuple, optional
+            (table, variable), the current context if None.
+        peak : Float, optional
+            Highest resident memory in megabytes during the call, if known.
+        '''
+        key = (*(context or self.context), name)
+
+        with self._lock:
+            calls, total, highest = self._records.get(key, (0, 0.0, None))
+            if peak is not None:
+                highest = peak if highest is None else max(highest, peak)
+            self._records[key] = (calls + 1, total + seconds, highest)
+
+    def to_frame(self, table = None, variable = None):
+        '''
+        Parameters
+        ----------
+        table : String, optional
+            Only the stages of this table.
+        variable : String, optional
+            Only the stages of this variable.
+
+        Returns
+        -------
+        timings : Dataframe
+            One row per (table, variable, stage) with COLUMNS.
+        '''
+        with self._lock:
+            rows = [(*key, calls, round(total, 3), None if peak is None else round(peak, 1))
+                    for key, (calls, total, peak) in self._records.items()
+                    if (table is None or key[0] == table) and (variable is None or key[1] == variable)]
+        return pd.DataFrame(rows, columns = COLUMNS)
+
+    def save(self, filename, table = None):
+        '''
+        Writes the records as filename.json and filename.csv.
+
+        Parameters
+        ----------
+        filename : String
+            Path without the extension.
+        table : String, optional
+            Only the stages of this table.
+        '''
+        write_stage_timings(self.to_frame(table), filename)
+
+    def summary(self, table = None):
+        '''
+        Parameters
+        ----------
+        table : String, optional
+            Only the stages of this table.
+
+        Returns
+        -------
+        summary : String
+            Calls, time and peak memory per stage over all variables, slowest
+            stage first.
+        '''
+        timings = self.to_frame(table)
+        if timings.empty:
+            return 'No stages recorded'
+        totals = timings.groupby('Stage').agg({'Calls': 'sum', 'Seconds': 'sum', 'Peak RSS MB': 'max'})
+        return totals.sort_values('Seconds', ascending = False).to_string()
+
+    def clear(self, table = None, variable = None):
+        '''
+        Drops records, every one unless table or variable is given.
+
+        Parameters
+        ----------
+        table : String, optional
+            Only the stages of this table.
+        variable : String, optional
+            Only the stages of this variable.
+        '''
+        with self._lock:
+            for key in [key for key in self._records
+                        if (table is None or key[0] == table) and (variable is None or key[1] == variable)]:
+                del self._records[key]
+
+_stage_timings = StageTimings()
+
+def write_stage_timings(timings, filename):
+    '''
+    Writes stage records as filename.json and filename.csv.
+
+    Parameters
+    ----------
+    timings : Dataframe
+        Records with COLUMNS, from StageTimings.to_frame.
+    filename : String
+        Path without the extension.
+    '''
+    timings.to_csv(filename + '.csv', index = False)
+    with open(filename + '.json', 'w') as file:
+        json.dump(json.loads(timings.to_json(orient = 'records')), file, indent = 1)
+
+def get_stage_timings():
+    '''Returns the process wide stage timings.'''
+    return _stage_timings
+
+def timed(name):
+    '''
+    Decorator recording every call of a function as the stage name.
+
+    Parameters
+    ----------
+    name : String
+        Stage name.
+    '''
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _stage_timings.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Copies cell styles between worksheets by style id. A StyleMap records the
+styled cells of a source sheet once, each pointing at one of the distinct
+styles on the sheet. Applying it interns each distinct style into the target
+workbook a single time and then only assigns ids to the target cells, so no
+font, border or fill objects are copied per cell.
+"""
+from array import array
+from copy import copy
+
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.styles.numbers import BUILTIN_FORMATS, BUILTIN_FORMATS_MAX_SIZE, BUILTIN_FORMATS_REVERSE
+
+COPIED_IDS = 6 # fontId, fillId, borderId, numFmtId, protectionId and alignmentId lead each StyleArray
+
+class StyleMap:
+    '''
+    Styles of the cells of one worksheet, ready to be applied to others.
+
+    Attributes
+    ----------
+    workbook : Workbook
+        Workbook the styles were taken from.
+    styles : List of Tuple
+        Distinct (fontId, fillId, borderId, numFmtId, protectionId,
+        alignmentId) of the source, in order of first use.
+    cells : List of Tuple
+        (row, column, index into styles or None, value is 'x') of each source
+        cell that is styled or holds an 'x', row by row.
+    '''
+    def __init__(self, worksheet):
+        '''
+        Parameters
+        ----------
+        worksheet : Worksheet
+            Sheet to take the styles from.
+        '''
+        self.workbook = worksheet.parent
+        self.styles = []
+        self.cells = []
+
+        style_index = {}
+        source_cells = worksheet._cells
+        for key in sorted(source_cells):
+            cell = source_cells[key]
+            style = None
+
+            if cell.has_style:
+                ids = tuple(cell._style[:COPIED_IDS])
+                style = style_index.get(ids)
+                if style is None:
+                    style = style_index[ids] = len(self.styles)
+                    self.styles.append(ids)
+
+            is_x = cell._value == 'x'
+            if style is not None or is_x:
+                self.cells.append((cell.row, cell.column, style, is_x))
+
+    def _intern(self, ids, workbook):
+        font, fill, border, number_format, protection, alignment = ids
+        source = self.workbook
+
+        if number_format < BUILTIN_FORMATS_MAX_SIZE:
+            number_format = BUILTIN_FORMATS.get(number_format, 'General')
+        else:
+            number_format = source._number_formats[number_format - BUILTIN_FORMATS_MAX_SIZE]
+
+        if number_format in BUILTIN_FORMATS_REVERSE:
+            number_format = BUILTIN_FORMATS_REVERSE[number_format]
+        else:
+            number_format = workbook._number_formats.add(number_format) + BUILTIN_FORMATS_MAX_SIZE
+
+        return array('i', [workbook._fonts.add(copy(source._fonts[font])),
+                           workbook._fills.add(copy(source._fills[fill])),
+                           workbook._borders.add(copy(source._borders[border])),
+                           number_format,
+                           workbook._protections.add(copy(source._protections[protection])),
+                           workbook._alignments.add(copy(source._alignments[alignment]))])
+
+    def apply(self, worksheet, copy_x = False):
+        '''
+        Gives the cells of worksheet the styles of the source cells, keeping
+        their values and named styles.
+
+        Parameters
+        ----------
+        worksheet : Worksheet
+            Sheet to style.
+        copy_x : Boolean
+            Also write 'x' wherever the source has one beyond column 2.
+        '''
+        target_styles = [self._intern(ids, worksheet.parent) for ids in self.styles]
+
+        for row, column, style, is_x in self.cells:
+            cell = worksheet.cell(row = row, column = column)
+
+            if style is not None:
+                if not cell._style:
+                    cell._style = StyleArray()
+                cell._style[:COPIED_IDS] = target_styles[style]
+
+            if copy_x and is_x and column > 2:
+                cell.value = 'x'
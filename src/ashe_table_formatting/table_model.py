@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Typed table model for the published data. Published columns are held as
+float64 values with a parallel uint8 flag per cell recording why a cell has
+no number ('.', ':', '..', 'x' or blank). The marker strings are only put in
+when rows are rendered for the Excel writer.
+"""
+import numpy as np
+import pandas as pd
+
+'''Cell flags'''
+VALUE = 0 # A number to publish
+MISSING = 1 # SAS gave no value
+NO_DATA = 2 # Code is in the template but not in the data
+BLANK = 3 # Left empty
+UNSAFE = 4 # Row failed the Safe check
+SUPPRESSED = 5 # Too few in the population or CV too high
+
+MARKERS = {MISSING: '.', NO_DATA: ':', BLANK: '', UNSAFE: '..', SUPPRESSED: 'x'}
+
+KEY_COLUMNS = ['Code', 'Description', 'Safe', 'Order'] # Carried with the rows but never published
+SOURCE_TEXT_SUFFIX = ' text' # Added to a text column's name for its SAS source text, carried with the keys
+BLANK_COLUMNS = ['Median', 'Year on Year % Change', 'Mean', 'Year on Year % Change.1', '10', '20', '25', '30', '40', '60', '70', '75', '80', '90'] # Left empty rather than given a row marker
+
+class Table:
+    '''
+    Rows of one employee type ready to publish.
+
+    Attributes
+    ----------
+    keys : Dataframe
+        Code, Description, Safe and (once ordered) Order of each row, and
+        the SAS source text of the text columns.
+    values : Dataframe
+        Published columns as float64. Only read where the flag is VALUE, as
+        versions made with with_flags share their values.
+    flags : Dataframe
+        uint8 flag of each cell in values.
+    text_columns : Set of String
+        Columns whose numbers are published as text.
+    '''
+    def __init__(self, keys, values, flags, text_columns = ()):
+        self.keys = keys
+        self.values = values
+        self.flags = flags
+        self.text_columns = set(text_columns)
+
+    def __len__(self):
+        return len(self.values)
+
+    def with_flags(self, flags, values = None):
+        '''
+        Another version of the table with its own flags. Keys and (unless
+        given) values are shared with this table, not copied.
+
+        Parameters
+        ----------
+        flags : Array of uint8
+            Flag of each cell.
+        values : Dataframe, optional
+            Published columns, if they differ from this table's.
+
+        Returns
+        -------
+        table : Table
+        '''
+        flags = pd.DataFrame(flags, index = self.flags.index, columns = self.flags.columns)
+        return Table(self.keys, self.values if values is None else values, flags, self.text_columns)
+
+    def flagged_rows(self, rows, flag):
+        '''
+        Flags with whole rows flagged, BLANK_COLUMNS left empty. The table is
+        not changed.
+
+        Parameters
+        ----------
+        rows : Array like of bool
+            Rows to flag.
+        flag : Integer
+            Flag for the columns not in BLANK_COLUMNS.
+
+        Returns
+        -------
+        flags : Array of uint8
+        '''
+        rows = np.asarray(rows, dtype = bool)
+        blank = self.values.columns.isin(BLANK_COLUMNS)
+
+        flags = self.flags.to_numpy(copy = True)
+        flags[np.ix_(rows, ~blank)] = flag
+        flags[np.ix_(rows, blank)] = BLANK
+        return flags
+
+    def flagged_cells(self, rows, columns, flag):
+        '''
+        Flags with the cells of some columns in some rows flagged. The table
+        is not changed.
+
+        Parameters
+        ----------
+        rows : Array like of bool
+            Rows to flag.
+        columns : List of String
+            Columns to flag.
+        flag : Integer
+            Flag to set.
+
+        Returns
+        -------
+        flags : Array of uint8
+        '''
+        rows = np.asarray(rows, dtype = bool)
+
+        flags = self.flags.to_numpy(copy = True)
+        flags[np.ix_(rows, self.flags.columns.isin(columns))] = flag
+        return flags
+
+    def mark_rows(self, rows, flag):
+        '''
+        Flags whole rows, with BLANK_COLUMNS left empty.
+
+        Parameters
+        ----------
+        rows : Array like of bool
+            Rows to flag.
+        flag : Integer
+            Flag for the columns not in BLANK_COLUMNS.
+        '''
+        self.flags = pd.DataFrame(self.flagged_rows(rows, flag), index = self.flags.index, columns = self.flags.columns)
+        values = self.values.to_numpy(copy = True)
+        values[np.asarray(rows, dtype = bool)] = np.nan
+        self.values = pd.DataFrame(values, index = self.values.index, columns = self.values.columns)
+
+def table_from_frame(data, text_columns = ()):
+    '''
+    Splits a dataframe of SAS data into a Table. Published columns that are
+    not numbers are read as missing, as SAS writes '.' for those.
+
+    Parameters
+    ----------
+    data : Dataframe
+        Code, Description and Safe plus the published columns.
+    text_columns : List of String, optional
+        Columns whose numbers are published as text. Their SAS source text,
+        if data has it (see SOURCE_TEXT_SUFFIX), is kept with the keys and
+        published as it is.
+
+    Returns
+    -------
+    table : Table
+    '''
+    key_columns = [*KEY_COLUMNS, *(column + SOURCE_TEXT_SUFFIX for column in text_columns)]
+    keys = data[[column for column in key_columns if column in data.columns]]
+    values = data[[column for column in data.columns if column not in key_columns]]
+    values = values.apply(lambda x: pd.to_numeric(x, errors='coerce')).astype(float)
+    flags = pd.DataFrame(np.where(values.isna(), MISSING, VALUE).astype(np.uint8), index = values.index, columns = values.columns)
+
+    return Table(keys, values, flags, text_columns)
+
+def order_table(table, order):
+    '''
+    Puts the rows of a table in the order of the template. Codes in the
+    template with no data get NO_DATA, and data with no place in the
+    template is dropped.
+
+    Parameters
+    ----------
+    table : Table
+        Table to order.
+    order : Dataframe
+        Code and Order from the template.
+
+    Returns
+    -------
+    ordered : Table
+        Table with Order added to its keys, one row per template code.
+    '''
+    positions = pd.DataFrame({'Code': table.keys['Code'].to_numpy(), 'Row': np.arange(len(table))})
+    merged = pd.merge(order, positions, how= 'outer', on = 'Code')
+    merged = merged[merged['Order'].notna()]
+    merged = merged.sort_values('Order')
+
+    rows = merged['Row'].to_numpy()
+    take = np.where(np.isnan(rows), -1, np.nan_to_num(rows)).astype(int)
+    return take_rows(table, merged[['Code', 'Order']].reset_index(drop = True), take)
+
+def take_rows(table, keys, take):
+    '''
+    Builds a table from rows of another. Rows with no source row get NO_DATA.
+
+    Parameters
+    ----------
+    table : Table
+        Table to take rows from.
+    keys : Dataframe
+        Code and Order of each new row, with a RangeIndex.
+    take : Array of int
+        Row of table for each new row, -1 where there is none.
+
+    Returns
+    -------
+    taken : Table
+    '''
+    present = take >= 0
+    take = take[present]
+
+    values = np.full((len(keys), table.values.shape[1]), np.nan)
+    values[present] = table.values.to_numpy()[take]
+    flags = np.full((len(keys), table.flags.shape[1]), NO_DATA, dtype = np.uint8)
+    flags[present] = table.flags.to_numpy()[take]
+
+    keys = keys.copy()
+    for column in ['Description', 'Safe', *(column + SOURCE_TEXT_SUFFIX for column in table.text_columns)]:
+        if column in table.keys.columns:
+            key = np.full(len(keys), np.nan, dtype = object)
+            key[present] = table.keys[column].to_numpy()[take]
+            keys[column] = key
+
+    taken = Table(keys,
+                  pd.DataFrame(values, index = keys.index, columns = table.values.columns),
+                  pd.DataFrame(flags, index = keys.index, columns = table.flags.columns),
+                  table.text_columns)
+    taken.mark_rows(~present, NO_DATA)
+    return taken
+
+def split_table(table, bounds):
+    '''
+    Splits a table into runs of consecutive rows.
+
+    Parameters
+    ----------
+    table : Table
+        Table to split.
+    bounds : Array of int
+        First row of each part, then the end of the last part.
+
+    Returns
+    -------
+    parts : List of Tables
+        Copies, so each part can be changed on its own.
+    '''
+    return [Table(table.keys.iloc[start:stop].copy(), table.values.iloc[start:stop].copy(),
+                  table.flags.iloc[start:stop].copy(), table.text_columns)
+            for start, stop in zip(bounds[:-1], bounds[1:])]
+
+def text_mask(table, numeric_text = False):
+    '''
+    Finds the columns whose numbers are published as text.
+
+    Parameters
+    ----------
+    table : Table
+        Table to render.
+    numeric_text : Boolean
+        Publish text columns as numbers when every cell is a number or blank.
+
+    Returns
+    -------
+    mask : Array of bool
+        One per column of table.values.
+    '''
+    flags = table.flags.to_numpy()
+    return np.array([column in table.text_columns and not (numeric_text and np.isin(flags[:, i], [VALUE, BLANK]).all())
+                     for i, column in enumerate(table.values.columns)], dtype = bool)
+
+def render_rows(table, numeric_text = False):
+    '''
+    Renders a table as rows of cell values for the Excel writer, with the
+    flags turned into their markers. Numbers in text columns are written as
+    their SAS source text where the table has it.
+
+    Parameters
+    ----------
+    table : Table
+        Table to render.
+    numeric_text : Boolean
+        Publish text columns as numbers when every cell is a number or blank.
+
+    Returns
+    -------
+    rows : List of Lists
+        One list of cell values per row, in column order.
+    '''
+    cells = table.values.to_numpy(dtype = object)
+    flags = table.flags.to_numpy()
+
+    for i in np.flatnonzero(text_mask(table, numeric_text)):
+        is_value = flags[:, i] == VALUE
+        source = table.values.columns[i] + SOURCE_TEXT_SUFFIX
+        if source in table.keys.columns:
+            cells[is_value, i] = table.keys[source].to_numpy()[is_value]
+        else:
+            cells[is_value, i] = [np.format_float_positional(x, trim = '-') for x in cells[is_value, i]]
+
+    for flag, marker in MARKERS.items():
+        cells[flags == flag] = marker
+
+    return cells.tolist()
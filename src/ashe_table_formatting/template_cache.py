@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Cache of parsed template workbooks. Each template file is parsed once per
+process and callers get independent in-memory clones, which skips the XML
+parse that dominates opy.load_workbook. The data tabs, which are only read
+for the row order (see template_order) and are dropped from the outputs, can
+be left out of the parse, so large lookup tabs are never held in memory.
+The clones copy openpyxl internals, which is why openpyxl is pinned in
+setup.cfg; test_template_cache checks them against that version.
+"""
+import os
+import threading
+from copy import copy
+
+from openpyxl.cell.cell import Cell, MergedCell
+from openpyxl.reader.excel import ExcelReader
+from openpyxl.utils.indexed_list import IndexedList
+from openpyxl.worksheet.dimensions import DimensionHolder
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+def clone_worksheet(source, parent):
+    '''
+    Copies a worksheet into the workbook parent. Cells, style arrays,
+    dimensions, merged cells and page setup are copied so the clone can be
+    changed freely; conditional formatting, validations, images and views
+    are shared with the source, which must not be changed.
+
+    Parameters
+    ----------
+    source : Worksheet
+        Worksheet to copy.
+    parent : Workbook
+        Workbook the copy belongs to.
+
+    Returns
+    -------
+    worksheet : Worksheet
+        The copy.
+    '''
+    worksheet = copy(source)
+    worksheet._parent = parent
+
+    cells = {}
+    new_cell_object = Cell.__new__ # Bypasses Cell.__init__ validation, the source values are already valid
+    for key, cell in source._cells.items():
+        if cell.__class__ is Cell:
+            new_cell = new_cell_object(Cell)
+            new_cell.parent = worksheet
+            new_cell._style = copy(cell._style)
+            new_cell.row = cell.row
+            new_cell.column = cell.column
+            new_cell._value = cell._value
+            new_cell.data_type = cell.data_type
+            new_cell._hyperlink = None
+            new_cell._comment = None
+            if cell._hyperlink is not None:
+                new_cell._hyperlink = copy(cell._hyperlink)
+            if cell._comment is not None:
+                new_cell.comment = copy(cell._comment)
+        else:
+            new_cell = MergedCell(worksheet, cell.row, cell.column)
+            new_cell._style = copy(cell._style)
+        cells[key] = new_cell
+    worksheet._cells = cells
+
+    worksheet.row_dimensions = DimensionHolder(worksheet = worksheet, default_factory = worksheet._add_row)
+    worksheet.column_dimensions = DimensionHolder(worksheet = worksheet, default_factory = worksheet._add_column)
+    for attr in ('row_dimensions', 'column_dimensions'):
+        target = getattr(worksheet, attr)
+        for key, dimension in getattr(source, attr).items():
+            target[key] = copy(dimension)
+            target[key].worksheet = worksheet
+
+    worksheet.merged_cells = copy(source.merged_cells)
+    worksheet.page_setup = copy(source.page_setup)
+    worksheet.page_setup.worksheet = worksheet
+    worksheet.print_options = copy(source.print_options)
+    worksheet.page_margins = copy(source.page_margins)
+    worksheet.defined_names = copy(source.defined_names)
+    worksheet._rels = copy(source._rels)
+    worksheet._hyperlinks = []
+    worksheet._comments = []
+
+    return worksheet
+
+def clone_workbook(source):
+    '''
+    Copies a workbook in memory. The style tables are copied since saving or
+    restyling a cell adds to them; document level parts such as the theme and
+    properties are shared with the source.
+
+    Parameters
+    ----------
+    source : Workbook
+        Workbook to copy. It must not be changed while clones are in use.
+
+    Returns
+    -------
+    workbook : Workbook
+        Independent copy of source.
+    '''
+    workbook = copy(source)
+
+    for attr in ('_fonts', '_alignments', '_borders', '_fills', '_number_formats', '_protections', '_cell_styles', 'shared_strings'):
+        setattr(workbook, attr, IndexedList(getattr(source, attr)))
+
+    workbook._named_styles = copy(source._named_styles)
+    workbook._date_formats = dict(source._date_formats)
+    workbook._timedelta_formats = dict(source._timedelta_formats)
+    workbook.defined_names = copy(source.defined_names)
+    workbook._external_links = list(source._external_links)
+    workbook._sheets = [clone_worksheet(sheet, workbook) for sheet in source._sheets]
+
+    return workbook
+
+class TemplateReader(ExcelReader):
+    '''
+    Reads a workbook as opy.load_workbook does, but without parsing the
+    skipped sheets. They are added empty while the workbook is read, so sheet
+    scoped names (print areas and titles) still find their sheets by
+    position, and are removed once it is read.
+    '''
+    def __init__(self, filename, skip_sheets = ()):
+        super().__init__(filename)
+        self.skip_sheets = set(skip_sheets)
+
+    def read_worksheets(self):
+        find_sheets = self.parser.find_sheets
+
+        def parsed_sheets():
+            for sheet, rel in find_sheets():
+                if sheet.name not in self.skip_sheets:
+                    yield sheet, rel
+                elif rel.target in self.valid_files:
+                    self.wb.create_sheet(sheet.name) # Placeholder, keeps the place of the sheets after it
+
+        self.parser.find_sheets = parsed_sheets
+        super().read_worksheets()
+
+    def read(self):
+        super().read()
+        for sheet in self.skip_sheets:
+            if sheet in self.wb.sheetnames:
+                del self.wb[sheet]
+
+def get_template(filename, skip_sheets = ()):
+    '''
+    Returns the cached parse of a template workbook. The file is parsed the
+    first time it is asked for, and again only if its modification time or
+    size changes.
+
+    Parameters
+    ----------
+    filename : String
+        Path to the template.
+    skip_sheets : List of String
+        Sheets left out of the parse and of the workbook, e.g. the data tabs.
+        Each set of skipped sheets is cached separately.
+
+    Returns
+    -------
+    workbook : Workbook
+        The shared parsed template. It must not be changed, use
+        load_template for a copy to fill in.
+    '''
+    path = os.path.realpath(filename)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cache_key = (path, tuple(skip_sheets))
+
+    with _templates_lock:
+        cached = _templates.get(cache_key)
+        if cached is None or cached[0] != key:
+            reader = TemplateReader(path, skip_sheets)
+            reader.read()
+            cached = (key, reader.wb)
+            _templates[cache_key] = cached
+
+    return cached[1]
+
+def load_template(filename, skip_sheets = ()):
+    '''
+    Returns an independent copy of a template workbook, parsing the file only
+    when it is not already cached (see get_template).
+
+    Parameters
+    ----------
+    filename : String
+        Path to the template.
+    skip_sheets : List of String
+        Sheets left out of the copy.
+
+    Returns
+    -------
+    workbook : Workbook
+        Copy of the template, free to be filled in and saved.
+    '''
+    return clone_workbook(get_template(filename, skip_sheets))
+
+def clear_template_cache():
+    '''Drops every cached template.'''
+    with _templates_lock:
+        _templates.clear()
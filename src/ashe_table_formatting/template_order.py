@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+@Customer: ASHE Team
+
+Row order of the templates compiled into an index. The codes on the data
+tabs of a template are streamed from the file once per template and kept
+sorted by their order, so a table is put in template order by looking up row positions
+rather than by a merge and sort. The compiled order is shared by every
+variable and year that uses the template, and can be kept in a file next to
+the template for later runs.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+import openpyxl as opy
+import pandas as pd
+
+from ashe_table_formatting.table_model import order_table, take_rows
+
+SIDECAR_SUFFIX = '.order.json' # Added to the template file name for the stored order
+
+_orders = {}
+_orders_lock = threading.Lock()
+
+def template_order_frame(template_xlsx, table_file_names):
+    '''
+    Reads the codes and their order from column A and C of the data tabs of a
+    template. Codes are prefixed with the tab name and a code on more than
+    one tab takes the order from the last.
+
+    Parameters
+    ----------
+    template_xlsx : Workbook
+        Loaded template workbook.
+    table_file_names : List of String
+        Data tabs to read.
+
+    Returns
+    -------
+    ordered_df : Dataframe
+        Code and Order.
+    '''
+    order = {}
+    for table in table_file_names:
+        sheet = template_xlsx[table]
+        list_key = [f'{table}' + ' ' + str(cell.value) for cell in sheet['A']]
+        list_order = [cell.value for cell in sheet['C']]
+        order.update(zip(list_key[1:], list_order[1:]))
+
+    return pd.DataFrame(list(order.items())).rename(columns = {0: 'Code', 1: 'Order'})
+
+def read_template_order(filename, table_file_names):
+    '''
+    Reads the codes and their order as template_order_frame does, streaming
+    only columns A to C of the data tabs from the file rather than loading the
+    whole template.
+
+    Parameters
+    ----------
+    filename : String
+        Path to the template.
+    table_file_names : List of String
+        Data tabs to read.
+
+    Returns
+    -------
+    ordered_df : Dataframe
+        Code and Order.
+    '''
+    template_xlsx = opy.load_workbook(filename, read_only = True)
+    try:
+        order = {}
+        for table in table_file_names:
+            rows = template_xlsx[table].iter_rows(min_col = 1, max_col = 3, values_only = True)
+            next(rows, None) # Header
+            order.update((f'{table}' + ' ' + str(code), code_order) for code, _, code_order in rows)
+    finally:
+        template_xlsx.close() # Read only workbooks keep the file open
+
+    return pd.DataFrame(list(order.items())).rename(columns = {0: 'Code', 1: 'Order'})
+
+class TemplateOrder:
+    '''
+    Compiled row order of a template.
+
+    Attributes
+    ----------
+    frame : Dataframe
+        Code and Order of every code on the template, as read.
+    codes : Array of String
+        Codes with an order, sorted by it. One output row each.
+    keys : Dataframe
+        Code and Order of the output rows.
+    '''
+    def __init__(self, frame):
+        '''
+        Parameters
+        ----------
+        frame : Dataframe
+            Code and Order, from template_order_frame.
+        '''
+        self.frame = frame
+        ordered = frame[frame['Order'].notna()].sort_values('Order', kind = 'stable')
+
+        self.codes = ordered['Code'].to_numpy()
+        self.keys = ordered[['Code', 'Order']].reset_index(drop = True)
+        self._positions = pd.Index(self.codes)
+
+        self._exact = frame['Code'].is_unique and ordered['Order'].is_unique # Otherwise ties and repeats are left to order_table
+
+    def apply(self, table):
+        '''
+        Puts the rows of a table in template order. Codes on the template with
+        no data get NO_DATA and data with no place on the template is dropped,
+        exactly as order_table does.
+
+        Parameters
+        ----------
+        table : Table
+            Table to order.
+
+        Returns
+        -------
+        ordered : Table
+        '''
+        codes = table.keys['Code'].to_numpy()
+        if not self._exact or not pd.Index(codes).is_unique:
+            return order_table(table, self.frame)
+
+        positions = self._positions.get_indexer(codes)
+        found = positions >= 0
+        take = np.full(len(self.codes), -1)
+        take[positions[found]] = np.flatnonzero(found)
+
+        return take_rows(table, self.keys, take)
+
+    def save(self, filename, table_file_names):
+        '''
+        Stores the order as JSON, written to a temporary file first so another
+        process never reads it half written.
+
+        Parameters
+        ----------
+        filename : String
+            File to write.
+        table_file_names : List of String
+            Data tabs the order was read from.
+        '''
+        temp = filename + '.' + str(os.getpid()) + '.tmp'
+        with open(temp, 'w') as file:
+            json.dump({'Sheets': list(table_file_names),
+                       'Code': self.frame['Code'].tolist(),
+                       'Order': [None if pd.isna(x) else x for x in self.frame['Order'].tolist()]}, file)
+        os.replace(temp, filename)
+
+    @classmethod
+    def load(cls, filename, table_file_names):
+        '''
+        Reads an order stored with save.
+
+        Parameters
+        ----------
+        filename : String
+            File to read.
+        table_file_names : List of String
+            Data tabs the order must have been read from.
+
+        Returns
+        -------
+        order : TemplateOrder or None
+            None if the file was stored for other tabs or cannot be read, so
+            the template is read again.
+        '''
+        try:
+            with open(filename) as file:
+                stored = json.load(file)
+            if stored['Sheets'] != list(table_file_names):
+                return None
+            codes, orders = stored['Code'], stored['Order']
+        except (ValueError, KeyError, TypeError):
+            return None
+        return cls(pd.DataFrame(list(zip(codes, orders))).rename(columns = {0: 'Code', 1: 'Order'}))
+
+def get_template_order(filename, table_file_names, persist = False):
+    '''
+    Returns the compiled order of a template, compiling it the first time it
+    is asked for in a process and again only if the template changes.
+
+    Parameters
+    ----------
+    filename : String
+        Path to the template.
+    table_file_names : List of String
+        Data tabs of the template.
+    persist : Boolean
+        Also keep the order in a file next to the template, and read it from
+        there when it is newer than the template.
+
+    Returns
+    -------
+    order : TemplateOrder
+    '''
+    path = os.path.realpath(filename)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size, tuple(table_file_names))
+
+    with _orders_lock:
+        order = _orders.get(key)
+    if order is not None:
+        return order
+
+    sidecar = path + SIDECAR_SUFFIX
+    if persist and os.path.exists(sidecar) and os.stat(sidecar).st_mtime_ns > stat.st_mtime_ns:
+        order = TemplateOrder.load(sidecar, table_file_names)
+
+    if order is None:
+        order = TemplateOrder(read_template_order(path, table_file_names))
+        if persist:
+            order.save(sidecar, table_file_names)
+
+    with _orders_lock:
+        _orders[key] = order
+    return order
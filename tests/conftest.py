@@ -0,0 +1,19 @@
+import pytest
+
+@pytest.fixture
+def write_sas_csv():
+    """Writes a SAS output csv: 5 title lines, the header, then one section of rows per employee type."""
+
+    def write(path, sections, columns=("Description", "Code", "population number", "Median", "Mean", "Safe"),
+              type_of_value="CVs"):
+        lines = ["title\n", "key1=first\n", "shorthand\n", f"{type_of_value}\n", "\n", ",".join(columns) + "\n"]
+        for number, rows in enumerate(sections):
+            if number:
+                lines.append(f"key1=section {number}\n")
+                lines.extend(["\n"] * 5)
+            lines.extend(rows)
+        lines.append("End of report\n")
+        path.write_text("".join(lines))
+        return str(path)
+
+    return write
@@ -0,0 +1,63 @@
+import pandas as pd
+
+from ashe_table_formatting import batch_runner
+from ashe_table_formatting.batch_runner import publication_jobs, run_jobs, run_publication, series_years
+from ashe_table_formatting.data_cache import get_dataset_cache
+from ashe_table_formatting.pipeline_config import Dataset_cache_max_mb
+
+
+def test_series_years():
+    assert series_years({2021: "b", 2019: "a", 2020: "c", 2017: "d"}) == [2020, 2021]
+    assert series_years({2021: "b"}) == []
+
+
+def test_jobs_by_variable():
+    jobs = publication_jobs(["Table 2", "Table 5"], ["Hourly Pay", "Annual pay - Gross"])
+    assert jobs[:2] == [("Table 2", "Hourly Pay"), ("Table 5", "Hourly Pay")]
+
+
+def test_failed_job_reported(tmp_path, monkeypatch):
+    def create_workbook(csv_path, csv_previous_year_path, template_path, output_path, table_name, table_variable, year, force, incremental):
+        if table_name == "Table 2":
+            raise ValueError("Broken template")
+        return table_variable == "Hourly Pay"
+
+    monkeypatch.setattr(batch_runner, "create_workbook", create_workbook)
+    report = run_publication("csv", "csv py", "templates", str(tmp_path), 2021,
+                             tables=["Table 2", "Table 5"], variables=["Hourly Pay", "Annual pay - Gross"], workers=1)
+
+    saved = pd.read_csv(tmp_path / "Batch report.csv", keep_default_na=False)
+    assert saved[["Table", "Variable", "Status"]].values.tolist() == [
+        ["Table 2", "Hourly Pay", "Failed"],
+        ["Table 5", "Hourly Pay", "Done"],
+        ["Table 2", "Annual pay - Gross", "Failed"],
+        ["Table 5", "Annual pay - Gross", "Up to date"],
+    ]
+    assert "Broken template" in saved["Error"].iat[0]
+    assert saved["Error"].iat[1] == ""
+    assert len(report) == 4
+
+
+def test_incremental_only_when_asked(tmp_path, monkeypatch):
+    calls = []
+
+    def create_workbook(csv_path, csv_previous_year_path, template_path, output_path, table_name, table_variable, year, force, incremental):
+        calls.append((force, incremental))
+        return True
+
+    monkeypatch.setattr(batch_runner, "create_workbook", create_workbook)
+    run_publication("csv", "csv py", "templates", str(tmp_path), 2021, tables=["Table 2"], variables=["Hourly Pay"], workers=1)
+    run_publication("csv", "csv py", "templates", str(tmp_path), 2021, tables=["Table 2"], variables=["Hourly Pay"], workers=1,
+                    incremental=True)
+    run_publication("csv", "csv py", "templates", str(tmp_path), 2021, tables=["Table 2"], variables=["Hourly Pay"], workers=1,
+                    force=True, incremental=True)
+    assert calls == [(False, False), (False, True), (True, True)]
+
+
+def cache_bound(args):
+    return get_dataset_cache().max_bytes
+
+
+def test_workers_share_cache_bound():
+    bounds = run_jobs(cache_bound, [()] * 4, workers=2)
+    assert bounds == [int(Dataset_cache_max_mb / 2 * 1024 * 1024)] * 4
@@ -0,0 +1,61 @@
+import os
+
+from ashe_table_formatting.build_manifest import BuildManifest, file_record, workbook_inputs
+from ashe_table_formatting.pipeline_config import Published_tables_templates
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+
+def test_file_record_reuses_hash_when_unchanged(tmp_path):
+    filename = write(tmp_path / "a.csv", "1,2")
+    known = dict(file_record(filename), sha256="recorded")
+    assert file_record(filename, known)["sha256"] == "recorded"
+    write(tmp_path / "a.csv", "1,2,3")
+    assert file_record(filename, known)["sha256"] != "recorded"
+    assert file_record(str(tmp_path / "missing.csv")) is None
+
+
+def test_workbook_inputs(tmp_path):
+    table = "Table 2 - Occupation (2)"
+    for name in ["occ1 - GPAY 2021 - CVs.csv", "occ1 - GPAY 2021 - Values.csv", "occ2 - GPAY 2021 - Values.csv",
+                 "occ1 - HPAY 2021 - Values.csv"]:
+        write(tmp_path / "2021" / name, "")
+    for name in ["occ1 - GPAY 2020 - CVs.csv", "occ1 - GPAY 2020 - Values.csv"]:
+        write(tmp_path / "2020" / name, "")
+
+    inputs = workbook_inputs(str(tmp_path / "2021"), str(tmp_path / "2020"), str(tmp_path / "t"), table,
+                             "Weekly pay - Gross", 2021)
+    names = [os.path.basename(filename) for filename in inputs]
+    assert sorted(names[:3]) == ["occ1 - GPAY 2021 - CVs.csv", "occ1 - GPAY 2021 - Values.csv",
+                                 "occ2 - GPAY 2021 - Values.csv"]
+    assert names[3:] == ["occ1 - GPAY 2020 - Values.csv", Published_tables_templates[table], "Footnotes template.xlsx"]
+
+
+def test_manifest_tracks_inputs_and_outputs(tmp_path):
+    inputs = [write(tmp_path / "in" / "a.csv", "a"), write(tmp_path / "in" / "template.xlsx", "t")]
+    outputs = [write(tmp_path / "out" / "x.xlsx", "x")]
+
+    manifest = BuildManifest(str(tmp_path / "out"), "Table", "Variable")
+    assert not manifest.is_current(inputs, outputs)
+    manifest.record(inputs, outputs)
+    assert BuildManifest(str(tmp_path / "out"), "Table", "Variable").is_current(inputs, outputs)
+
+    # Rewritten with the same contents, so still current and the new time is kept
+    write(tmp_path / "in" / "a.csv", "a")
+    os.utime(inputs[0], ns=(1, 1))
+    assert BuildManifest(str(tmp_path / "out"), "Table", "Variable").is_current(inputs, outputs)
+    assert BuildManifest(str(tmp_path / "out"), "Table", "Variable").entry["inputs"][inputs[0]]["mtime_ns"] == 1
+
+    write(tmp_path / "in" / "template.xlsx", "changed")
+    assert not BuildManifest(str(tmp_path / "out"), "Table", "Variable").is_current(inputs, outputs)
+
+    manifest = BuildManifest(str(tmp_path / "out"), "Table", "Variable")
+    manifest.is_current(inputs, outputs)
+    manifest.record(inputs, outputs)
+    os.remove(outputs[0])
+    assert not BuildManifest(str(tmp_path / "out"), "Table", "Variable").is_current(inputs, outputs)
+    assert not BuildManifest(str(tmp_path / "out"), "Other", "Variable").is_current(inputs, outputs)
@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ashe_table_formatting.columnar_export import export_filename, published_frame, with_suppressed, write_published_frame
+from ashe_table_formatting.table_model import UNSAFE, table_from_frame
+
+pyarrow = pytest.importorskip("pyarrow")
+import pyarrow.ipc  # noqa: E402
+import pyarrow.parquet  # noqa: E402
+
+
+@pytest.fixture
+def table():
+    data = pd.DataFrame(
+        {
+            "Description": ["a", "b"],
+            "Code": ["occ1 1", "occ1 2"],
+            "population number": [5.0, 2.0],
+            "Median": [10.5, np.nan],
+            "Safe": [1.0, 0.0],
+        }
+    )
+    table = table_from_frame(data)
+    return table.with_flags(table.flagged_rows(table.keys["Safe"] == 0, UNSAFE))
+
+
+def test_published_frame(table):
+    frame = published_frame(table)
+    assert list(frame.columns) == ["Code", "Description", "population number", "Median",
+                                   "population number flag", "Median flag"]
+    assert frame["population number"].tolist()[0] == 5.0
+    assert np.isnan(frame["population number"].iat[1])  # Unsafe, so no number even though one is held
+    assert frame["population number flag"].tolist() == ["value", "unsafe"]
+    assert frame["Median flag"].tolist() == ["value", "blank"]
+    assert frame["Median flag"].cat.codes.tolist() == table.flags["Median"].tolist()
+
+
+def test_with_suppressed_by_column_name(table):
+    cells = pd.DataFrame({"Median": [True, False], "Other": [True, True]})
+    suppressed = with_suppressed(table, cells)
+    assert published_frame(suppressed)["Median flag"].tolist() == ["suppressed", "blank"]
+    assert published_frame(table)["Median flag"].tolist() == ["value", "blank"]
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_round_trip(tmp_path, table, file_format):
+    filename = export_filename(str(tmp_path), "Total Table 1.1a Weekly pay - Gross", 2021, "All", file_format)
+    frame = published_frame(table)
+    write_published_frame(frame, filename, {"Table": "Table 1 - All Employees", "Year": 2021})
+
+    if file_format == "arrow":
+        with pyarrow.memory_map(filename) as source:
+            loaded = pyarrow.ipc.open_file(source).read_all()
+    else:
+        loaded = pyarrow.parquet.read_table(filename)
+    assert json.loads(loaded.schema.metadata[b"ashe"])["Year"] == 2021
+    pd.testing.assert_frame_equal(loaded.to_pandas(), frame)
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        export_filename(str(tmp_path), "name", 2021, "All", "csv")
@@ -0,0 +1,118 @@
+import pytest
+
+from ashe_table_formatting.Create_ASHE_tables import create_data_ready, create_data_ready_all, load_workbook_data
+from ashe_table_formatting.data_cache import get_dataset_cache
+from ashe_table_formatting.table_model import render_rows
+from ashe_table_formatting.pipeline_config import Employee_key
+from ashe_table_formatting.previous_year import clear_previous_year_cache, load_previous_year, remember_previous_year
+
+COLUMNS = ["Description", "Code", "population number", "Median", "Mean", "10", "20", "25", "30", "40", "60", "70", "75", "80", "90", "Safe"]
+PERCENTILES = ",".join(["12.25"] * 10)
+
+
+def write_inputs(write_sas_csv, path, year, scale=1):
+    path.mkdir(exist_ok=True)
+    for shorthand in ["ppr"]:
+        for type_of_value in ["CVs", "Values"]:
+            sections = [
+                [
+                    f"Public {n},{n}01,{n}2500,{n * scale}123.45,.,{PERCENTILES},1\n",
+                    f"Private {n},{n}02,.,7.35,8.25,{PERCENTILES},0\n",
+                    f"Public {n},{n}01,{n}2500,{n * scale}123.45,.,{PERCENTILES},1\n",  # Repeated row
+                ]
+                for n in range(9)
+            ]
+            write_sas_csv(path / f"{shorthand} - HE {year} - {type_of_value}.csv", sections, COLUMNS, type_of_value)
+    return str(path)
+
+
+@pytest.fixture
+def csv_path(tmp_path, write_sas_csv):
+    return write_inputs(write_sas_csv, tmp_path, 2021)
+
+
+@pytest.mark.parametrize("type_of_value", ["CVs", "Values"])
+def test_all_employee_types_at_once(csv_path, type_of_value):
+    tables = create_data_ready_all(csv_path, "Table 13 - PubPriv", "Hourly Pay", type_of_value, 2021)
+    assert len(tables) == len(Employee_key)
+
+    for employee_type, table in zip(Employee_key, tables):
+        expected = create_data_ready(csv_path, "Table 13 - PubPriv", "Hourly Pay", type_of_value, employee_type, 2021)
+        assert table.keys.equals(expected.keys)
+        assert table.values.equals(expected.values)
+        assert table.flags.equals(expected.flags)
+        assert table.text_columns == expected.text_columns
+
+
+def test_remembered_as_previous_year(csv_path):
+    clear_previous_year_cache()
+    loaded = load_previous_year(csv_path, "Table 13 - PubPriv", "Hourly Pay", 2021)
+
+    clear_previous_year_cache()
+    values = create_data_ready_all(csv_path, "Table 13 - PubPriv", "Hourly Pay", "Values", 2021)
+    remember_previous_year(csv_path, "Table 13 - PubPriv", "Hourly Pay", 2021, values)
+    remembered = load_previous_year(csv_path, "Table 13 - PubPriv", "Hourly Pay", 2021)
+    clear_previous_year_cache()
+
+    for table, expected in zip(remembered, loaded):
+        assert table.keys["Code"].tolist() == expected.keys["Code"].tolist()
+        assert table.values.reset_index(drop=True).equals(expected.values.reset_index(drop=True))
+        assert table.flags.reset_index(drop=True).equals(expected.flags.reset_index(drop=True))
+
+
+def test_threaded_load_same_as_serial(tmp_path, write_sas_csv):
+    csv_path = write_inputs(write_sas_csv, tmp_path / "2021", 2021)
+    csv_previous_year_path = write_inputs(write_sas_csv, tmp_path / "2020", 2020, scale=2)
+    loads = []
+    for threads in [1, 3]:
+        get_dataset_cache().clear()
+        clear_previous_year_cache()
+        loads.append(load_workbook_data(csv_path, csv_previous_year_path, "Table 13 - PubPriv", "Hourly Pay", 2021, threads))
+    clear_previous_year_cache()
+
+    for serial, threaded in zip(*loads): # CVs, Values, previous year
+        assert len(serial) == len(threaded) == len(Employee_key)
+        for serial_table, threaded_table in zip(serial, threaded):
+            assert serial_table.keys.equals(threaded_table.keys)
+            assert serial_table.values.equals(threaded_table.values)
+            assert serial_table.flags.equals(threaded_table.flags)
+    assert not loads[0][1][1].values["Median"].equals(loads[0][2][1].values["Median"]) # Previous year is its own data
+
+
+def test_hourly_cv_median_published_as_source_text(tmp_path, write_sas_csv):
+    sections = [[f"Public {n},{n}01,2500,5.10,.,{PERCENTILES},1\n", f"Private {n},{n}02,2500,14.0,8.25,{PERCENTILES},1\n"]
+                for n in range(9)]
+    write_sas_csv(tmp_path / "ppr - HE 2021 - CVs.csv", sections, COLUMNS)
+    write_sas_csv(tmp_path / "ppr - HE 2021 - Values.csv", sections, COLUMNS, "Values")
+
+    table = create_data_ready(str(tmp_path), "Table 13 - PubPriv", "Hourly Pay", "CVs", [*Employee_key][0], 2021)
+    median = list(table.values.columns).index("Median")
+    assert [row[median] for row in render_rows(table)] == ["5.10", "14.0"]
+    assert table.values["Median"].tolist() == [5.1, 14.0]
+
+    values = create_data_ready(str(tmp_path), "Table 13 - PubPriv", "Hourly Pay", "Values", [*Employee_key][0], 2021)
+    assert list(values.keys.columns) == ["Code", "Description", "Safe"] # Source text only kept where it is published
+
+
+@pytest.mark.parametrize("type_of_value", ["CVs", "Values"])
+def test_split_matches_each_employee_type_with_empty_section(tmp_path, write_sas_csv, type_of_value):
+    empty = 4
+    sections = [
+        [f"Short {n},{n}03,2500\n"] if n == empty  # Dropped for its missing fields, leaving the section without rows
+        else [f"Public {n},{n}01,{n}2500,{n}123.45,.,{PERCENTILES},1\n", f"Private {n},{n}02,.,7.35,8.25,{PERCENTILES},0\n"]
+        for n in range(9)
+    ]
+    for value_type in ["CVs", "Values"]:
+        write_sas_csv(tmp_path / f"ppr - HE 2021 - {value_type}.csv", sections, COLUMNS, value_type)
+
+    tables = create_data_ready_all(str(tmp_path), "Table 13 - PubPriv", "Hourly Pay", type_of_value, 2021)
+    assert len(tables) == len(Employee_key)
+    assert len(tables[empty].values) == 0
+    assert all(len(table.values) == 2 for n, table in enumerate(tables) if n != empty)
+
+    for employee_type, table in zip(Employee_key, tables):
+        expected = create_data_ready(str(tmp_path), "Table 13 - PubPriv", "Hourly Pay", type_of_value, employee_type, 2021)
+        assert table.keys.equals(expected.keys)
+        assert table.values.equals(expected.values)
+        assert table.flags.equals(expected.flags)
+        assert table.text_columns == expected.text_columns
@@ -0,0 +1,62 @@
+import pytest
+
+from ashe_table_formatting.csv_index import (
+    get_csv_index,
+    get_table_sources,
+    parse_csv_name,
+)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    for name in [
+        "occ1 - GPAY 2021 - CVs.csv",
+        "occ1 - GPAY 2021 - Values.csv",
+        "occ2 - GPAY 2021 - Values.csv",
+        "go4 - GPAY 2021 - Values.csv",
+        "notes.txt",
+        "readme.csv",
+    ]:
+        (tmp_path / name).write_text("")
+    return tmp_path
+
+
+class TestParseCsvName:
+    def test_three_parts(self):
+        assert parse_csv_name("occ1 - GPAY 2021 - CVs.csv") == ("occ1", "GPAY 2021", "CVs")
+
+    def test_not_csv(self):
+        assert parse_csv_name("occ1 - GPAY 2021 - CVs.xlsx") is None
+
+    def test_wrong_number_of_parts(self):
+        assert parse_csv_name("readme.csv") is None
+
+
+class TestGetCsvIndex:
+    def test_exact_shorthand(self, csv_path):
+        index = get_csv_index(str(csv_path))
+        assert sorted(index) == ["go4", "occ1", "occ2"]
+        assert index["occ1"]["GPAY 2021"] == {
+            "CVs": "occ1 - GPAY 2021 - CVs.csv",
+            "Values": "occ1 - GPAY 2021 - Values.csv",
+        }
+
+    def test_rescan_on_new_file(self, csv_path):
+        get_csv_index(str(csv_path))
+        (csv_path / "occ2 - GPAY 2021 - CVs.csv").write_text("")
+        assert "CVs" in get_csv_index(str(csv_path))["occ2"]["GPAY 2021"]
+
+
+class TestGetTableSources:
+    def test_lists_files_for_variable(self, csv_path):
+        sources = get_table_sources(str(csv_path), "Table 2 - Occupation (2)", "Weekly pay - Gross", 2021)
+        assert sorted(sources["File"]) == [
+            "occ1 - GPAY 2021 - CVs.csv",
+            "occ1 - GPAY 2021 - Values.csv",
+            "occ2 - GPAY 2021 - Values.csv",
+        ]
+
+    def test_missing_shorthand_listed(self, csv_path):
+        sources = get_table_sources(str(csv_path), "Table 1 - All Employees")
+        assert sources["Shorthand"].tolist() == ["total"]
+        assert sources["File"].isna().all()
@@ -0,0 +1,50 @@
+import numpy as np
+import openpyxl as opy
+import pandas as pd
+import pytest
+
+from ashe_table_formatting.cv_banding import DARK_BLUE, LIGHT_BLUE, PLAIN, cv_bands, write_cv_sheet
+from ashe_table_formatting.table_model import render_rows, table_from_frame
+
+
+@pytest.fixture
+def table():
+    data = pd.DataFrame(
+        {
+            "Code": ["a 1", "a 2"],
+            "population number": [0.0, 4.0],
+            "Median": [5.0, 25.0],
+            "Mean": [5.5, 12.0],
+            "10": [20.0, "."],
+            "20": [21.0, "."],
+            "25": [".", -1.0],
+        }
+    )
+    return table_from_frame(data)
+
+
+class TestCvBands:
+    def test_bands(self, table):
+        bands, over_limit, missing = cv_bands(table)
+        assert bands.tolist() == [
+            [PLAIN, PLAIN, LIGHT_BLUE, DARK_BLUE, DARK_BLUE, DARK_BLUE],
+            [PLAIN, DARK_BLUE, DARK_BLUE, PLAIN, PLAIN, PLAIN],
+        ]
+        assert np.argwhere(over_limit).tolist() == [[0, 4], [1, 1]]
+        assert np.argwhere(missing).tolist() == [[0, 5]]
+
+    def test_text_columns_plain(self, table):
+        table.text_columns = {"Median"}
+        bands, over_limit, missing = cv_bands(table, numeric_text=False)
+        assert bands[1, 1] == PLAIN
+        assert not over_limit[1, 1]
+
+
+def test_write_cv_sheet(table):
+    sheet = opy.Workbook().active
+    bands, over_limit, missing = cv_bands(table)
+    write_cv_sheet(sheet, 6, 3, render_rows(table), bands, over_limit | missing)
+    assert [cell.value for cell in sheet[6]][2:] == [0, 5, 5.5, 20, "x", "x"]
+    assert sheet["E6"].fill.start_color.rgb == "0000FFFF"
+    assert sheet["H6"].fill.start_color.rgb == "0033CCCC"
+    assert sheet["C6"].fill.fill_type is None
@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ashe_table_formatting import data_cache
+from ashe_table_formatting.data_cache import DatasetCache, PersistentDatasetStore, dataset_key, dataset_size
+from ashe_table_formatting.pipeline_config import Employee_key
+
+
+def fake_dataset(rows):
+    return {"Male": pd.DataFrame({"Code": [f"occ1 {i}" for i in range(rows)], "Median": [1.0] * rows})}
+
+
+def write_csv(path, text="x"):
+    path.write_text(text)
+    return str(path)
+
+
+def counting_loader(rows=10, delay=0):
+    calls = []
+
+    def loader(csv, file_name):
+        calls.append((csv, file_name))
+        time.sleep(delay)
+        return fake_dataset(rows)
+
+    return loader, calls
+
+
+class TestDatasetCache:
+    def test_hit(self, tmp_path):
+        csv = write_csv(tmp_path / "a.csv")
+        cache = DatasetCache()
+        loader, calls = counting_loader()
+        first = cache.get(csv, "occ1", loader)
+        assert cache.get(csv, "occ1", loader) is first
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_lru_eviction_by_max_mb(self, tmp_path):
+        size = dataset_size(fake_dataset(1000))
+        cache = DatasetCache(max_mb=2.5 * size / 2**20) # Room for two
+        loader, calls = counting_loader(1000)
+        csvs = [write_csv(tmp_path / f"{n}.csv") for n in range(3)]
+
+        cache.get(csvs[0], "occ1", loader)
+        cache.get(csvs[1], "occ1", loader)
+        cache.get(csvs[0], "occ1", loader) # Most recently used now
+        cache.get(csvs[2], "occ1", loader) # Evicts csvs[1]
+        assert cache.stats()["entries"] == 2
+        assert cache.current_bytes <= cache.max_bytes
+
+        cache.get(csvs[0], "occ1", loader)
+        assert len(calls) == 3
+        cache.get(csvs[1], "occ1", loader)
+        assert len(calls) == 4
+
+    def test_larger_than_bound_not_kept(self, tmp_path):
+        csv = write_csv(tmp_path / "a.csv")
+        cache = DatasetCache(max_mb=0)
+        loader, calls = counting_loader()
+        cache.get(csv, "occ1", loader)
+        cache.get(csv, "occ1", loader)
+        assert len(calls) == 2
+        assert cache.stats()["entries"] == 0
+
+    def test_reissued_csv(self, tmp_path):
+        path = tmp_path / "a.csv"
+        csv = write_csv(path)
+        cache = DatasetCache()
+        loader, calls = counting_loader()
+        cache.get(csv, "occ1", loader)
+
+        stat = os.stat(csv)
+        os.utime(csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9)) # New mtime
+        cache.get(csv, "occ1", loader)
+        assert len(calls) == 2
+
+        write_csv(path, "longer")
+        os.utime(csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9)) # Same mtime, new size
+        cache.get(csv, "occ1", loader)
+        assert len(calls) == 3
+
+    def test_one_parse_for_concurrent_gets(self, tmp_path):
+        csv = write_csv(tmp_path / "a.csv")
+        cache = DatasetCache()
+        loader, calls = counting_loader(delay=0.2)
+        results = []
+        start = threading.Barrier(8)
+
+        def get():
+            start.wait()
+            results.append(cache.get(csv, "occ1", loader))
+
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.skipif(data_cache.pyarrow is None, reason="needs pyarrow")
+class TestPersistentDatasetStore:
+    @pytest.fixture
+    def data(self):
+        return {
+            employee_type: pd.DataFrame(
+                {
+                    "Description": ["Area 1", "Area 2"],
+                    "Code": ["go4 1", "go4 2"],
+                    "population number": [1234.0, np.nan],
+                    "Median": [n + 0.5, 2.0],
+                    "Safe": [1.0, 0.0],
+                }
+            )
+            for n, employee_type in enumerate(Employee_key)
+        }
+
+    def test_round_trip(self, tmp_path, data):
+        csv = write_csv(tmp_path / "go4.csv")
+        store = PersistentDatasetStore(str(tmp_path / "store"))
+        key = dataset_key(csv, "go4")
+        store.save(key, data)
+
+        loaded = store.load(key)
+        assert list(loaded) == [*Employee_key]
+        for employee_type, frame in data.items():
+            pd.testing.assert_frame_equal(loaded[employee_type], frame)
+        assert loaded[[*Employee_key][0]]["Code"].tolist() == ["go4 1", "go4 2"]
+
+    def test_miss_on_new_version(self, tmp_path, data, monkeypatch):
+        csv = write_csv(tmp_path / "go4.csv")
+        store = PersistentDatasetStore(str(tmp_path / "store"))
+        key = dataset_key(csv, "go4")
+        store.save(key, data)
+
+        write_csv(tmp_path / "go4.csv", "reissued")
+        assert store.load(dataset_key(csv, "go4")) is None
+        assert store.load(dataset_key(csv, "go5")) is None
+        monkeypatch.setattr(data_cache, "STORE_FORMAT_VERSION", data_cache.STORE_FORMAT_VERSION + 1)
+        assert store.load(key) is None
+
+    def test_older_versions_pruned(self, tmp_path, data):
+        csv = write_csv(tmp_path / "go4.csv")
+        other = write_csv(tmp_path / "go5.csv")
+        store = PersistentDatasetStore(str(tmp_path / "store"))
+        store.save(dataset_key(csv, "go4"), data)
+        store.save(dataset_key(other, "go5"), data)
+
+        write_csv(tmp_path / "go4.csv", "reissued")
+        store.save(dataset_key(csv, "go4"), data)
+        assert sorted(os.listdir(tmp_path / "store")) == sorted(
+            os.path.basename(store.path(dataset_key(path, name))) for path, name in [(csv, "go4"), (other, "go5")]
+        )
+
+    def test_used_by_cache(self, tmp_path, data):
+        csv = write_csv(tmp_path / "go4.csv")
+        store = PersistentDatasetStore(str(tmp_path / "store"))
+        DatasetCache(store=store).get(csv, "go4", lambda csv, file_name: data)
+
+        loaded = DatasetCache(store=store).get(csv, "go4", lambda csv, file_name: pytest.fail("parsed again"))
+        pd.testing.assert_frame_equal(loaded[[*Employee_key][0]], data[[*Employee_key][0]])
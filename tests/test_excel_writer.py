@@ -0,0 +1,68 @@
+import openpyxl as opy
+import pytest
+from openpyxl.styles import Font
+
+from ashe_table_formatting import excel_writer
+from ashe_table_formatting.excel_writer import (
+    StreamedWorkbook,
+    TemplateWorkbook,
+    block_values,
+    missing_stream_internals,
+    output_workbook,
+)
+
+
+@pytest.fixture
+def template(tmp_path):
+    workbook = opy.Workbook()
+    sheet = workbook.active
+    sheet.title = "All"
+    sheet["A1"] = "Title"
+    sheet["C6"].font = Font(bold=True)
+    sheet["A10"] = "Footnote"
+    workbook.create_sheet("Drop")
+    path = tmp_path / "template.xlsx"
+    workbook.save(path)
+    return str(path)
+
+
+class TestBlockValues:
+    def test_later_blocks_win(self):
+        blocks = [(1, 1, [["a", "b"]]), (1, 2, [["c", None]])]
+        assert block_values(blocks, 1) == {1: "a", 2: "c"}
+
+
+@pytest.mark.parametrize("writer", [StreamedWorkbook, TemplateWorkbook])
+def test_write_sheet(template, tmp_path, writer):
+    output = writer(template, ["Drop"])
+    output.write_sheet("All", [(1, 1, [["Name"]]), (6, 3, [[1.5, "x"], [2.0, ""]])])
+    path = tmp_path / "output.xlsx"
+    output.save(path)
+
+    sheet = opy.load_workbook(path)["All"]
+    assert opy.load_workbook(path).sheetnames == ["All"]
+    assert sheet["A1"].value == "Name"
+    assert [sheet["C6"].value, sheet["D6"].value, sheet["C7"].value] == [1.5, "x", 2.0]
+    assert sheet["C6"].font.bold
+    assert sheet["A10"].value == "Footnote"
+
+
+def test_streams_with_pinned_openpyxl(template):
+    assert missing_stream_internals() == []
+    assert isinstance(output_workbook(template, ["Drop"]), StreamedWorkbook)
+    assert isinstance(output_workbook(template, ["Drop"], stream=False), TemplateWorkbook)
+
+
+def test_falls_back_without_internals(template, tmp_path, monkeypatch):
+    monkeypatch.setitem(excel_writer.STREAM_INTERNALS, "cell", ["_style", "_renamed_in_a_later_openpyxl"])
+    missing_stream_internals.cache_clear()
+    try:
+        with pytest.warns(UserWarning, match="cell._renamed_in_a_later_openpyxl"):
+            output = output_workbook(template, ["Drop"])
+    finally:
+        missing_stream_internals.cache_clear()
+    assert isinstance(output, TemplateWorkbook)
+
+    output.write_sheet("All", [(1, 1, [["Name"]])])
+    output.save(tmp_path / "output.xlsx")
+    assert opy.load_workbook(tmp_path / "output.xlsx").sheetnames == ["All"]
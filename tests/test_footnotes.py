@@ -0,0 +1,76 @@
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+from ashe_table_formatting.footnotes import FOOTNOTE_SHEETS, SIDECAR_SUFFIX, clear_footnote_cache, get_footnotes, load_footnotes
+
+
+def write_footnotes(path):
+    with pd.ExcelWriter(path) as writer:
+        for number, sheet in enumerate(FOOTNOTE_SHEETS, 1):
+            pd.DataFrame({"Footnote": [f"Footnote {number}.{i}" for i in range(5)] + [np.nan, "Last"]}).to_excel(
+                writer, sheet_name=sheet, index=False
+            )
+
+
+def test_read_once(tmp_path):
+    path = tmp_path / "Footnotes template.xlsx"
+    write_footnotes(path)
+    clear_footnote_cache()
+
+    footnotes = get_footnotes(str(path))
+    expected = pd.read_excel(path, sheet_name=FOOTNOTE_SHEETS)
+    assert all(footnotes[sheet].equals(expected[sheet]) for sheet in FOOTNOTE_SHEETS)
+    assert get_footnotes(str(path)) is footnotes
+
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9)) # Changed, so read again
+    assert get_footnotes(str(path)) is not footnotes
+    clear_footnote_cache()
+
+
+def test_sidecar(tmp_path):
+    path = tmp_path / "Footnotes template.xlsx"
+    write_footnotes(path)
+    clear_footnote_cache()
+
+    footnotes = get_footnotes(str(path), persist=True)
+    assert os.path.exists(str(path) + SIDECAR_SUFFIX)
+    clear_footnote_cache()
+
+    stored = get_footnotes(str(path), persist=True)
+    assert stored is not footnotes
+    for sheet in FOOTNOTE_SHEETS:
+        assert stored[sheet]["Footnote"].tolist()[:5] == footnotes[sheet]["Footnote"].tolist()[:5]
+        assert np.isnan(stored[sheet]["Footnote"].iat[5])
+        assert stored[sheet].equals(footnotes[sheet])
+    clear_footnote_cache()
+
+
+def test_unreadable_sidecar_read_again(tmp_path):
+    path = tmp_path / "Footnotes template.xlsx"
+    write_footnotes(path)
+    sidecar = tmp_path / ("Footnotes template.xlsx" + SIDECAR_SUFFIX)
+    sidecar.write_text('{"FootNotes1": {"Footn')  # e.g. half written by another process
+    clear_footnote_cache()
+
+    assert load_footnotes(str(sidecar)) is None
+    footnotes = get_footnotes(str(path), persist=True)
+    assert footnotes["FootNotes1"]["Footnote"].iat[0] == "Footnote 1.0"
+    assert load_footnotes(str(sidecar))["FootNotes1"].equals(footnotes["FootNotes1"])
+    assert [file.name for file in tmp_path.iterdir() if file.suffix == ".tmp"] == []
+    clear_footnote_cache()
+
+
+def test_dates_not_stored(tmp_path):
+    path = tmp_path / "Footnotes template.xlsx"
+    with pd.ExcelWriter(path) as writer:
+        for sheet in FOOTNOTE_SHEETS:
+            pd.DataFrame({"Footnote": ["Published", datetime.datetime(2021, 10, 26)]}).to_excel(writer, sheet_name=sheet, index=False)
+    clear_footnote_cache()
+
+    footnotes = get_footnotes(str(path), persist=True)
+    assert footnotes["FootNotes1"]["Footnote"].iat[1] == datetime.datetime(2021, 10, 26)
+    assert not os.path.exists(str(path) + SIDECAR_SUFFIX)
+    clear_footnote_cache()
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from ashe_table_formatting.Create_ASHE_tables import compare_year_and_previous_year
+from ashe_table_formatting.previous_year import prepare_comparison_data
+from ashe_table_formatting.table_model import BLANK, MISSING, VALUE, table_from_frame
+
+
+def section(codes, medians, means):
+    return pd.DataFrame(
+        {
+            "Description": codes,
+            "Code": codes,
+            "population number": 5000.0,
+            "Median": medians,
+            "Mean": means,
+            "10": 1.0,
+            "Safe": 1.0,
+        }
+    )
+
+
+class TestPrepareComparisonData:
+    def test_rounding(self):
+        data = prepare_comparison_data([section(["a 1"], [1234.5], [10.25])], "Hourly Pay")
+        assert data.values["Median"].iat[0] == 12.35
+        assert data.values["Mean"].iat[0] == 10.3
+        data = prepare_comparison_data([section(["a 1"], [1234.25], [10.25])], "Weekly pay - Gross")
+        assert data.values["Median"].iat[0] == 1234.3
+
+    def test_only_compared_columns(self):
+        data = prepare_comparison_data([section(["a 1"], [1.0], [np.nan])], "Weekly pay - Gross")
+        assert list(data.values.columns) == ["Median", "Mean"]
+        assert data.flags["Mean"].iat[0] == MISSING
+
+    def test_repeated_rows_dropped(self):
+        data = prepare_comparison_data([section(["a 1", "b 1"], [1.0, 2.0], [1.0, 2.0]),
+                                        section(["b 1"], [2.0], [2.0])], "Weekly pay - Gross")
+        assert data.keys["Code"].tolist() == ["a 1", "b 1"]
+
+
+def test_comparison_joins_by_code():
+    data = table_from_frame(
+        pd.DataFrame(
+            {
+                "Code": ["a 1", "a 2", "a 3"],
+                "Median": [110.0, 50.0, 30.0],
+                "Mean": [20.0, np.nan, 30.0],
+                "Year on Year % Change": np.nan,
+                "Year on Year % Change.1": np.nan,
+                "Safe": 1.0,
+            },
+            index=[4, 0, 7],
+        )
+    )
+    data_py = prepare_comparison_data([section(["a 2", "a 1"], [25.0, 100.0], [10.0, 10.0])], "Weekly pay - Gross")
+
+    compared = compare_year_and_previous_year(data, data_py)
+    assert compared.values["Year on Year % Change"].tolist()[:2] == [10.0, 100.0]
+    assert compared.values["Year on Year % Change.1"].tolist()[0] == 100.0
+    assert compared.flags["Year on Year % Change"].tolist() == [VALUE, VALUE, BLANK] # a 3 is new this year
+    assert compared.flags["Year on Year % Change.1"].tolist() == [VALUE, BLANK, BLANK]
+    assert np.isnan(data.values["Year on Year % Change"]).all() # Shared values are left alone
@@ -0,0 +1,83 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pytest
+
+from ashe_table_formatting.rounding import (
+    round_half_up,
+    rounded_pence_to_pounds,
+)
+
+SEEDS = range(5)
+
+
+def decimal_round(values, quantum):
+    return np.array(
+        [float(Decimal(str(x)).quantize(Decimal(quantum), rounding=ROUND_HALF_UP)) for x in values]
+    )
+
+
+def csv_like_values(rng, size):
+    """Floats parsed from short decimal strings, like the SAS CSV values."""
+    digits = rng.integers(0, 5, size)
+    magnitude = 10.0 ** rng.integers(-1, 7, size)
+    raw = rng.uniform(-1, 1, size) * magnitude
+    return np.array([float(f"{x:.{d}f}") for x, d in zip(raw, digits)])
+
+
+def assert_same(result, expected):
+    np.testing.assert_array_equal(result, expected)
+    np.testing.assert_array_equal(np.signbit(result), np.signbit(expected))
+
+
+class TestRoundHalfUp:
+    @pytest.mark.parametrize("seed", SEEDS)
+    @pytest.mark.parametrize("decimals, quantum", [(0, "1"), (1, ".1"), (2, ".10")])
+    def test_matches_decimal_on_csv_values(self, seed, decimals, quantum):
+        values = csv_like_values(np.random.default_rng(seed), 5000)
+        assert_same(round_half_up(values, decimals), decimal_round(values, quantum))
+
+    @pytest.mark.parametrize("seed", SEEDS)
+    @pytest.mark.parametrize("decimals, quantum", [(0, "1"), (1, ".1"), (2, ".10")])
+    def test_matches_decimal_on_ties(self, seed, decimals, quantum):
+        rng = np.random.default_rng(seed)
+        whole = rng.integers(-10**6, 10**6, 5000)
+        values = (whole + 0.5) / 10**decimals
+        assert_same(round_half_up(values, decimals), decimal_round(values, quantum))
+
+    @pytest.mark.parametrize("seed", SEEDS)
+    def test_matches_decimal_on_arbitrary_floats(self, seed):
+        rng = np.random.default_rng(seed)
+        values = rng.normal(0, 1000, 5000) / rng.uniform(0.01, 100, 5000)
+        assert_same(round_half_up(values, 1), decimal_round(values, ".1"))
+
+    def test_known_float_error_cases(self):
+        values = [1.005, 2.675, 0.15, 0.25, 0.35, -0.45, 1234.55, 8.345]
+        assert_same(round_half_up(values, 2), decimal_round(values, ".10"))
+        assert_same(round_half_up(values, 1), decimal_round(values, ".1"))
+
+    def test_nan_is_kept(self):
+        result = round_half_up([np.nan, 1.25], 1)
+        assert np.isnan(result[0])
+        assert result[1] == 1.3
+
+
+class TestRoundedPenceToPounds:
+    @pytest.mark.parametrize("seed", SEEDS)
+    def test_matches_decimal(self, seed):
+        pence = round_half_up(csv_like_values(np.random.default_rng(seed), 5000), 1)
+        expected = np.array(
+            [
+                float(
+                    (Decimal(str(x)).quantize(Decimal(".1"), rounding=ROUND_HALF_UP) / 100).quantize(
+                        Decimal(".10"), rounding=ROUND_HALF_UP
+                    )
+                )
+                for x in pence
+            ]
+        )
+        assert_same(rounded_pence_to_pounds(pence), expected)
+
+    def test_tie_after_division(self):
+        assert rounded_pence_to_pounds([1234.5])[0] == 12.35
+        assert rounded_pence_to_pounds([-1234.5])[0] == -12.35
@@ -0,0 +1,49 @@
+import math
+
+import pytest
+
+from ashe_table_formatting.pipeline_config import Employee_key
+from ashe_table_formatting.sas_csv import column_names, read_sas_sections
+from ashe_table_formatting.table_model import SOURCE_TEXT_SUFFIX
+
+
+@pytest.fixture
+def sas_csv(tmp_path, write_sas_csv):
+    sections = [[f'"Area, {n}",{n}01,"1,234",{n}.5,.,1\n', f"Blank,{n}02,,1,2,1\n"] for n in range(9)]
+    return write_sas_csv(tmp_path / "go4 - GPAY 2021 - CVs.csv", sections)
+
+
+class TestColumnNames:
+    def test_blank_and_repeated(self):
+        assert column_names(["", "Code", "Change", "Change"]) == ["Unnamed: 0", "Code", "Change", "Change.1"]
+
+
+class TestReadSasSections:
+    def test_nine_sections_in_order(self, sas_csv):
+        data = read_sas_sections(sas_csv, "go4")
+        assert list(data) == [*Employee_key]
+        assert [frame["Median"].iat[0] for frame in data.values()] == [n + 0.5 for n in range(9)]
+
+    def test_rows_with_missing_fields_dropped(self, sas_csv):
+        data = read_sas_sections(sas_csv, "go4")
+        assert all(len(frame) == 1 for frame in data.values())
+
+    def test_typed_columns(self, sas_csv):
+        frame = read_sas_sections(sas_csv, "go4")[[*Employee_key][0]]
+        assert frame["Description"].iat[0] == "Area 0"
+        assert frame["Code"].iat[0] == "go4 1"
+        assert frame["population number"].iat[0] == 1234.0
+        assert math.isnan(frame["Mean"].iat[0])
+        assert frame["Safe"].dtype == float
+
+    def test_too_few_sections(self, tmp_path, write_sas_csv):
+        path = write_sas_csv(tmp_path / "short.csv", [["a,1,1,1,1,1\n"]] * 3)
+        with pytest.raises(ValueError):
+            read_sas_sections(path, "short")
+
+
+def test_source_text_kept(tmp_path, write_sas_csv):
+    sections = [[f"Area {n},{n}01,5,5.10,1,1\n", f"Area {n},{n}02,5,14.0,1,1\n", f"Area {n},{n}03,5,.,1,1\n"] for n in range(9)]
+    frame = read_sas_sections(write_sas_csv(tmp_path / "go4.csv", sections), "go4")[[*Employee_key][0]]
+    assert frame["Median"].tolist()[:2] == [5.1, 14.0]
+    assert frame["Median" + SOURCE_TEXT_SUFFIX].tolist() == ["5.10", "14.0", "."]
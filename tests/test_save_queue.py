@@ -0,0 +1,43 @@
+import threading
+
+from ashe_table_formatting.save_queue import SaveQueue
+
+
+def test_saves_then_action(tmp_path):
+    done = []
+    save_queue = SaveQueue(max_pending=2, threads=2)
+    saves = [(str(tmp_path / f"{i}.xlsx"), lambda i=i: (tmp_path / f"{i}.xlsx").write_text("x")) for i in range(5)]
+    save_queue.submit(saves, ("Table", "Variable"), lambda: done.append(len(list(tmp_path.iterdir()))))
+    assert save_queue.close() == []
+    assert done == [5]
+
+
+def test_errors_reported_and_action_skipped():
+    done = []
+
+    def fail():
+        raise OSError("share unavailable")
+
+    save_queue = SaveQueue(threads=1)
+    save_queue.submit([("a.xlsx", lambda: None), ("b.xlsx", fail)], then=lambda: done.append(True))
+    errors = save_queue.flush()
+    assert [filename for filename, _ in errors] == ["b.xlsx"]
+    assert "share unavailable" in errors[0][1]
+    assert done == []
+    assert save_queue.close() == []
+
+
+def test_submit_waits_when_full():
+    release = threading.Event()
+    save_queue = SaveQueue(max_pending=1, threads=1)
+    save_queue.submit([("a.xlsx", release.wait)]) # Taken by the thread
+    save_queue.submit([("b.xlsx", lambda: None)]) # Fills the queue
+
+    submitted = threading.Event()
+    thread = threading.Thread(target=lambda: (save_queue.submit([("c.xlsx", lambda: None)]), submitted.set()))
+    thread.start()
+    assert not submitted.wait(0.2)
+    release.set()
+    assert submitted.wait(5)
+    thread.join()
+    assert save_queue.close() == []
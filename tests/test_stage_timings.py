@@ -0,0 +1,86 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ashe_table_formatting.stage_timings import COLUMNS, StageTimings, rss_mb
+
+
+class TestStageTimings:
+    def test_records_per_context(self):
+        timings = StageTimings()
+        timings.context = ("Table 1", "Hourly Pay")
+        for _ in range(3):
+            with timings.stage("save"):
+                pass
+        timings.context = ("Table 2", "Hourly Pay")
+        with timings.stage("save"):
+            pass
+
+        frame = timings.to_frame("Table 1")
+        assert frame[["Table", "Variable", "Stage", "Calls"]].values.tolist() == [["Table 1", "Hourly Pay", "save", 3]]
+        assert len(timings.to_frame()) == 2
+
+    def test_clear_context(self):
+        timings = StageTimings()
+        timings.add("save", 0.5, ("Table 1", "Hourly Pay"))
+        timings.add("save", 0.5, ("Table 1", "Annual pay - Gross"))
+        timings.clear("Table 1", "Hourly Pay")
+        assert timings.to_frame()["Variable"].tolist() == ["Annual pay - Gross"]
+
+    def test_recorded_when_raising(self):
+        timings = StageTimings()
+        try:
+            with timings.stage("get_files"):
+                raise ValueError
+        except ValueError:
+            pass
+        assert timings.to_frame()["Calls"].tolist() == [1]
+
+    def test_save(self, tmp_path):
+        timings = StageTimings()
+        timings.add("render", 0.5, ("Table 1", "Hourly Pay"))
+        timings.save(str(tmp_path / "Stage timings"))
+
+        assert list(pd.read_csv(tmp_path / "Stage timings.csv").columns) == COLUMNS
+        records = json.loads((tmp_path / "Stage timings.json").read_text())
+        assert records[0]["Seconds"] == 0.5
+        assert "render" in timings.summary()
+
+
+def test_rss():
+    assert rss_mb() is None or rss_mb() > 0
+
+
+@pytest.mark.skipif(rss_mb() is None, reason="needs psutil")
+def test_peak_per_stage():
+    timings = StageTimings()
+    with timings.stage("before"):
+        pass
+    with timings.stage("allocate"):
+        data = np.ones(50 * 2**20) # 400MB, written so it is resident
+        time.sleep(0.05) # Long enough to be sampled as well
+        del data
+    with timings.stage("after"):
+        pass
+
+    peaks = timings.to_frame().set_index("Stage")["Peak RSS MB"]
+    assert peaks["allocate"] > peaks["before"] + 300
+    assert peaks["allocate"] > peaks["after"] + 300 # Not the process high-water mark
+
+
+@pytest.mark.skipif(rss_mb() is None, reason="needs psutil")
+def test_sampled_during_stage():
+    timings = StageTimings()
+    with timings.stage("spike"):
+        data = np.ones(50 * 2**20)
+        time.sleep(0.05)
+        del data # Freed before the stage ends, so only a sample sees it
+        time.sleep(0.01)
+    with timings.stage("quiet"):
+        pass
+
+    peaks = timings.to_frame().set_index("Stage")["Peak RSS MB"]
+    assert peaks["spike"] > peaks["quiet"] + 300
@@ -0,0 +1,42 @@
+import openpyxl as opy
+import pytest
+from openpyxl.styles import Font, PatternFill
+
+from ashe_table_formatting.style_transfer import StyleMap
+
+
+@pytest.fixture
+def source():
+    sheet = opy.Workbook().active
+    fill = PatternFill(start_color="33CCCC", end_color="00FFFF", fill_type="solid")
+    for row in range(1, 4):
+        for column in range(1, 5):
+            cell = sheet.cell(row=row, column=column, value="x")
+            cell.fill = fill
+            cell.number_format = "0.000"
+    sheet["A1"].font = Font(bold=True)
+    return sheet
+
+
+@pytest.fixture
+def target():
+    sheet = opy.Workbook().active
+    sheet["C2"] = 12.5
+    return sheet
+
+
+class TestStyleMap:
+    def test_distinct_styles_interned_once(self, source):
+        assert len(StyleMap(source).styles) == 2
+
+    def test_styles_applied(self, source, target):
+        StyleMap(source).apply(target)
+        assert target["A1"].font.bold
+        assert target["D3"].fill.start_color.rgb == "0033CCCC"
+        assert target["D3"].number_format == "0.000"
+        assert target["C2"].value == 12.5
+
+    def test_copy_x(self, source, target):
+        StyleMap(source).apply(target, copy_x=True)
+        assert target["C2"].value == "x"
+        assert target["B2"].value is None
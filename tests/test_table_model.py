@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ashe_table_formatting.table_model import (
+    BLANK,
+    MISSING,
+    NO_DATA,
+    SUPPRESSED,
+    UNSAFE,
+    VALUE,
+    order_table,
+    render_rows,
+    split_table,
+    table_from_frame,
+)
+
+
+@pytest.fixture
+def table():
+    data = pd.DataFrame(
+        {
+            "Description": ["b", "a", "z"],
+            "Code": ["occ1 2", "occ1 1", "occ1 99"],
+            "population number": [5.0, 2.0, 7.0],
+            "Median": [10.5, np.nan, 3.0],
+            "Year on Year % Change": [".", ".", "."],
+            "Safe": [1.0, 0.0, 1.0],
+        }
+    )
+    return table_from_frame(data)
+
+
+@pytest.fixture
+def order():
+    return pd.DataFrame({"Code": ["occ1 1", "occ1 2", "occ1 3"], "Order": [1, 2, 3]})
+
+
+class TestTableFromFrame:
+    def test_values_are_float(self, table):
+        assert all(dtype == float for dtype in table.values.dtypes)
+
+    def test_missing_flagged(self, table):
+        assert table.flags["Median"].tolist() == [VALUE, MISSING, VALUE]
+        assert table.flags["Year on Year % Change"].tolist() == [MISSING] * 3
+        assert table.flags.to_numpy().dtype == np.uint8
+
+
+class TestOrderTable:
+    def test_template_order(self, table, order):
+        ordered = order_table(table, order)
+        assert ordered.keys["Code"].tolist() == ["occ1 1", "occ1 2", "occ1 3"]
+
+    def test_no_data_rows(self, table, order):
+        ordered = order_table(table, order)
+        assert ordered.flags.iloc[2].tolist() == [NO_DATA, BLANK, BLANK]
+
+
+class TestRenderRows:
+    def test_markers(self, table, order):
+        ordered = order_table(table, order)
+        ordered.mark_rows(ordered.keys["Safe"] == 0, UNSAFE)
+        assert render_rows(ordered) == [["..", "", ""], [5.0, 10.5, "."], [":", "", ""]]
+
+    def test_suppressed(self, table):
+        suppressed = table.with_flags(table.flagged_cells(table.values["population number"] <= 3, ["population number"], SUPPRESSED))
+        assert render_rows(suppressed)[1][0] == "x"
+        assert table.flags["population number"].iat[1] == VALUE
+
+    def test_text_columns(self, table):
+        table.text_columns = {"Median"}
+        assert render_rows(table)[0][1] == "10.5"
+        assert render_rows(table, numeric_text=True)[0][1] == "10.5"
+        blank = table.with_flags(table.flagged_cells([False, True, False], ["Median"], BLANK))
+        assert render_rows(blank, numeric_text=True)[0][1] == 10.5
+
+
+class TestWithFlags:
+    def test_shares_values(self, table):
+        safe = table.with_flags(table.flagged_rows(table.keys["Safe"] == 0, UNSAFE))
+        assert safe.values is table.values
+        assert table.flags["population number"].tolist() == [VALUE] * 3
+        assert render_rows(safe)[1] == ["..", "", ""]
+
+    def test_flagged_cells(self, table):
+        flags = table.flagged_cells([True, False, False], ["Median"], SUPPRESSED)
+        assert render_rows(table.with_flags(flags))[0] == [5.0, "x", "."]
+
+
+def test_split_table(table):
+    parts = split_table(table, [0, 2, 2, 3])
+    assert [part.keys["Code"].tolist() for part in parts] == [["occ1 2", "occ1 1"], [], ["occ1 99"]]
+    parts[0].mark_rows([True, True], UNSAFE)
+    assert (table.flags.iloc[:2] != UNSAFE).all().all()
@@ -0,0 +1,72 @@
+import openpyxl as opy
+from openpyxl.styles import Font, PatternFill
+
+from ashe_table_formatting.template_cache import clear_template_cache, get_template, load_template
+
+
+def test_skipped_sheets(tmp_path):
+    workbook = opy.Workbook()
+    data = workbook.active
+    data.title = "occ1"
+    for row in range(1, 100):
+        data.append([row, f"Code {row}", row])
+    sheet = workbook.create_sheet("All")
+    sheet["A1"] = "Table"
+    sheet.print_title_rows = "1:5"
+    sheet.print_area = "A1:D20"
+    path = tmp_path / "template.xlsx"
+    workbook.save(path)
+
+    clear_template_cache()
+    template = get_template(str(path), ["occ1"])
+    assert template.sheetnames == ["All"]
+    assert template["All"].print_title_rows == "$1:$5" # Sheet scoped names still find their sheet
+    assert template["All"].print_area == "'All'!$A$1:$D$20"
+    assert get_template(str(path)).sheetnames == ["occ1", "All"]
+
+    copy = load_template(str(path), ["occ1"])
+    copy["All"]["A1"] = "Changed"
+    assert template["All"]["A1"].value == "Table"
+    clear_template_cache()
+
+
+def test_clone_independent(tmp_path):
+    workbook = opy.Workbook()
+    sheet = workbook.active
+    sheet.title = "All"
+    sheet["A1"] = "Title"
+    sheet["A1"].font = Font(bold=True)
+    sheet["B2"] = 1.5
+    sheet["B2"].fill = PatternFill("solid", fgColor="FF0000")
+    sheet["B2"].number_format = "0.0"
+    sheet.merge_cells("A3:C3")
+    sheet.column_dimensions["A"].width = 30
+    path = tmp_path / "template.xlsx"
+    workbook.save(path)
+
+    clear_template_cache()
+    original = get_template(str(path))
+    clone = load_template(str(path))
+    copied = clone["All"]
+    assert copied["A1"].value == "Title" and copied["A1"].font.b
+    assert copied["B2"].value == 1.5 and copied["B2"].fill.fgColor.rgb == "00FF0000" and copied["B2"].number_format == "0.0"
+    assert [str(cells) for cells in copied.merged_cells.ranges] == ["A3:C3"]
+    assert copied.column_dimensions["A"].width == 30
+
+    copied["A1"] = "Changed"
+    copied["B2"].font = Font(italic=True)
+    copied["D4"] = "New"
+    copied.merge_cells("A5:B5")
+    copied.column_dimensions["A"].width = 5
+    sheet = original["All"]
+    assert sheet["A1"].value == "Title"
+    assert not sheet["B2"].font.i
+    assert (4, 4) not in sheet._cells
+    assert [str(cells) for cells in sheet.merged_cells.ranges] == ["A3:C3"]
+    assert sheet.column_dimensions["A"].width == 30
+
+    clone.save(tmp_path / "clone.xlsx")
+    saved = opy.load_workbook(tmp_path / "clone.xlsx")["All"]
+    assert saved["A1"].value == "Changed" and saved["B2"].font.i and saved["B2"].fill.fgColor.rgb == "00FF0000"
+    assert load_template(str(path))["All"]["A1"].value == "Title"
+    clear_template_cache()
@@ -0,0 +1,93 @@
+import numpy as np
+import openpyxl as opy
+import pandas as pd
+import pytest
+
+from ashe_table_formatting.table_model import order_table, table_from_frame
+from ashe_table_formatting.template_order import (
+    SIDECAR_SUFFIX,
+    TemplateOrder,
+    get_template_order,
+    read_template_order,
+    template_order_frame,
+)
+
+
+def random_table(rng, codes):
+    return table_from_frame(
+        pd.DataFrame({"Code": codes, "Median": rng.uniform(0, 10, len(codes)), "Safe": np.ones(len(codes))})
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_same_as_merge(seed):
+    rng = np.random.default_rng(seed)
+    template = [f"occ1 {i}" for i in range(40)]
+    orders = rng.permutation(40) + 1.0
+    orders[rng.random(40) < 0.1] = np.nan
+    frame = pd.DataFrame({"Code": template, "Order": orders})
+    pool = template + [f"occ1 x{i}" for i in range(10)]
+    table = random_table(rng, list(rng.choice(pool, rng.integers(0, 45), replace=False)))
+
+    expected = order_table(table, frame)
+    ordered = TemplateOrder(frame).apply(table)
+    assert ordered.keys["Code"].equals(expected.keys["Code"])
+    assert ordered.values.equals(expected.values)
+    assert ordered.flags.equals(expected.flags)
+    assert ordered.keys.index.equals(pd.RangeIndex(len(ordered.keys)))
+
+
+def test_repeated_codes_fall_back():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({"Code": ["a 1", "a 2"], "Order": [2, 1]})
+    table = random_table(rng, ["a 1", "a 1", "a 2"])
+    assert TemplateOrder(frame).apply(table).keys["Code"].tolist() == ["a 2", "a 1", "a 1"]
+
+
+def test_sidecar(tmp_path):
+    workbook = opy.Workbook()
+    sheet = workbook.active
+    sheet.title = "occ1"
+    for row in [("Code", "Description", "Order"), (1, "One", 2), (2, "Two", 1)]:
+        sheet.append(row)
+    path = tmp_path / "template.xlsx"
+    workbook.save(path)
+
+    order = get_template_order(str(path), ["occ1"], persist=True)
+    assert order.codes.tolist() == ["occ1 2", "occ1 1"]
+    stored = TemplateOrder.load(str(path) + SIDECAR_SUFFIX, ["occ1"])
+    assert stored.frame.equals(order.frame)
+    assert TemplateOrder.load(str(path) + SIDECAR_SUFFIX, ["occ2"]) is None
+
+
+@pytest.mark.parametrize("stored", ['{"Sheets": ["occ1"], "Co', '{"Sheets": ["occ1"]}', "[]"])
+def test_unreadable_sidecar_read_again(tmp_path, stored):
+    workbook = opy.Workbook()
+    sheet = workbook.active
+    sheet.title = "occ1"
+    for row in [("Code", "Description", "Order"), (1, "One", 2), (2, "Two", 1)]:
+        sheet.append(row)
+    path = tmp_path / "template.xlsx"
+    workbook.save(path)
+    sidecar = tmp_path / ("template.xlsx" + SIDECAR_SUFFIX)
+    sidecar.write_text(stored)  # e.g. half written by another process
+
+    assert TemplateOrder.load(str(sidecar), ["occ1"]) is None
+    assert get_template_order(str(path), ["occ1"], persist=True).codes.tolist() == ["occ1 2", "occ1 1"]
+    assert TemplateOrder.load(str(sidecar), ["occ1"]).codes.tolist() == ["occ1 2", "occ1 1"]
+    assert [file.name for file in tmp_path.iterdir() if file.suffix == ".tmp"] == []
+
+
+def test_streamed_read(tmp_path):
+    workbook = opy.Workbook()
+    workbook.active.title = "All"
+    for title, rows in [("occ1", [("Code", "Description", "Order"), (1, "One", 2), (2, "Two")]),
+                        ("occ2", [("Code", "Description", "Order"), ("a", "A", 3), (None, None, None), (1, "One", 1)])]:
+        sheet = workbook.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    path = tmp_path / "template.xlsx"
+    workbook.save(path)
+
+    streamed = read_template_order(str(path), ["occ1", "occ2"])
+    assert streamed.equals(template_order_frame(opy.load_workbook(path), ["occ1", "occ2"]))